@@ -0,0 +1,309 @@
+__doc__ = """
+Benchmarks for gpgraph on synthetic genotype-phenotype maps.
+
+Times and records peak memory (tracemalloc) of graph construction,
+loading and CSV reading, every model in ``gpgraph.models``, path enumeration, flux, batched pair queries,
+layout and drawing on complete maps of increasing size, for binary and
+multi-allelic alphabets.
+``import gpgraph`` is timed in fresh interpreters.
+
+Usage::
+
+    python benchmarks/bench.py --output results.json
+    python benchmarks/bench.py --baseline benchmarks/baseline.json --tolerance 0.25
+    python benchmarks/bench.py --sites 4 6 8 --alphabets 2 --plot scaling.png
+
+With ``--baseline``, every case that is slower (or uses more memory) than
+the baseline by more than ``--tolerance`` is reported and the script exits
+with status 1.
+"""
+
+import argparse
+import gc
+import inspect
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+# Benchmark the checkout this script lives in, installed or not.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+import networkx
+import gpmap
+from gpmap import GenotypePhenotypeMap
+from gpgraph.__version__ import __version__
+from gpgraph import GenotypePhenotypeGraph, models
+from gpgraph.paths import forward_paths_prob, paths_prob_to_edges_flux, batch_forward_paths
+from gpgraph.layout import flattened_array
+from gpgraph.pyplot import draw_gpgraph
+
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Parameters passed to models that need them.
+MODEL_PARAMS = {"population_size": 100}
+
+
+def synthetic_map(sites, alphabet, seed=0):
+    """Complete map with additive, noisy phenotypes.
+
+    Phenotypes increase towards the last letter at every site, so forward
+    paths from the first to the last genotype have nonzero probability.
+    """
+    rng = np.random.default_rng(seed)
+    letters = np.array(list(LETTERS[:alphabet]))
+    codes = np.indices((alphabet,) * sites).reshape(sites, -1).T
+    genotypes = ["".join(row) for row in letters[codes]]
+    effects = rng.random((sites, alphabet)).cumsum(axis=1)
+    phenotypes = effects[np.arange(sites), codes].sum(axis=1)
+    phenotypes = 1 + phenotypes / phenotypes.max() + 0.01 * rng.random(len(codes))
+    mutations = {i: list(letters) for i in range(sites)}
+    return GenotypePhenotypeMap(genotypes[0], genotypes, phenotypes, mutations=mutations)
+
+
+def model_cases():
+    """(name, model, params) for every model in gpgraph.models."""
+    cases = []
+    for name, model in inspect.getmembers(models, inspect.isfunction):
+        if model.__module__ != models.__name__ or name.startswith("_"):
+            continue
+        arguments = list(inspect.signature(model).parameters)
+        if arguments[:2] != ["fitness1", "fitness2"]:
+            continue
+        params = {key: MODEL_PARAMS[key] for key in arguments[2:] if key in MODEL_PARAMS}
+        cases.append((name, model, params))
+    return cases
+
+
+def measure(func, repeat):
+    """Best wall time of ``repeat`` calls and peak traced memory of one."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+# Imports gpgraph in a fresh interpreter and prints the import time, peak
+# traced memory (with "trace" as argument) and whether matplotlib was loaded.
+IMPORT_SCRIPT = """
+import json, sys, time, tracemalloc
+trace = sys.argv[1:] == ["trace"]
+if trace:
+    tracemalloc.start()
+start = time.perf_counter()
+import gpgraph
+elapsed = time.perf_counter() - start
+print(json.dumps(dict(time=elapsed, peak_memory=tracemalloc.get_traced_memory()[1] if trace else None,
+                      matplotlib="matplotlib" in sys.modules)))
+"""
+
+
+def run_import(repeat):
+    """Best wall time and peak memory of ``import gpgraph`` in fresh interpreters."""
+    record = dict(benchmark="import gpgraph", alphabet=0, sites=0, genotypes=0, edges=0)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+
+    def run(*args):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT] + list(args), env=env, check=True,
+                                capture_output=True, text=True).stdout
+        return json.loads(output)
+
+    try:
+        runs = [run() for _ in range(repeat)]
+        record["time"] = min(r["time"] for r in runs)
+        record["peak_memory"] = run("trace")["peak_memory"]
+        record["imports_matplotlib"] = runs[0]["matplotlib"]
+    except (subprocess.CalledProcessError, ValueError) as error:
+        record["error"] = "{}: {}".format(type(error).__name__, error)
+    print(_format(record), flush=True)
+    return [record]
+
+
+def run_size(sites, alphabet, repeat, max_path_sites, max_draw_sites):
+    """Run every benchmark on one map size; return a list of records."""
+    gpm = synthetic_map(sites, alphabet)
+    G = GenotypePhenotypeGraph(gpm)
+    source, target = gpm.genotypes[0], gpm.genotypes[-1]
+    cases = [("add_gpm", lambda: GenotypePhenotypeGraph(gpm))]
+
+    for name, model, params in model_cases():
+        def add_model(model=model, params=params):
+            G.clear_model_cache()
+            G.add_model(model, **params)
+        cases.append(("add_model[{}]".format(name), add_model))
+
+    workdir = tempfile.mkdtemp()
+    fname = os.path.join(workdir, "graph.gpg")
+    G.add_model()
+    G.save_graph(fname)
+    cases.append(("load_graph", lambda: GenotypePhenotypeGraph.load_graph(fname)))
+    csv = os.path.join(workdir, "map.csv")
+    gpm.to_csv(filename=csv)
+    cases += [
+        ("read_csv", lambda: GenotypePhenotypeGraph.read_csv(csv, gpm.wildtype)),
+        ("read_csv[chunked]", lambda: GenotypePhenotypeGraph.read_csv(csv, gpm.wildtype, chunksize=2 ** 14)),
+    ]
+
+    if sites <= max_path_sites:
+        paths = forward_paths_prob(G, source, target)
+        cases += [
+            ("forward_paths_prob", lambda: forward_paths_prob(G, source, target)),
+            ("paths_prob_to_edges_flux", lambda: paths_prob_to_edges_flux(paths)),
+        ]
+
+    targets = np.random.default_rng(0).choice(len(gpm.data), min(64, len(gpm.data)), replace=False)
+    cases.append(("batch_forward_paths", lambda: batch_forward_paths(G, [source] * len(targets), targets)))
+    cases.append(("flattened", lambda: flattened_array(G, vertical=True)))
+    if sites <= max_draw_sites:
+        def draw():
+            fig, _ = draw_gpgraph(G)
+            plt.close(fig)
+        cases.append(("draw_gpgraph", draw))
+
+    def draw_density():
+        fig, _ = draw_gpgraph(G, edge_density=True, node_size=1)
+        plt.close(fig)
+    cases.append(("draw_gpgraph[density]", draw_density))
+
+    records = []
+    for name, func in cases:
+        record = dict(benchmark=name, alphabet=alphabet, sites=sites,
+                      genotypes=len(gpm.data), edges=G.number_of_edges())
+        try:
+            record["time"], record["peak_memory"] = measure(func, repeat)
+        except Exception as error:  # report and keep going
+            record["error"] = "{}: {}".format(type(error).__name__, error)
+        records.append(record)
+        print(_format(record), flush=True)
+    shutil.rmtree(workdir)
+    return records
+
+
+def _format(record):
+    label = "{benchmark:<42} a={alphabet} L={sites:<3} n={genotypes:<8}".format(**record)
+    if "error" in record:
+        return "{} ERROR {}".format(label, record["error"])
+    return "{} {:>10.4f} s {:>10.1f} MB".format(label, record["time"], record["peak_memory"] / 2 ** 20)
+
+
+def _key(record):
+    return record["benchmark"], record["alphabet"], record["sites"]
+
+
+def compare(records, baseline, tolerance):
+    """Print ratios to a baseline; return the cases that regressed."""
+    previous = {_key(r): r for r in baseline["results"] if "error" not in r}
+    regressions = []
+    print("\n{:<42} {:>3} {:>4} {:>8} {:>8}".format("benchmark", "a", "L", "time", "memory"))
+    for record in records:
+        old = previous.get(_key(record))
+        if old is None or "error" in record:
+            continue
+        time_ratio = record["time"] / max(old["time"], 1e-9)
+        memory_ratio = record["peak_memory"] / max(old["peak_memory"], 1)
+        flag = ""
+        if time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance:
+            regressions.append(record)
+            flag = "  REGRESSION"
+        print("{:<42} {:>3} {:>4} {:>7.2f}x {:>7.2f}x{}".format(
+            record["benchmark"], record["alphabet"], record["sites"], time_ratio, memory_ratio, flag))
+    return regressions
+
+
+def plot(records, fname):
+    """Time and peak memory against number of genotypes, one line per case."""
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    series = {}
+    for record in records:
+        if "error" not in record and record["genotypes"] > 0:
+            series.setdefault((record["benchmark"], record["alphabet"]), []).append(record)
+    for (name, alphabet), points in sorted(series.items()):
+        points.sort(key=lambda r: r["genotypes"])
+        n = [r["genotypes"] for r in points]
+        label = "{} (a={})".format(name, alphabet)
+        axes[0].loglog(n, [r["time"] for r in points], marker="o", label=label)
+        axes[1].loglog(n, [r["peak_memory"] / 2 ** 20 for r in points], marker="o", label=label)
+    axes[0].set(xlabel="genotypes", ylabel="time (s)")
+    axes[1].set(xlabel="genotypes", ylabel="peak memory (MB)")
+    axes[1].legend(fontsize="x-small", loc="upper left", bbox_to_anchor=(1, 1))
+    fig.tight_layout()
+    fig.savefig(fname)
+    plt.close(fig)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sites", type=int, nargs="+", default=[4, 6, 8, 10, 12, 14, 16],
+                        help="numbers of sites to run (default: 4 to 16)")
+    parser.add_argument("--alphabets", type=int, nargs="+", default=[2, 3],
+                        help="alphabet sizes to run (default: 2 3)")
+    parser.add_argument("--max-genotypes", type=int, default=2 ** 16,
+                        help="skip maps larger than this (default: 65536)")
+    parser.add_argument("--max-path-sites", type=int, default=8,
+                        help="largest map, in sites, to enumerate paths on (default: 8)")
+    parser.add_argument("--max-draw-sites", type=int, default=8,
+                        help="largest map, in sites, to draw (default: 8)")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repeats (default: 3)")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results from this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a case counts as a regression (default: 0.25)")
+    parser.add_argument("--plot", help="save scaling curves to this image file")
+    args = parser.parse_args(argv)
+
+    records = run_import(args.repeat)
+    for alphabet in args.alphabets:
+        for sites in args.sites:
+            if alphabet ** sites > args.max_genotypes:
+                continue
+            records += run_size(sites, alphabet, args.repeat, args.max_path_sites, args.max_draw_sites)
+
+    results = dict(
+        gpgraph=__version__,
+        python=sys.version.split()[0],
+        numpy=np.__version__,
+        networkx=networkx.__version__,
+        gpmap=getattr(gpmap, "__version__", None),
+        platform=platform.platform(),
+        machine=platform.machine(),
+        processor=platform.processor(),
+        cpus=os.cpu_count(),
+        arguments=vars(args),
+        results=records,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+    if args.plot:
+        plot(records, args.plot)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(records, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,19 @@
-from .base import GenotypePhenotypeGraph
-from .pyplot import draw_gpgraph, flattened
+from .base import GenotypePhenotypeGraph, TopologyError
+from .layout import flattened
 from .base import get_neighbors, strong_selection_weak_mutation
 from .paths import forward_paths, forward_paths_prob, edges_flux_to_node_flux, paths_to_edges, paths_prob_to_edges_flux
+from .paths import forward_edges_flux, forward_nodes_flux, top_k_paths, iter_forward_paths_prob, count_paths
+from .paths import batch_forward_paths
+from .matrices import adjacency_matrix, transition_matrix, edge_probabilities_sweep
+from .implicit import ImplicitGenotypePhenotypeGraph
+from .simulate import simulate_walks
+
+
+def __getattr__(name):
+    # Plotting needs matplotlib, which is slow to import; load it on first use
+    # so compute-only code never imports it.
+    if name in ("pyplot", "draw_gpgraph"):
+        import importlib
+        pyplot = importlib.import_module(".pyplot", __name__)
+        return pyplot if name == "pyplot" else pyplot.draw_gpgraph
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,176 @@
+__doc__ = """
+Node and adjacency dicts for networkx, built lazily from the edge index.
+
+A GenotypePhenotypeGraph keeps its topology in the positional edge index
+(``G._edge_index``) and its attributes in ColumnStores. The mappings here
+give networkx the dict-of-dicts it reads without building one up front:
+node attribute views are made on access, and the neighbor dict of a node is
+built from its block of the edge index the first time it is visited, then
+kept until the topology changes. Building a graph therefore costs a few
+array operations instead of one Python object per edge.
+"""
+
+import gc
+from contextlib import contextmanager
+from itertools import repeat
+from operator import itemgetter
+
+import numpy as np
+
+from .attributes import RowView
+from .compat import Mapping
+
+
+@contextmanager
+def _paused_gc():
+    """Pause the cyclic garbage collector while creating many objects.
+
+    Views cannot form reference cycles, but collections triggered while
+    millions of them are created rescan all of them.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def edge_views(columns, slots):
+    """One RowView of the edge columns per slot, as a list."""
+    with _paused_gc():
+        return list(map(RowView, repeat(columns, len(slots)), slots.tolist()))
+
+
+def _take(items, order):
+    """``[items[k] for k in order]`` without a Python-level loop."""
+    if len(order) == 0:
+        return []
+    if len(order) == 1:
+        return [items[int(order[0])]]
+    return list(itemgetter(*order.tolist())(items))
+
+
+class NodeIndex(object):
+    """Row position in ``gpm.data`` of every node index.
+
+    Parameters
+    ----------
+    index : pandas.Index or 1d array
+        node indices, in the order of ``gpm.data``.
+    """
+    def __init__(self, index):
+        self.labels = np.asarray(index)
+        n = len(self.labels)
+        # Node indices are positions for the default index; otherwise a
+        # lookup table is built on first use.
+        self._default = self.labels.dtype.kind in "iu" and np.array_equal(self.labels, np.arange(n))
+        self._positions = None
+        self._list = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    def tolist(self):
+        """Node indices as a list (built once)."""
+        if self._list is None:
+            self._list = self.labels.tolist()
+        return self._list
+
+    def position(self, node):
+        """Row of a node; KeyError if it is not in the graph."""
+        if self._default:
+            try:
+                if 0 <= node < len(self.labels) and int(node) == node:
+                    return int(node)
+            except (TypeError, ValueError):
+                pass
+            raise KeyError(node)
+        if self._positions is None:
+            self._positions = dict(zip(self.tolist(), range(len(self.labels))))
+        return self._positions[node]
+
+    def __contains__(self, node):
+        try:
+            self.position(node)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+
+class NodeMap(Mapping):
+    """Node index -> RowView of the node columns, made on access."""
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getitem__(self, node):
+        columns = self._graph._columns
+        return RowView(columns, int(columns.slots(self._graph._node_index.position(node))))
+
+    def __contains__(self, node):
+        return node in self._graph._node_index
+
+    def __iter__(self):
+        return iter(self._graph._node_index.tolist())
+
+    def __len__(self):
+        return len(self._graph._node_index)
+
+
+class Adjacency(Mapping):
+    """Node index -> dict of neighbor index -> edge RowView.
+
+    Successors by default; predecessors with ``reverse=True``. Neighbor
+    dicts are built per node on first access, in edge index order. The
+    edge views are made for all edges at once and shared by successors and
+    predecessors; see ``GenotypePhenotypeGraph._edge_views``.
+    """
+    def __init__(self, graph, reverse=False):
+        self._graph = graph
+        self._reverse = reverse
+        self.reset()
+
+    def reset(self):
+        """Drop the neighbor dicts built so far; call after the edge index
+        or the nodes change."""
+        self._blocks = {}
+        self._table = None
+
+    def _build_table(self):
+        """Per-node bounds, neighbor indices and edge views as lists."""
+        graph = self._graph
+        sources, targets = graph._edge_index
+        views = graph._edge_views()
+        labels = graph._node_index.labels
+        if self._reverse:
+            # The edge index is sorted by source; predecessors need sorting.
+            order = np.argsort(targets, kind="stable")
+            rows, neighbors, views = targets[order], sources[order], _take(views, order)
+        else:
+            rows, neighbors = sources, targets
+        bounds = np.searchsorted(rows, np.arange(len(labels) + 1))
+        self._table = (bounds.tolist(), labels[neighbors].tolist(), views)
+
+    def _block(self, position):
+        if self._table is None:
+            self._build_table()
+        bounds, neighbors, views = self._table
+        start, stop = bounds[position], bounds[position + 1]
+        return dict(zip(neighbors[start:stop], views[start:stop]))
+
+    def __getitem__(self, node):
+        block = self._blocks.get(node)
+        if block is None:
+            block = self._block(self._graph._node_index.position(node))
+            self._blocks[node] = block
+        return block
+
+    def __contains__(self, node):
+        return node in self._graph._node_index
+
+    def __iter__(self):
+        return iter(self._graph._node_index.tolist())
+
+    def __len__(self):
+        return len(self._graph._node_index)
@@ -0,0 +1,188 @@
+__doc__ = """
+Columnar storage for node and edge attributes.
+
+Attributes live in one NumPy array per name. Each node or edge holds a small
+``RowView`` that reads and writes its row of those arrays, so networkx-style
+access (``G.nodes[n]['phenotypes']``) keeps working without a dict per
+element. Views address rows through a slot table, so rows can be inserted
+or deleted without touching the views of the other rows.
+"""
+
+import itertools
+
+import numpy as np
+
+from .compat import MutableMapping
+
+# Source of ColumnStore versions; unique across all stores.
+_versions = itertools.count(1)
+
+
+class _Missing(object):
+    """Placeholder for rows that do not have a value in a column."""
+    def __repr__(self):
+        return "<missing>"
+
+
+MISSING = _Missing()
+
+
+class ColumnStore(dict):
+    """Dictionary of equal-length attribute arrays.
+
+    Parameters
+    ----------
+    size : int
+        number of rows.
+    columns : dict, optional
+        name -> 1d array of length ``size``. Arrays are stored as given (no
+        copy), so they can be views on other data.
+
+    Attributes
+    ----------
+    rows : 1d int array
+        current row of each ``RowView`` slot (-1 once the row is deleted).
+    version : int
+        changes on every write, and is never shared by two stores, so
+        results derived from the columns can be cached against it.
+    """
+    def __init__(self, size, columns=None):
+        super(ColumnStore, self).__init__()
+        self.size = size
+        self.rows = np.arange(size)
+        self._slots = None
+        self.touch()
+        for key, values in (columns or {}).items():
+            self[key] = values
+
+    def touch(self):
+        """Mark the columns as changed."""
+        self.version = next(_versions)
+
+    def slots(self, rows):
+        """Slot of the view of each row (the inverse of ``rows``)."""
+        if self._slots is None:
+            alive = np.flatnonzero(self.rows >= 0)
+            self._slots = np.empty(self.size, dtype=np.int64)
+            self._slots[self.rows[alive]] = alive
+        return self._slots[rows]
+
+    def __setitem__(self, key, values):
+        values = np.asarray(values)
+        if values.shape != (self.size,):
+            raise ValueError("Column {} must have length {}.".format(key, self.size))
+        super(ColumnStore, self).__setitem__(key, values)
+        self.touch()
+
+    def __delitem__(self, key):
+        super(ColumnStore, self).__delitem__(key)
+        self.touch()
+
+    def set_value(self, key, row, value):
+        """Set one element, creating or upcasting the column if needed."""
+        column = self.get(key)
+        if column is None:
+            column = np.full(self.size, MISSING, dtype=object)
+        elif column.dtype != object and not np.can_cast(np.asarray(value).dtype, column.dtype, "safe"):
+            column = column.astype(object)
+        elif not column.flags.writeable:
+            column = column.copy()
+        column[row] = value
+        super(ColumnStore, self).__setitem__(key, column)
+        self.touch()
+
+    def insert_rows(self, positions, values=None):
+        """Insert rows before ``positions``, as in ``np.insert``.
+
+        Parameters
+        ----------
+        positions : 1d int array
+            row (before the insert) each new row is placed in front of.
+        values : dict, optional
+            name -> values of the new rows. Other columns are filled with
+            missing values.
+
+        Returns
+        -------
+        slots : 1d int array
+            slots of the new rows, for building their ``RowView``.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        values = values or {}
+        for key, column in list(self.items()):
+            new = np.asarray(values[key]) if key in values else MISSING
+            if column.dtype != object and not np.can_cast(np.asarray(new).dtype, column.dtype, "safe"):
+                column = column.astype(object)
+            super(ColumnStore, self).__setitem__(key, np.insert(column, positions, new))
+
+        # Existing rows move down by the number of rows inserted at or
+        # before them. New rows land as np.insert places them.
+        ordered = np.sort(positions, kind="stable")
+        shift = np.searchsorted(ordered, self.rows, side="right")
+        self.rows = np.where(self.rows >= 0, self.rows + shift, -1)
+        order = np.argsort(positions, kind="stable")
+        new_rows = np.empty(len(positions), dtype=np.int64)
+        new_rows[order] = ordered + np.arange(len(positions))
+
+        slots = np.arange(len(self.rows), len(self.rows) + len(positions))
+        self.rows = np.concatenate([self.rows, new_rows])
+        self.size += len(positions)
+        self._slots = None
+        self.touch()
+        return slots
+
+    def delete_rows(self, positions):
+        """Delete rows; views on the remaining rows keep working."""
+        deleted = np.zeros(self.size, dtype=bool)
+        deleted[positions] = True
+        for key, column in list(self.items()):
+            super(ColumnStore, self).__setitem__(key, column[~deleted])
+
+        remap = np.cumsum(~deleted) - 1
+        remap[deleted] = -1
+        alive = self.rows >= 0
+        self.rows = np.where(alive, remap[np.where(alive, self.rows, 0)], -1)
+        self.size = int(self.size - deleted.sum())
+        self._slots = None
+        self.touch()
+
+
+class RowView(MutableMapping):
+    """Dict-like view of one row (by slot) of a ColumnStore."""
+    __slots__ = ("_columns", "_slot")
+
+    def __init__(self, columns, slot):
+        self._columns = columns
+        self._slot = slot
+
+    @property
+    def _row(self):
+        return self._columns.rows[self._slot]
+
+    def __getitem__(self, key):
+        value = self._columns[key][self._row]
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._columns.set_value(key, self._row, value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._columns.set_value(key, self._row, MISSING)
+
+    def __iter__(self):
+        row = self._row
+        return (key for key, column in self._columns.items() if column[row] is not MISSING)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def copy(self):
+        """Return the row as a plain dict."""
+        return dict(self)
@@ -1,7 +1,24 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import networkx as nx
 from networkx import DiGraph
 from gpmap import GenotypePhenotypeMap
-from .models import strong_selection_weak_mutation
-from .pyplot import draw_gpgraph
+from gpmap.utils import genotypes_to_binary
+from .adjacency import Adjacency, NodeIndex, NodeMap, edge_views
+from .attributes import ColumnStore
+from .encoding import GenotypeEncoder
+from .models import strong_selection_weak_mutation, evaluate_model
+from .stats import GraphStats, stage
+
+
+def _clear_cache(G):
+    """Reset networkx's cached results after writing to G's dicts directly."""
+    clear = getattr(nx, "_clear_cache", None)
+    if clear is not None:
+        clear(G)
 
 
 def get_neighbors(genotype, mutations):
@@ -37,57 +54,439 @@ def get_neighbors(genotype, mutations):
     return neighbors
 
 
+def _ranges(starts, counts):
+    """Concatenate ``range(start, start + count)`` for each pair."""
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + offsets
+
+
+class TopologyError(TypeError):
+    """A networkx method tried to add or remove nodes or edges directly.
+
+    Nodes and edges of a GenotypePhenotypeGraph follow its gpm; change
+    them with ``add_genotypes`` and ``remove_genotypes``.
+    """
+
+
+def _fixed_topology(name):
+    """Method that raises TopologyError in place of networkx's ``name``."""
+    def method(self, *args, **kwargs):
+        raise TopologyError(
+            "{}.{} would bypass the edge index; use add_genotypes and "
+            "remove_genotypes.".format(type(self).__name__, name))
+    method.__name__ = method.__qualname__ = name
+    method.__doc__ = "Not supported; raises TopologyError."
+    return method
+
+
+def _freeze(value):
+    """Hashable stand-in for a model parameter value."""
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
 class GenotypePhenotypeGraph(DiGraph):
-    """Construct a NetworkX DiGraph object from a GenotypePhenotypeMap."""
-    def __init__(self, gpm, *args, **kwargs):
+    """Construct a NetworkX DiGraph object from a GenotypePhenotypeMap.
+
+    Edge probabilities from ``add_model`` are kept in an LRU cache of up to
+    ``model_cache_size`` arrays, keyed by model, parameters and phenotypes,
+    so switching back to an earlier model does not recompute it.
+
+    Pass ``stats=True`` (or a ``stats.GraphStats``) to record the time and
+    element counts of each build and analysis stage in ``G.stats``.
+
+    Layouts, edge arrays and path flux used for drawing are kept in a
+    second LRU cache of up to ``render_cache_size`` entries, keyed on
+    ``version``; see ``gpgraph.geometry``.
+
+    Nodes and edges are added and removed with ``add_genotypes`` and
+    ``remove_genotypes``; networkx's ``add_edge``, ``remove_node``, etc.
+    raise TopologyError.
+    """
+    model_cache_size = 8
+    render_cache_size = 16
+
+    # Edges are kept in the edge index and edge columns, which networkx's
+    # mutators would not update.
+    add_node = _fixed_topology("add_node")
+    add_nodes_from = _fixed_topology("add_nodes_from")
+    add_edge = _fixed_topology("add_edge")
+    add_edges_from = _fixed_topology("add_edges_from")
+    add_weighted_edges_from = _fixed_topology("add_weighted_edges_from")
+    remove_node = _fixed_topology("remove_node")
+    remove_nodes_from = _fixed_topology("remove_nodes_from")
+    remove_edge = _fixed_topology("remove_edge")
+    remove_edges_from = _fixed_topology("remove_edges_from")
+    clear = _fixed_topology("clear")
+    clear_edges = _fixed_topology("clear_edges")
+    update = _fixed_topology("update")
+
+    def __init__(self, gpm, *args, edges=None, encoder=None, stats=None, **kwargs):
         super(GenotypePhenotypeGraph, self).__init__(*args, **kwargs)
-        self.gpm = gpm
+        # Stage timing is opt-in; see gpgraph.stats.
+        self.stats = GraphStats() if stats is True else (None if stats is False else stats)
+        self._model_cache = OrderedDict()
+        self.model_cache_hits = 0
+        self.model_cache_misses = 0
+        self._render_cache = OrderedDict()
+        self.add_gpm(gpm, edges=edges, encoder=encoder)
 
-    def __repr__(self):
-        draw_gpgraph(self)
-        return super(GenotypePhenotypeGraph, self).__repr__()
+    @property
+    def version(self):
+        """Token that changes whenever nodes, edges or their attributes change."""
+        return (self._columns.version, self._edge_columns.version)
 
-    def add_gpm(self, gpm):
-        """Attach a Network DiGraph to GenotypePhenotypeMap object."""
+    def add_gpm(self, gpm, edges=None, encoder=None):
+        """Attach a Network DiGraph to GenotypePhenotypeMap object.
+
+        Genotypes are encoded as integer arrays and all single-mutation
+        neighbors are found in bulk, so the graph is built without
+        iterating over the rows of ``gpm.data`` in Python. Node and edge
+        attributes are stored as columns; see ``node_array`` and
+        ``edge_array``. networkx reads nodes and neighbors through mappings
+        over these arrays, and the neighbor dict of a node is only built
+        when the node is first visited; see ``gpgraph.adjacency``.
+
+        Parameters
+        ----------
+        gpm : GenotypePhenotypeMap
+            genotype-phenotype map to attach.
+        edges : tuple of 1d int arrays, optional
+            precomputed positional (sources, targets), as returned by
+            ``matrices.edge_index``. Skips the neighbor search.
+        encoder : GenotypeEncoder, optional
+            encoder of ``gpm.data.genotypes``, in row order. Skips encoding.
+        """
         # Add gpm
-        self.add_gpm(gpm)
+        self.gpm = gpm
         data = self.gpm.data
+        n = len(data)
+
+        # Node attributes are copy-on-write views of the gpm.data columns:
+        # they share memory until either side is written.
+        self._columns = ColumnStore(n, {key: data[key].to_numpy() for key in data.columns})
 
-        # genotypes to index.
-        m = dict(zip(data.genotypes, data.index))
+        # Encode genotypes and find all neighbors present in the map.
+        with stage(self, "encode") as current:
+            self.encoder = GenotypeEncoder(data.genotypes, self.gpm.mutations) if encoder is None else encoder
+            current.add(nodes=n)
+        with stage(self, "neighbors") as current:
+            sources, targets = self.encoder.neighbors() if edges is None else edges
+            current.add(edges=len(sources))
+        self._edge_index = (sources, targets)
+        self._edge_columns = ColumnStore(len(sources))
+        self.clear_model_cache()
 
-        # Iterate through nodes.
-        edges = []
-        for i in data.index:
-            # Add node to graph
-            row = data.loc[i]
-            self.add_node(i, **row)
+        self._node_index = NodeIndex(data.index)
+        self._views = None
+        self._node = NodeMap(self)
+        self._adj = self._succ = Adjacency(self)
+        self._pred = Adjacency(self, reverse=True)
+        _clear_cache(self)
 
-            # Get edges from node.
-            neighbors = get_neighbors(row['genotypes'], self.gpm.mutations)
-            for neighbor in neighbors:
-                # Check if node is in data.
-                if neighbor in m:
-                    j = m[neighbor]
-                    edges.append((i, j))
+    def _edge_views(self):
+        """RowView of every edge, aligned with the edge index; made the
+        first time networkx visits a neighbor dict."""
+        if self._views is None:
+            self._views = edge_views(self._edge_columns, self._edge_columns.slots(np.arange(self._edge_columns.size)))
+        return self._views
 
-        # Add edges to network
-        self.add_edges_from(edges)
+    def _topology_changed(self):
+        """Point node lookups at the current ``gpm.data`` and drop the
+        neighbor dicts and edge views built so far."""
+        self._node_index = NodeIndex(self.gpm.data.index)
+        self._views = None
+        self._succ.reset()
+        self._pred.reset()
+        _clear_cache(self)
+
+    def number_of_edges(self, u=None, v=None):
+        """Return the number of edges, or of edges from u to v."""
+        if u is None:
+            return len(self._edge_index[0])
+        return super(GenotypePhenotypeGraph, self).number_of_edges(u, v)
+
+    def node_array(self, name):
+        """Array of a node attribute, in the order of ``gpm.data``.
+
+        Node columns are views that share memory with the ``gpm.data``
+        columns until either side is written (pandas copy-on-write), and
+        are what the models, paths and drawing functions read. Do not write
+        to the returned array, which may be read-only or shared; change
+        phenotypes with ``update_phenotypes``, which writes both.
+        """
+        return self._columns[name]
+
+    def edge_array(self, name):
+        """Array of an edge attribute, aligned with ``matrices.edge_index(G)``."""
+        return self._edge_columns[name]
 
     def add_model(self, model=strong_selection_weak_mutation, **params):
-        """Add a transition model to the edges."""
+        """Add a transition model to the edges.
+
+        The model is evaluated once over arrays of source and target
+        phenotypes (``node_array('phenotypes')``) and stored as the edges' 'prob' column. Results are
+        cached; a cached column is read-only and copied on the first
+        per-edge write.
+        """
         # Add model to class.
         self.model = staticmethod(model)
+        self.model_params = params
+
+        phenotypes = np.asarray(self.node_array("phenotypes"), dtype=float)
+        fingerprint = self._phenotype_fingerprint()
+        try:
+            key = (getattr(model, "__func__", model), _freeze(params), fingerprint)
+            hash(key)
+        except TypeError:
+            key = None
+
+        probs = self._model_cache.get(key) if key is not None else None
+        if probs is not None:
+            self.model_cache_hits += 1
+            self._model_cache.move_to_end(key)
+        else:
+            self.model_cache_misses += 1
+            sources, targets = self._edge_index
+            with stage(self, "add_model") as current:
+                probs = evaluate_model(model, phenotypes[sources], phenotypes[targets], **params)
+                current.add(edges=len(sources))
+            probs.flags.writeable = False
+            if key is not None and self.model_cache_size:
+                # The cache is for switching models and parameters on one
+                # map, so columns scored on earlier phenotypes (each as long
+                # as the edge list) are dropped once the phenotypes change.
+                for stale in [k for k in self._model_cache if k[2] != fingerprint]:
+                    del self._model_cache[stale]
+                self._model_cache[key] = probs
+                while len(self._model_cache) > self.model_cache_size:
+                    self._model_cache.popitem(last=False)
+        self._edge_columns['prob'] = probs
+
+    def _phenotype_fingerprint(self):
+        """Hash of the phenotypes, part of every model cache key."""
+        phenotypes = np.asarray(self.node_array("phenotypes"), dtype=float)
+        return hashlib.blake2b(np.ascontiguousarray(phenotypes).tobytes(), digest_size=16).digest()
 
+    def clear_model_cache(self):
+        """Drop all cached edge probabilities and reset the hit/miss counters."""
+        self._model_cache.clear()
+        self.model_cache_hits = 0
+        self.model_cache_misses = 0
 
-        for edge in self.edges():
-            node1 = edge[0]
-            node2 = edge[1]
+    def update_phenotypes(self, nodes, phenotypes):
+        """Set the phenotypes of some nodes and rescore only their edges.
 
-            phenotype1 = self.gpm.phenotypes[node1]
-            phenotype2 = self.gpm.phenotypes[node2]
+        Only the edges of the updated nodes are scored, and the 'prob'
+        column is written in place unless it is memory-mapped from a file.
 
-            self.edges[edge]['prob'] = model(phenotype1, phenotype2, **params)
+        Parameters
+        ----------
+        nodes : list
+            node indices to update.
+        phenotypes : array-like
+            new phenotype of each node.
+        """
+        positions = self._node_positions(nodes)
+        self._set_phenotypes(positions, phenotypes)
+        if getattr(self, "model", None) is None or "prob" not in self._edge_columns:
+            return
+
+        edges = self._incident_edges(positions)
+        probs = self._edge_columns["prob"]
+        if not probs.flags.writeable:
+            # The model cache was cleared with the old phenotypes, so an
+            # array we own can be written in place; mapped arrays are copied.
+            try:
+                probs.flags.writeable = True
+            except ValueError:
+                probs = probs.copy()
+        probs[edges] = self._score_edges(self._edge_index[0][edges], self._edge_index[1][edges])
+        self._edge_columns["prob"] = probs
+
+    def add_genotypes(self, genotypes, phenotypes, stdeviations=None):
+        """Add genotypes to the map and connect them to their neighbors.
+
+        Only the neighbors of the new genotypes are searched and only the
+        new edges are scored. New nodes are appended to ``gpm.data``; each
+        new edge is placed after the existing edges of its source, as
+        networkx orders them.
+
+        The search and scoring scale with the number of new genotypes, but
+        splicing the new rows into ``gpm.data``, the edge index and the
+        edge columns copies those arrays, so every call still costs
+        O(nodes + edges) in memory traffic. Add genotypes in batches
+        rather than one at a time.
+
+        Returns
+        -------
+        nodes : list
+            node indices of the new genotypes (empty if none are given).
+        """
+        genotypes = [str(g) for g in genotypes]
+        if not genotypes:
+            return []
+        self._check_new_genotypes(genotypes)
+        n = self._columns.size
+        nodes = self._append_data(genotypes, phenotypes, stdeviations)
+        rows = self.encoder.append(genotypes)
+
+        data = self.gpm.data
+        self._columns.insert_rows(np.full(len(rows), n),
+                                  {key: data[key].to_numpy()[n:] for key in self._columns
+                                   if key in data.columns})
+        for key in data.columns:
+            self._columns[key] = data[key].to_numpy()
+
+        # Edges out of the new nodes go at the end. Edges into them from
+        # existing nodes go at the end of those nodes' blocks.
+        out_sources, out_targets = self.encoder.neighbors(rows)
+        existing = out_targets < n
+        order = np.argsort(out_targets[existing], kind="stable")
+        in_sources, in_targets = out_targets[existing][order], out_sources[existing][order]
+        sources, targets = self._edge_index
+        at = np.concatenate([np.searchsorted(sources, in_sources, side="right"),
+                             np.full(len(out_sources), len(sources))])
+        new_sources = np.concatenate([in_sources, out_sources])
+        new_targets = np.concatenate([in_targets, out_targets])
+
+        values = {}
+        if getattr(self, "model", None) is not None and "prob" in self._edge_columns:
+            values["prob"] = self._score_edges(new_sources, new_targets)
+        self._edge_columns.insert_rows(at, values)
+        self._edge_index = (np.insert(sources, at, new_sources), np.insert(targets, at, new_targets))
+
+        self._topology_changed()
+        return nodes
+
+    def remove_genotypes(self, nodes):
+        """Remove genotypes from the map along with their edges.
+
+        Node indices of the remaining genotypes do not change. As with
+        ``add_genotypes``, the incident edges are found from the removed
+        nodes only, but ``gpm.data``, the edge index and the edge columns
+        are copied without the removed rows, which costs O(nodes + edges).
+        """
+        nodes = list(nodes)
+        if not nodes:
+            return
+        positions = self._node_positions(nodes)
+        edges = self._incident_edges(positions)
+
+        # Drop the edges and shift positions past the removed nodes.
+        remap = np.ones(self._columns.size, dtype=np.int64)
+        remap[positions] = 0
+        remap = np.cumsum(remap) - 1
+        sources, targets = self._edge_index
+        keep = np.ones(len(sources), dtype=bool)
+        keep[edges] = False
+        self._edge_index = (remap[sources[keep]], remap[targets[keep]])
+        self._edge_columns.delete_rows(edges)
+
+        self._drop_data(positions)
+        self.encoder.delete(positions)
+        self._columns.delete_rows(positions)
+        for key in self.gpm.data.columns:
+            self._columns[key] = self.gpm.data[key].to_numpy()
+        self._topology_changed()
+
+    def _node_positions(self, nodes):
+        """Unique row positions of nodes in ``gpm.data``."""
+        positions = self.gpm.data.index.get_indexer(list(nodes))
+        if np.any(positions < 0):
+            missing = np.asarray(list(nodes), dtype=object)[positions < 0]
+            raise KeyError("Nodes {} are not in the graph.".format(missing.tolist()))
+        return np.unique(positions)
+
+    def _incident_edges(self, positions):
+        """Positions of every edge into or out of the given nodes."""
+        sources, targets = self._edge_index
+        starts = np.searchsorted(sources, positions, side="left")
+        counts = np.searchsorted(sources, positions, side="right") - starts
+        out = _ranges(starts, counts)
+
+        # Neighbor edges are symmetric: the edge back is in the target's block.
+        starts = np.searchsorted(sources, targets[out], side="left")
+        counts = np.searchsorted(sources, targets[out], side="right") - starts
+        candidates = _ranges(starts, counts)
+        back = candidates[targets[candidates] == np.repeat(sources[out], counts)]
+        return np.unique(np.concatenate([out, back]))
+
+    def _score_edges(self, sources, targets):
+        """Model probability of edges given by positional endpoints."""
+        phenotypes = np.asarray(self.node_array("phenotypes"), dtype=float)
+        return evaluate_model(self.model, phenotypes[sources], phenotypes[targets], **self.model_params)
+
+    def _set_phenotypes(self, positions, phenotypes):
+        data = self.gpm.data
+        data.iloc[positions, data.columns.get_loc("phenotypes")] = np.asarray(phenotypes, dtype=float)
+        self._columns["phenotypes"] = data["phenotypes"].to_numpy()
+        # Every cached model was computed for the old phenotypes.
+        self._model_cache.clear()
+
+    def _check_new_genotypes(self, genotypes):
+        keys = self.encoder.to_keys(self.encoder.encode(genotypes))
+        if np.any(self.encoder.lookup(keys) >= 0) or len(np.unique(keys)) < len(keys):
+            raise ValueError("Genotypes are already in the map.")
+
+    def _append_data(self, genotypes, phenotypes, stdeviations):
+        """Append rows to ``gpm.data`` and return their index labels."""
+        data = self.gpm.data
+        start = int(data.index.max()) + 1 if len(data) else 0
+        nodes = list(range(start, start + len(genotypes)))
+        binary = genotypes_to_binary(genotypes, self.gpm.encoding_table)
+        rows = pd.DataFrame(dict(
+            genotypes=genotypes,
+            phenotypes=np.asarray(phenotypes, dtype=float),
+            n_replicates=1,
+            stdeviations=stdeviations,
+            binary=binary,
+            n_mutations=[b.count("1") for b in binary],
+        ), index=nodes)
+        rows = rows[[key for key in rows.columns if key in data.columns]]
+        self.gpm.data = pd.concat([data, rows])
+        self._model_cache.clear()
+        return nodes
+
+    def _drop_data(self, positions):
+        data = self.gpm.data
+        keep = np.ones(len(data), dtype=bool)
+        keep[positions] = False
+        self.gpm.data = data[keep]
+        self._model_cache.clear()
+
+    def save_graph(self, fname):
+        """Write the graph, its edges and model probabilities to one file.
+
+        See ``load_graph``.
+        """
+        from .storage import write_graph
+        write_graph(self, fname)
+
+    @classmethod
+    def load_graph(cls, fname, mmap_mode="r"):
+        """Read a graph written by ``save_graph``.
+
+        Node columns, edges and the probabilities of the current and
+        cached models are memory-mapped instead of recomputed.
+
+        Parameters
+        ----------
+        fname : str
+            path of the file to read.
+        mmap_mode : {'r', 'c', None} (default='r')
+            memory-map mode ('c' is copy-on-write). None reads the arrays
+            into memory. Graphs mapped with 'r' can still be updated: the
+            phenotypes and stdeviations are read into memory and edge
+            columns are copied on the first write.
+        """
+        from .storage import read_graph
+        return read_graph(fname, cls, mmap_mode=mmap_mode)
 
     @classmethod
     def read_json(cls, fname):
@@ -96,8 +495,17 @@ class GenotypePhenotypeGraph(DiGraph):
         return cls(gpm)
 
     @classmethod
-    def read_csv(cls, fname, wildtype, mutations=None):
-        """Read graph from csv file."""
+    def read_csv(cls, fname, wildtype, mutations=None, chunksize=None):
+        """Read graph from csv file.
+
+        With ``chunksize``, the file is parsed and its edges are found that
+        many rows at a time, which keeps peak memory near the size of the
+        final graph; see ``storage.read_csv_chunks``.
+        """
+        if chunksize is not None:
+            from .storage import read_csv_chunks
+            return read_csv_chunks(fname, cls, wildtype, mutations=mutations, chunksize=chunksize)
+
         gpm = GenotypePhenotypeMap.read_csv(
             fname,
             wildtype=wildtype,
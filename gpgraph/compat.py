@@ -0,0 +1,8 @@
+__doc__ = """
+Imports that moved between Python versions.
+"""
+
+try:
+    from collections.abc import Mapping, MutableMapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping, MutableMapping
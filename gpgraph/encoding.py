@@ -0,0 +1,265 @@
+__doc__ = """
+Integer encoding of genotypes for vectorized neighbor lookups.
+"""
+
+import numpy as np
+
+
+# Number of (row, mutation) pairs handled per block when generating
+# neighbors. Keeps the scratch arrays at a few tens of megabytes.
+BLOCKSIZE = 2 ** 22
+
+
+def genotypes_to_chars(genotypes):
+    """Split a sequence of equal-length genotype strings into a 2d array of
+    single characters.
+
+    Parameters
+    ----------
+    genotypes : array-like of str
+        genotypes to split.
+
+    Returns
+    -------
+    chars : 2d array
+        array of shape (n_genotypes, n_sites) with one character per element.
+    """
+    genotypes = np.asarray(genotypes, dtype=str)
+    if genotypes.size == 0:
+        return np.empty((0, 0), dtype="U1")
+    length = len(genotypes[0])
+    return genotypes.astype("U{}".format(length)).view("U1").reshape(-1, length)
+
+
+class GenotypeEncoder(object):
+    """Encode genotypes as integer arrays and look them up by hashed code.
+
+    Each site is encoded as the position of its character in the
+    ``mutations`` alphabet of that site. Rows are then collapsed into a single
+    mixed-radix integer key (or a raw byte key, if the sequence space is too
+    large for a 64-bit integer) that is kept sorted for fast lookup.
+
+    Parameters
+    ----------
+    genotypes : array-like of str
+        genotypes in the order of the genotype-phenotype map.
+    mutations : dict
+        mutations dictionary from a genotype-phenotype map.
+    """
+    def __init__(self, genotypes, mutations):
+        chars = genotypes_to_chars(genotypes)
+        self.length = len(mutations)
+
+        # Build the alphabet of each site. Sites without mutations still get
+        # an alphabet (whatever characters are observed there) so that
+        # genotypes differing at those sites are not confused.
+        self.alphabets = []
+        self.mutable = []
+        for i in range(self.length):
+            if mutations[i] is not None:
+                alphabet = [str(a) for a in mutations[i]]
+                self.mutable.append(True)
+            else:
+                alphabet = [str(a) for a in np.unique(chars[:, i])]
+                self.mutable.append(False)
+            self.alphabets.append(alphabet)
+
+        self._setup()
+
+        self.codes = self.encode_chars(chars)
+        self.keys = self.to_keys(self.codes)
+        self._order = np.argsort(self.keys, kind="stable")
+        self._sorted = self.keys[self._order]
+
+    @classmethod
+    def from_state(cls, alphabets, mutable, codes, keys, order, sorted_keys):
+        """Rebuild an encoder from the arrays of ``state()`` without
+        re-encoding any genotype."""
+        self = cls.__new__(cls)
+        self.length = len(alphabets)
+        self.alphabets = [list(alphabet) for alphabet in alphabets]
+        self.mutable = [bool(m) for m in mutable]
+        self._setup()
+        self.codes = codes
+        self.keys = keys
+        self._order = order
+        self._sorted = sorted_keys
+        return self
+
+    def state(self):
+        """Alphabets, mutable flags and the code and key arrays needed by
+        ``from_state``."""
+        return dict(alphabets=self.alphabets, mutable=self.mutable, codes=self.codes,
+                    keys=self.keys, order=self._order, sorted_keys=self._sorted)
+
+    def _setup(self):
+        """Radices, key strides and neighbor mutations of the alphabets."""
+        self.radices = np.array([len(a) for a in self.alphabets], dtype=np.int64)
+        self.dtype = np.min_scalar_type(max(self.radices.max(initial=1) - 1, 1))
+
+        # Mixed-radix strides. Fall back to byte keys on overflow.
+        strides = [1] * self.length
+        total = 1
+        for i in range(self.length - 1, -1, -1):
+            strides[i] = total
+            total *= int(self.radices[i])
+        self.integer_keys = total < 2 ** 62
+        if not self.integer_keys:
+            strides = [0] * self.length
+        self.strides = np.array(strides, dtype=np.int64)
+
+        # Flattened list of (site, allele) mutations in neighbor order.
+        sites, alleles = [], []
+        for i in range(self.length):
+            if self.mutable[i]:
+                for a in range(self.radices[i]):
+                    sites.append(i)
+                    alleles.append(a)
+        self.mutation_sites = np.array(sites, dtype=np.int64)
+        self.mutation_alleles = np.array(alleles, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def encode_chars(self, chars):
+        """Encode a 2d array of characters as a 2d array of allele codes."""
+        codes = np.empty(chars.shape, dtype=self.dtype)
+        for i, alphabet in enumerate(self.alphabets):
+            lookup = {char: code for code, char in enumerate(alphabet)}
+            uniques, inverse = np.unique(chars[:, i], return_inverse=True)
+            try:
+                mapped = np.array([lookup[u] for u in uniques], dtype=self.dtype)
+            except KeyError as e:
+                raise ValueError(
+                    "{} is not a valid character at site {}.".format(e, i))
+            codes[:, i] = mapped[inverse.ravel()]
+        return codes
+
+    def encode(self, genotypes):
+        """Encode a sequence of genotype strings as allele codes."""
+        return self.encode_chars(genotypes_to_chars(genotypes))
+
+    def decode(self, codes):
+        """Convert a 2d array of allele codes back to genotype strings."""
+        codes = np.atleast_2d(codes)
+        chars = np.empty(codes.shape, dtype="U1")
+        for i, alphabet in enumerate(self.alphabets):
+            chars[:, i] = np.array(alphabet)[codes[:, i]]
+        if chars.shape[1] == 0:
+            return np.full(len(chars), "")
+        # Each row of single characters is one fixed-width string.
+        return chars.view("U{}".format(chars.shape[1])).ravel()
+
+    def to_keys(self, codes):
+        """Collapse 2d allele codes to one hashable key per row."""
+        codes = np.ascontiguousarray(codes)
+        if self.integer_keys:
+            return codes.astype(np.int64) @ self.strides
+        width = codes.shape[1] * codes.dtype.itemsize
+        return codes.view(np.dtype((np.void, width))).ravel()
+
+    def append(self, genotypes):
+        """Encode genotypes and add them as new rows at the end.
+
+        Returns
+        -------
+        rows : 1d int array
+            positions of the new rows.
+        """
+        codes = self.encode(genotypes)
+        keys = self.to_keys(codes)
+        rows = np.arange(len(self.codes), len(self.codes) + len(codes))
+        self.codes = np.concatenate([self.codes, codes])
+        self.keys = np.concatenate([self.keys, keys])
+
+        # Merge into the sorted keys; new rows go after equal keys so the
+        # last row still wins in lookup.
+        order = np.argsort(keys, kind="stable")
+        at = np.searchsorted(self._sorted, keys[order], side="right")
+        self._sorted = np.insert(self._sorted, at, keys[order])
+        self._order = np.insert(self._order, at, rows[order])
+        return rows
+
+    def delete(self, rows):
+        """Remove rows; later rows move up to keep positions contiguous."""
+        deleted = np.zeros(len(self.codes), dtype=bool)
+        deleted[rows] = True
+        remap = np.cumsum(~deleted) - 1
+        self.codes = self.codes[~deleted]
+        self.keys = self.keys[~deleted]
+        keep = ~deleted[self._order]
+        self._order = remap[self._order[keep]]
+        self._sorted = self._sorted[keep]
+
+    def lookup(self, keys):
+        """Return the row of each key in the map, or -1 if it is missing.
+
+        When a genotype appears more than once, the last row wins.
+        """
+        keys = np.asarray(keys)
+        if len(self._sorted) == 0:
+            return np.full(keys.shape, -1, dtype=np.int64)
+        loc = np.searchsorted(self._sorted, keys, side="right") - 1
+        loc = np.clip(loc, 0, len(self._sorted) - 1)
+        found = self._sorted[loc] == keys
+        return np.where(found, self._order[loc], -1)
+
+    def neighbor_keys(self, codes):
+        """Keys of every single-mutation neighbor of each row in ``codes``.
+
+        Returns
+        -------
+        keys : 2d array
+            array of shape (n_rows, n_mutations). Columns follow the order
+            of ``get_neighbors``: site first, then alphabet order.
+        valid : 2d bool array
+            False where the mutation would not change the genotype.
+        """
+        sites = self.mutation_sites
+        alleles = self.mutation_alleles
+        current = codes[:, sites].astype(np.int64)
+        valid = current != alleles[None, :]
+
+        if self.integer_keys:
+            base = self.to_keys(codes)
+            keys = base[:, None] + (alleles[None, :] - current) * self.strides[sites][None, :]
+        else:
+            rows = np.repeat(codes[:, None, :], len(sites), axis=1)
+            rows[:, np.arange(len(sites)), sites] = alleles.astype(codes.dtype)
+            keys = self.to_keys(rows.reshape(-1, codes.shape[1])).reshape(len(codes), len(sites))
+        return keys, valid
+
+    def neighbors(self, rows=None, chunksize=None):
+        """Find all single-mutation neighbors present in the map.
+
+        Parameters
+        ----------
+        rows : array-like of int, optional
+            rows to find neighbors for (default: every row).
+        chunksize : int, optional
+            number of rows processed at once (default: fit ``BLOCKSIZE``).
+
+        Returns
+        -------
+        sources, targets : 1d int arrays
+            positional indices of every (source, neighbor) pair, ordered by
+            source and then as in ``get_neighbors``.
+        """
+        if rows is None:
+            rows = np.arange(len(self.codes))
+        rows = np.asarray(rows, dtype=np.int64)
+        if chunksize is None:
+            chunksize = max(1, BLOCKSIZE // max(len(self.mutation_sites), 1))
+
+        sources, targets = [], []
+        for start in range(0, len(rows), chunksize):
+            block = rows[start:start + chunksize]
+            keys, valid = self.neighbor_keys(self.codes[block])
+            found = self.lookup(keys)
+            mask = valid & (found >= 0)
+            sources.append(np.broadcast_to(block[:, None], mask.shape)[mask])
+            targets.append(found[mask])
+
+        if len(sources) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(sources), np.concatenate(targets)
@@ -0,0 +1,219 @@
+__doc__ = """
+Flux analytics on arrays aligned with the graph's edge index.
+
+Edge flux is a 1d array (or an edges x grid points 2d array, e.g. from
+``matrices.edge_probabilities_sweep``) whose rows follow
+``matrices.edge_index(G)``; edges that carry no flux are 0. Node inflow and
+outflow are sparse incidence-matrix products, so nothing loops over nodes or
+edges in Python. ``edge_flux_array`` and ``edge_flux_dict`` convert from and
+to the ``{(u, v): flux}`` dicts used by ``gpgraph.paths``.
+
+The edge index and incidence matrices come from the graph's render cache
+(``gpgraph.geometry``), so repeated calls on one graph build them once.
+"""
+
+import itertools
+
+import numpy as np
+from scipy import sparse
+
+from . import geometry
+from .attributes import MISSING
+from .matrices import edges_to_csr
+
+
+def edge_ids(G, sources, targets):
+    """Edge index row of every (source, target) position pair (-1 if absent)."""
+    n = len(G.gpm.data)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    edge_sources, edge_targets = geometry.edges(G)
+    if len(edge_sources) == 0:
+        return np.full(len(sources), -1, dtype=np.int64)
+    keys = edge_sources.astype(np.int64) * n + edge_targets
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    query = sources * n + targets
+    loc = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    found = (keys[loc] == query) & (sources >= 0) & (targets >= 0)
+    return np.where(found, order[loc], -1)
+
+
+def edge_flux_array(G, edge_flux=None):
+    """Edge flux as an array aligned with ``matrices.edge_index(G)``.
+
+    Parameters
+    ----------
+    edge_flux : dict, optional
+        edge tuples (node indices) as keys and flux as values, e.g. from
+        ``paths.forward_edges_flux``. Values may be arrays over a grid.
+        Defaults to the edges' 'capacity' attribute (0 where unset).
+
+    Returns
+    -------
+    flux : 1d or 2d array
+        flux of every edge; edges missing from ``edge_flux`` get 0.
+    """
+    n_edges = len(geometry.edges(G)[0])
+    if edge_flux is None:
+        capacity = getattr(G, "_edge_columns", {}).get("capacity")
+        if capacity is None:
+            return np.zeros(n_edges)
+        if capacity.dtype == object:
+            capacity = np.array([0.0 if c is MISSING or c is None else c for c in capacity], dtype=float)
+        return np.asarray(capacity, dtype=float)
+
+    flux = np.zeros(n_edges)
+    if len(edge_flux) == 0:
+        return flux
+    index = G.gpm.data.index
+    sources, targets = zip(*edge_flux.keys())
+    ids = edge_ids(G, index.get_indexer(list(sources)), index.get_indexer(list(targets)))
+    if np.any(ids < 0):
+        raise ValueError("edge_flux has edges that are not in G.")
+    values = np.array(list(edge_flux.values()), dtype=float)
+    if values.ndim > 1:
+        flux = np.zeros((n_edges,) + values.shape[1:])
+    np.add.at(flux, ids, values)
+    return flux
+
+
+def edge_flux_dict(G, flux, nonzero=True):
+    """Convert an edge flux array back to a ``{(u, v): flux}`` dict.
+
+    Parameters
+    ----------
+    flux : 1d or 2d array
+        flux aligned with ``matrices.edge_index(G)``.
+    nonzero : bool (default=True)
+        leave out edges without flux.
+    """
+    flux = np.asarray(flux)
+    sources, targets = geometry.edges(G)
+    keep = np.ones(len(sources), dtype=bool)
+    if nonzero:
+        keep = (flux != 0) if flux.ndim == 1 else np.any(flux != 0, axis=1)
+    index = G.gpm.data.index.to_numpy()
+    edges = zip(index[sources[keep]].tolist(), index[targets[keep]].tolist())
+    values = flux[keep].tolist() if flux.ndim == 1 else list(flux[keep])
+    return dict(zip(edges, values))
+
+
+def paths_flux_array(G, paths_prob):
+    """Edge flux summed over paths, as an array aligned with the edge index.
+
+    Parameters
+    ----------
+    paths_prob : dict, or iterable of PathChunk
+        paths (tuples of node indices) as keys and probabilities as values,
+        e.g. from ``paths.forward_paths_prob``, or a stream from
+        ``paths.iter_forward_paths_prob``.
+    """
+    flux = np.zeros(len(geometry.edges(G)[0]))
+    if isinstance(paths_prob, dict):
+        lengths = np.fromiter((len(path) for path in paths_prob), dtype=np.int64, count=len(paths_prob))
+        probs = np.fromiter(paths_prob.values(), dtype=float, count=len(paths_prob))
+        chunks = [(list(itertools.chain.from_iterable(paths_prob)), lengths, probs)]
+    else:
+        chunks = ((np.ravel(chunk.paths), np.full(len(chunk.probs), np.shape(chunk.paths)[1]), chunk.probs)
+                  for chunk in paths_prob)
+
+    index = G.gpm.data.index
+    for labels, lengths, probs in chunks:
+        if len(lengths) == 0:
+            continue
+        nodes = index.get_indexer(labels)
+        # Every node but the last of each path starts an edge.
+        starts = np.ones(len(nodes), dtype=bool)
+        starts[np.cumsum(lengths) - 1] = False
+        steps = np.flatnonzero(starts)
+        ids = edge_ids(G, nodes[steps], nodes[steps + 1])
+        if np.any(ids < 0):
+            raise ValueError("paths_prob has edges that are not in G.")
+        flux += np.bincount(ids, weights=np.repeat(probs, lengths - 1), minlength=len(flux))
+    return flux
+
+
+def flux_matrix(G, flux):
+    """Edge flux as a sparse n x n matrix (1d flux only)."""
+    sources, targets = geometry.edges(G)
+    return edges_to_csr(sources, targets, flux, len(G.gpm.data))
+
+
+def _incidence(G, end):
+    """Sparse n x edges matrix with a 1 at (node, edge) for the edges'
+    sources (end=0) or targets (end=1)."""
+    def compute():
+        ends = geometry.edges(G)[end]
+        n = len(G.gpm.data)
+        return sparse.csr_matrix((np.ones(len(ends)), (ends, np.arange(len(ends)))), shape=(n, len(ends)))
+    return geometry.cached(G, "incidence", (end,), compute)
+
+
+def node_inflow(G, flux):
+    """Total flux into every node, in the order of ``gpm.data``."""
+    return np.asarray(_incidence(G, 1) @ np.asarray(flux, dtype=float))
+
+
+def node_outflow(G, flux):
+    """Total flux out of every node, in the order of ``gpm.data``."""
+    return np.asarray(_incidence(G, 0) @ np.asarray(flux, dtype=float))
+
+
+def net_flux(G, flux):
+    """Inflow minus outflow of every node."""
+    return node_inflow(G, flux) - node_outflow(G, flux)
+
+
+def conservation_violations(G, flux, source, target, atol=1e-9):
+    """Nodes other than source and target whose inflow and outflow differ.
+
+    Parameters
+    ----------
+    flux : 1d or 2d array
+        flux aligned with ``matrices.edge_index(G)``.
+    source, target :
+        genotypes, binary genotypes or node indices of the flux endpoints.
+    atol : float
+        allowed absolute difference.
+
+    Returns
+    -------
+    nodes : 1d array
+        node indices where flux is not conserved (empty if conserved).
+    """
+    from .paths import _resolve_positions
+
+    endpoints = _resolve_positions(G, [source, target])
+    net = net_flux(G, flux)
+    bad = np.abs(net) > atol
+    if bad.ndim > 1:
+        bad = bad.any(axis=1)
+    bad[endpoints] = False
+    return G.gpm.data.index.to_numpy()[bad]
+
+
+def rank_edges(G, flux, k=None):
+    """Edges with the most flux, largest first.
+
+    Parameters
+    ----------
+    flux : 1d array
+        flux aligned with ``matrices.edge_index(G)``.
+    k : int, optional
+        number of edges to return (default: all edges with flux).
+
+    Returns
+    -------
+    ranking : list of tuples
+        ((u, v), flux) pairs, u and v as node indices.
+    """
+    flux = np.asarray(flux, dtype=float)
+    candidates = np.flatnonzero(flux)
+    if k is not None and k < len(candidates):
+        candidates = np.sort(candidates[np.argpartition(-flux[candidates], k - 1)[:k]])
+    top = candidates[np.argsort(-flux[candidates], kind="stable")]
+    sources, targets = geometry.edges(G)
+    index = G.gpm.data.index.to_numpy()
+    edges = zip(index[sources[top]].tolist(), index[targets[top]].tolist())
+    return list(zip(edges, flux[top].tolist()))
@@ -0,0 +1,87 @@
+__doc__ = """
+Cached render geometry: node layouts, edge index arrays and path flux.
+
+Each graph keeps a small LRU cache (``G._render_cache``) of the arrays the
+drawing functions need. Entries are keyed on the graph version (see
+``GenotypePhenotypeGraph.version``) and on their inputs, so drawing the same
+graph again with different styling only redoes the matplotlib work, while
+any change to the map, its phenotypes or the edge probabilities makes new
+entries. Cached arrays are read-only.
+"""
+
+import numpy as np
+
+from .matrices import edge_index, edge_probabilities
+from .paths import shortest_path_flux
+
+
+def cached(G, name, inputs, compute):
+    """Return ``compute()``, cached on G under (name, G.version, inputs).
+
+    Graphs without a render cache (or unhashable inputs) always compute.
+    """
+    cache = getattr(G, "_render_cache", None)
+    key = (name, G.version, inputs)
+    try:
+        hash(key)
+    except TypeError:
+        cache = None
+    if cache is None:
+        return compute()
+
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+        return value
+    value = compute()
+    for array in value if isinstance(value, tuple) else (value,):
+        if isinstance(array, np.ndarray):
+            array.flags.writeable = False
+    # Versions are drawn from a global counter and never reused, so a
+    # drawing keyed on an earlier version is unreachable once G changes.
+    for stale in [k for k in cache if k[1] != key[1]]:
+        del cache[stale]
+    cache[key] = value
+    while len(cache) > G.render_cache_size:
+        cache.popitem(last=False)
+    return value
+
+
+def layout(G, scale=1, vertical=False):
+    """Flattened node positions as an (n, 2) array (see ``flattened_array``)."""
+    from .layout import flattened_array
+    return cached(G, "layout", (scale, vertical),
+                  lambda: flattened_array(G, scale=scale, vertical=vertical))
+
+
+def edges(G):
+    """Positional (sources, targets) of all edges (see ``matrices.edge_index``)."""
+    return cached(G, "edges", (), lambda: tuple(np.array(a) for a in edge_index(G)))
+
+
+def path_flux(G, source, target):
+    """Flux through the edges of all forward paths from source to target.
+
+    Parameters
+    ----------
+    source, target :
+        genotypes, binary genotypes or node indices.
+
+    Returns
+    -------
+    sources, targets : 1d int arrays
+        positions of the endpoints of the edges on a forward path.
+    flux : 1d array
+        flux through each of those edges, as in ``paths.forward_edges_flux``.
+    """
+    from .paths import _resolve_positions
+
+    start, stop = _resolve_positions(G, [source, target]).tolist()
+
+    def compute():
+        sources, targets = edges(G)
+        flux, _, on_dag = shortest_path_flux(sources, targets, edge_probabilities(G),
+                                             len(G.gpm.data), start, stop)
+        return sources[on_dag], targets[on_dag], flux[on_dag]
+
+    return cached(G, "path_flux", (start, stop), compute)
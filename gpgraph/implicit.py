@@ -0,0 +1,266 @@
+__doc__ = """
+Implicit genotype-phenotype graphs for sequence spaces too large to
+materialize as networkx dictionaries.
+
+Nodes, neighbors and edge probabilities are generated on demand from the
+genotype-phenotype map, so memory stays close to the size of the map itself.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+from networkx import DiGraph
+
+from .attributes import ColumnStore, RowView
+from .base import GenotypePhenotypeGraph, TopologyError
+from .compat import Mapping
+from .encoding import GenotypeEncoder
+from .models import strong_selection_weak_mutation, evaluate_model
+
+
+class _NodeMap(Mapping):
+    """Node index -> RowView of the gpm columns, built on access."""
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getitem__(self, node):
+        if not self._graph._has_node(node):
+            raise KeyError(node)
+        return RowView(self._graph._columns, self._graph._position(node))
+
+    def __contains__(self, node):
+        return self._graph._has_node(node)
+
+    def __iter__(self):
+        return iter(self._graph._labels.tolist())
+
+    def __len__(self):
+        return len(self._graph._labels)
+
+
+class _EdgeAttributes(Mapping):
+    """Edge attributes; 'prob' is computed from the model when accessed."""
+    __slots__ = ("_graph", "_edge")
+
+    def __init__(self, graph, edge):
+        self._graph = graph
+        self._edge = edge
+
+    def __getitem__(self, key):
+        if key != "prob" or self._graph.model is None:
+            raise KeyError(key)
+        return self._graph._edge_prob(*self._edge)
+
+    def __iter__(self):
+        if self._graph.model is not None:
+            yield "prob"
+
+    def __len__(self):
+        return int(self._graph.model is not None)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _Neighbors(Mapping):
+    """Neighbor index -> edge attributes for one node."""
+    __slots__ = ("_graph", "_node", "_neighbors")
+
+    def __init__(self, graph, node):
+        self._graph = graph
+        self._node = node
+        self._neighbors = graph._neighbors(node)
+
+    def __getitem__(self, neighbor):
+        if neighbor not in self._neighbors:
+            raise KeyError(neighbor)
+        return _EdgeAttributes(self._graph, (self._node, neighbor))
+
+    def __contains__(self, neighbor):
+        return neighbor in self._neighbors
+
+    def __iter__(self):
+        return iter(self._neighbors)
+
+    def __len__(self):
+        return len(self._neighbors)
+
+
+class _Adjacency(Mapping):
+    """Node index -> _Neighbors. Mutational neighbors are symmetric, so the
+    same mapping serves as successors and predecessors."""
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getitem__(self, node):
+        if not self._graph._has_node(node):
+            raise KeyError(node)
+        return _Neighbors(self._graph, node)
+
+    def __contains__(self, node):
+        return self._graph._has_node(node)
+
+    def __iter__(self):
+        return iter(self._graph._labels.tolist())
+
+    def __len__(self):
+        return len(self._graph._labels)
+
+
+def _read_only(self, *args, **kwargs):
+    raise TopologyError(
+        "ImplicitGenotypePhenotypeGraph generates its edges from its gpm; use "
+        "add_genotypes and remove_genotypes.")
+
+
+class ImplicitGenotypePhenotypeGraph(GenotypePhenotypeGraph):
+    """GenotypePhenotypeGraph whose nodes and edges are never materialized.
+
+    Neighbors are generated from the ``gpm.mutations`` alphabet when a node
+    is visited, node attributes are read from the ``gpm.data`` columns and
+    edge probabilities are computed from the model when accessed. The
+    networkx read API (``G[n]``, ``G.nodes[n]``, ``G.edges[e]``,
+    ``G.successors(n)``, ...) works as usual, so path and drawing functions
+    accept implicit graphs.
+
+    Parameters
+    ----------
+    gpm : GenotypePhenotypeMap
+        genotype-phenotype map to wrap.
+    cache_size : int (default=2**20)
+        maximum number of edge probabilities to keep. 0 disables the cache.
+    """
+    add_node = _read_only
+    add_nodes_from = _read_only
+    add_edge = _read_only
+    add_edges_from = _read_only
+    add_weighted_edges_from = _read_only
+    remove_node = _read_only
+    remove_nodes_from = _read_only
+    remove_edge = _read_only
+    remove_edges_from = _read_only
+    clear = _read_only
+    clear_edges = _read_only
+    update = _read_only
+
+    def __init__(self, gpm, cache_size=2 ** 20, *args, **kwargs):
+        self.cache_size = cache_size
+        self.model = None
+        self.model_params = {}
+        self._cache = OrderedDict()
+        super(ImplicitGenotypePhenotypeGraph, self).__init__(gpm, *args, **kwargs)
+
+    def add_gpm(self, gpm, edges=None, encoder=None):
+        """Attach a GenotypePhenotypeMap without building nodes or edges.
+
+        ``edges`` is accepted for compatibility and ignored.
+        """
+        self.gpm = gpm
+        self._edge_columns = ColumnStore(0)
+        if encoder is None:
+            encoder = GenotypeEncoder(self.gpm.data.genotypes, self.gpm.mutations)
+        self.encoder = encoder
+        self._refresh()
+
+        adjacency = _Adjacency(self)
+        self._node = _NodeMap(self)
+        self._adj = adjacency
+        self._succ = adjacency
+        self._pred = adjacency
+
+    def add_model(self, model=strong_selection_weak_mutation, **params):
+        """Set the transition model used to compute edge probabilities."""
+        self.model = staticmethod(model)
+        self.model_params = params
+        self._cache.clear()
+        # Edge probabilities changed; see ``version``.
+        self._edge_columns.touch()
+
+    def update_phenotypes(self, nodes, phenotypes):
+        """Set the phenotypes of some nodes."""
+        self._set_phenotypes(self._node_positions(nodes), phenotypes)
+        self._refresh()
+
+    def add_genotypes(self, genotypes, phenotypes, stdeviations=None):
+        """Add genotypes to the map. Returns their node indices."""
+        genotypes = [str(g) for g in genotypes]
+        if not genotypes:
+            return []
+        self._check_new_genotypes(genotypes)
+        nodes = self._append_data(genotypes, phenotypes, stdeviations)
+        self.encoder.append(genotypes)
+        self._refresh()
+        return nodes
+
+    def remove_genotypes(self, nodes):
+        """Remove genotypes from the map."""
+        nodes = list(nodes)
+        if not nodes:
+            return
+        positions = self._node_positions(nodes)
+        self._drop_data(positions)
+        self.encoder.delete(positions)
+        self._refresh()
+
+    def _refresh(self):
+        """Point node lookups and columns at the current ``gpm.data``."""
+        data = self.gpm.data
+        self._labels = data.index.to_numpy()
+        # Node indices are positions for the default index; otherwise keep
+        # a lookup table from index to position.
+        self._positions = None
+        if not np.array_equal(self._labels, np.arange(len(self._labels))):
+            self._positions = {node: i for i, node in enumerate(self._labels.tolist())}
+        self._columns = ColumnStore(len(self._labels), {key: data[key].to_numpy() for key in data.columns})
+        self._phenotypes = np.asarray(self._columns["phenotypes"], dtype=float)
+        self._cache.clear()
+        self._n_edges = None
+
+    def number_of_edges(self, u=None, v=None):
+        """Return the number of edges, or of edges from u to v.
+
+        The total is counted from the encoder's neighbor search once per
+        change of genotypes.
+        """
+        if u is not None:
+            return DiGraph.number_of_edges(self, u, v)
+        if self._n_edges is None:
+            self._n_edges = len(self.encoder.neighbors()[0])
+        return self._n_edges
+
+    def _has_node(self, node):
+        if self._positions is not None:
+            return node in self._positions
+        try:
+            return 0 <= node < len(self._labels) and int(node) == node
+        except TypeError:
+            return False
+
+    def _position(self, node):
+        if self._positions is not None:
+            return self._positions[node]
+        return node
+
+    def _neighbors(self, node):
+        """Node indices of the single-mutation neighbors of node."""
+        position = self._position(node)
+        keys, valid = self.encoder.neighbor_keys(self.encoder.codes[position:position + 1])
+        found = self.encoder.lookup(keys[valid])
+        return self._labels[found[found >= 0]].tolist()
+
+    def _edge_prob(self, node1, node2):
+        """Model probability of the edge, read from or added to the cache."""
+        edge = (node1, node2)
+        if edge in self._cache:
+            self._cache.move_to_end(edge)
+            return self._cache[edge]
+
+        phenotype1 = self._phenotypes[self._position(node1)]
+        phenotype2 = self._phenotypes[self._position(node2)]
+        prob = float(evaluate_model(self.model, phenotype1, phenotype2, **self.model_params))
+
+        if self.cache_size:
+            self._cache[edge] = prob
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return prob
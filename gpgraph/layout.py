@@ -0,0 +1,91 @@
+__doc__ = """
+Compute the positions of nodes in a flattened genotype-phenotype map.
+
+Layouts only need NumPy, so they are available without matplotlib; see
+``gpgraph.pyplot`` for drawing.
+"""
+
+import numpy as np
+
+from . import geometry
+from .stats import instrument
+
+
+def hamming_levels(G):
+    """Number of mutations from wildtype of every node, in the order of ``gpm.data``.
+
+    Computed from the integer-encoded genotypes, so it works for binary and
+    multi-allelic alphabets alike.
+    """
+    encoder = G.encoder
+    wildtype = encoder.encode([G.gpm.wildtype])[0]
+    return np.count_nonzero(encoder.codes != wildtype, axis=1)
+
+
+@instrument("flattened", nodes=lambda G, positions: len(positions))
+def flattened_array(G, scale=1, vertical=False):
+    """Get flattened positions for a genotype-phenotype graph as an array.
+
+    Nodes are placed on levels by their Hamming distance to the wildtype,
+    and spread out, centered on 0, within each level in the order of
+    ``gpm.data``.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph object
+        A genotype-phenotype objects
+    scale : float (default=1)
+        density of the nodes.
+    vertical : bool (default=False)
+        put levels along the (negative) y-axis instead of the x-axis.
+
+    Returns
+    -------
+    positions : 2d array
+        array of shape (n, 2) with the [x, y] of every node, in the order of
+        ``gpm.data``.
+    """
+    levels = hamming_levels(G)
+    counts = np.bincount(levels)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # Rank of each node within its level, keeping the order of gpm.data.
+    order = np.argsort(levels, kind="stable")
+    ranks = np.empty(len(levels), dtype=np.int64)
+    ranks[order] = np.arange(len(levels)) - starts[levels[order]]
+    offsets = scale * (ranks - (counts[levels] - 1) / 2.0)
+
+    positions = np.empty((len(levels), 2))
+    if vertical:
+        positions[:, 0] = offsets
+        positions[:, 1] = -levels
+    else:
+        positions[:, 0] = levels
+        positions[:, 1] = offsets
+    return positions
+
+
+def flattened(G, scale=1, vertical=False):
+    """Get flattened positions for a genotype-phenotype graph.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph object
+        A genotype-phenotype objects
+    scale : float (default=1)
+        density of the nodes.
+    vertical : bool (default=False)
+        put levels along the (negative) y-axis instead of the x-axis.
+
+    Returns
+    -------
+    positions: dict
+        positions of all nodes in network (i.e. {index: [x,y]})
+
+    See Also
+    --------
+    flattened_array : the same positions as an (n, 2) array.
+    geometry.layout : cached ``flattened_array``.
+    """
+    positions = geometry.layout(G, scale=scale, vertical=vertical)
+    return dict(zip(G.gpm.data.index.tolist(), positions.tolist()))
@@ -0,0 +1,143 @@
+__doc__ = """
+Absorbing Markov chain analysis of evolution on a genotype-phenotype graph.
+
+Chosen target genotypes are made absorbing. Absorption probabilities and
+expected hitting times from every starting genotype then follow from one
+sparse linear solve over the remaining (transient) genotypes.
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg
+
+from .matrices import stochastic_matrix
+from .paths import bfs_distances, _resolve_positions
+
+
+# Largest number of transient genotypes for which method="auto" falls back
+# to a sparse LU factorization when the iterative solver does not converge
+# (e.g. on nearly-neutral traps). LU fill-in grows quickly on sequence spaces.
+DIRECT_LIMIT = 20000
+
+# Iteration budget of the iterative solver.
+MAXITER = 1000
+
+
+def _resolve_targets(G, targets):
+    """Row positions of genotypes, binary genotypes or node indices.
+
+    Raises ValueError if a target is not a node of G.
+    """
+    return _resolve_positions(G, np.atleast_1d(targets).tolist()).astype(np.int64)
+
+
+def _iterative_solve(A, b, tol):
+    """Solve A x = b column by column with GMRES."""
+    b = np.asarray(b, dtype=float)
+    columns = b.reshape(len(b), -1)
+    x = np.empty(columns.shape)
+    options = dict(atol=0, restart=MAXITER // 10, maxiter=10)
+    for k in range(columns.shape[1]):
+        try:
+            x[:, k], info = linalg.gmres(A, columns[:, k], rtol=tol, **options)
+        except TypeError:
+            x[:, k], info = linalg.gmres(A, columns[:, k], tol=tol, **options)
+        if info != 0:
+            raise RuntimeError(
+                "Iterative solver did not converge (info={}). "
+                "Try method='direct'.".format(info))
+    return x.reshape(b.shape)
+
+
+def absorption(G, targets, model=None, jump_chain=False, method="auto", tol=1e-10, **params):
+    """Absorption probabilities and hitting times for a set of target genotypes.
+
+    Every target is treated as an absorbing state of the Markov chain built
+    by ``stochastic_matrix``. Genotypes that cannot reach any target get an
+    absorption probability of zero and an infinite hitting time.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph to analyze.
+    targets : genotype, binary genotype, node index, or list of them
+        absorbing genotypes.
+    model : callable, optional
+        fixation model. Defaults to the model added with ``G.add_model``.
+    jump_chain : bool (default=False)
+        count substitutions only; see ``stochastic_matrix``.
+    method : str (default="auto")
+        "direct" (sparse LU), "iterative" (GMRES) or "auto" (iterative,
+        falling back to direct on small chains if it does not converge).
+    tol : float
+        relative tolerance of the iterative solver.
+    **params :
+        extra parameters passed to the model.
+
+    Returns
+    -------
+    probs : 2d array
+        array of shape (n_genotypes, n_targets). probs[i, k] is the
+        probability that a population starting at genotype i is absorbed
+        at target k.
+    times : 1d array
+        expected number of steps until absorption at any target from each
+        genotype, conditional on being absorbed.
+    """
+    targets = _resolve_targets(G, targets)
+    P = stochastic_matrix(G, model=model, jump_chain=jump_chain, **params)
+    n = P.shape[0]
+
+    # Only genotypes that can reach a target through non-zero transitions
+    # are transient; everything else is never absorbed.
+    reachable = P.copy()
+    reachable.setdiag(0)
+    reachable.eliminate_zeros()
+    can_reach = bfs_distances(reachable.T, targets) >= 0
+    is_target = np.zeros(n, dtype=bool)
+    is_target[targets] = True
+    transient = np.nonzero(can_reach & ~is_target)[0]
+
+    probs = np.zeros((n, len(targets)))
+    probs[targets, np.arange(len(targets))] = 1
+    times = np.full(n, np.inf)
+    times[targets] = 0
+
+    if len(transient) == 0:
+        return probs, times
+
+    # (I - Q) B = R for absorption, (I - Q) w = B 1 for conditional times.
+    # Rows are divided by the outgoing probability of each genotype (summed
+    # directly rather than as 1 - P_ii) so that nearly-stuck genotypes do
+    # not make the system badly scaled.
+    P_transient = P[transient]
+    offdiag = P_transient.tocoo()
+    keep = transient[offdiag.row] != offdiag.col
+    outflow = np.bincount(offdiag.row[keep], weights=offdiag.data[keep], minlength=len(transient))
+    scale = sparse.diags(1 / outflow)
+    Q = P_transient[:, transient]
+    Q.setdiag(0)
+    R = scale @ P_transient[:, targets].toarray()
+    A = (sparse.identity(len(transient)) - scale @ Q).tocsc()
+
+    if method not in ("auto", "direct", "iterative"):
+        raise ValueError("method must be 'auto', 'direct' or 'iterative'.")
+    if method != "direct":
+        try:
+            B = _iterative_solve(A, R, tol)
+            absorbed = B.sum(axis=1)
+            w = _iterative_solve(A, absorbed / outflow, tol)
+        except RuntimeError:
+            if method == "iterative" or len(transient) > DIRECT_LIMIT:
+                raise
+            method = "direct"
+    if method == "direct":
+        lu = linalg.splu(A, permc_spec="MMD_AT_PLUS_A")
+        B = lu.solve(R)
+        absorbed = B.sum(axis=1)
+        w = lu.solve(absorbed / outflow)
+
+    probs[transient] = np.clip(B, 0, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        times[transient] = np.where(absorbed > 0, w / absorbed, np.inf)
+    return probs, times
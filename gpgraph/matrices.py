@@ -1 +1,198 @@
+__doc__ = """
+Sparse matrix representations of a genotype-phenotype graph.
 
+Rows and columns are positions in ``G.gpm.data.index``; for maps with the
+default integer index, row ``i`` is node ``i``. Edges are generated straight
+from the genotype-phenotype map, so no per-edge networkx attributes are read
+or written.
+"""
+
+import numpy as np
+from scipy import sparse
+
+from .models import strong_selection_weak_mutation, evaluate_model, sweep_model
+
+
+def edge_index(G):
+    """Return the positional source and target of every edge in G.
+
+    Edges are ordered by source and then as they appear in ``G.edges``.
+    Edge attribute columns (``G.edge_array``) follow the same order.
+
+    Returns
+    -------
+    sources, targets : 1d int arrays
+        row positions of the edge endpoints in ``G.gpm.data``.
+    """
+    edges = getattr(G, "_edge_index", None)
+    if edges is None:
+        edges = G.encoder.neighbors()
+    return edges
+
+
+def edges_to_csr(sources, targets, values, n):
+    """Pack edge arrays sorted by source into a CSR matrix.
+
+    The CSR ``data`` array is aligned with the edge arrays (column indices
+    are not re-sorted), so ``matrix.data[k]`` belongs to edge ``k``.
+
+    Parameters
+    ----------
+    sources, targets : 1d int arrays
+        edge endpoints, sorted by source.
+    values : 1d array
+        value stored for each edge.
+    n : int
+        number of nodes.
+
+    Returns
+    -------
+    matrix : scipy.sparse.csr_matrix
+        n x n matrix.
+    """
+    sources = np.asarray(sources)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+    return sparse.csr_matrix(
+        (np.asarray(values), np.asarray(targets), indptr),
+        shape=(n, n)
+    )
+
+
+def edge_probabilities(G, model=None, **params):
+    """Transition probability of every edge in ``edge_index(G)``.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph to score.
+    model : callable, optional
+        fixation model from ``gpgraph.models``. Defaults to the 'prob'
+        column stored by ``G.add_model``, or to strong selection, weak
+        mutation.
+    **params :
+        extra parameters passed to the model.
+
+    Returns
+    -------
+    probs : 1d array
+        probability of each edge.
+    """
+    if model is None and not params and "prob" in getattr(G, "_edge_columns", {}):
+        return G.edge_array("prob")
+
+    sources, targets = edge_index(G)
+    if model is None:
+        model = getattr(G, "model", None) or strong_selection_weak_mutation
+        params = dict(getattr(G, "model_params", {}), **params)
+    phenotypes = np.asarray(G.node_array("phenotypes"), dtype=float)
+    return evaluate_model(model, phenotypes[sources], phenotypes[targets], **params)
+
+
+def edge_probabilities_sweep(G, model=None, **grid):
+    """Transition probability of every edge at every point of a parameter grid.
+
+    The model is evaluated for all edges and grid points in one pass; see
+    ``models.sweep_model``. The result can be passed as ``probs`` to the
+    flux and path functions in ``gpgraph.paths``.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph to score.
+    model : callable, optional
+        fixation model. Defaults to the model added with ``G.add_model``.
+    **grid :
+        1d arrays of parameter values, all of the same length (e.g.
+        ``population_size=np.arange(10, 200)``).
+
+    Returns
+    -------
+    probs : 2d array
+        array of shape (n_edges, n_points), rows in ``edge_index(G)`` order.
+    """
+    sources, targets = edge_index(G)
+    if model is None:
+        model = getattr(G, "model", None) or strong_selection_weak_mutation
+    phenotypes = np.asarray(G.node_array("phenotypes"), dtype=float)
+    return sweep_model(model, phenotypes[sources], phenotypes[targets], **grid)
+
+
+def adjacency_matrix(G, dtype=np.int8):
+    """Sparse adjacency matrix of a GenotypePhenotypeGraph.
+
+    Returns
+    -------
+    adjacency : scipy.sparse.csr_matrix
+        n x n matrix with a one for every edge.
+    """
+    sources, targets = edge_index(G)
+    values = np.ones(len(sources), dtype=dtype)
+    return edges_to_csr(sources, targets, values, len(G.gpm.data))
+
+
+def transition_matrix(G, model=None, **params):
+    """Sparse matrix of transition probabilities between genotypes.
+
+    Entry (i, j) is the model probability of moving from genotype i to its
+    neighbor j, i.e. the value ``add_model`` stores as the edge 'prob'.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph to score.
+    model : callable, optional
+        fixation model from ``gpgraph.models``. Defaults to the model
+        added with ``G.add_model``.
+    **params :
+        extra parameters passed to the model.
+
+    Returns
+    -------
+    transitions : scipy.sparse.csr_matrix
+        n x n matrix of edge probabilities.
+    """
+    sources, targets = edge_index(G)
+    probs = edge_probabilities(G, model=model, **params)
+    return edges_to_csr(sources, targets, probs, len(G.gpm.data))
+
+
+def stochastic_matrix(G, model=None, jump_chain=False, **params):
+    """Row-stochastic Markov chain matrix over the genotypes.
+
+    By default a mutation to one of the ``k`` neighbors of a genotype is
+    proposed uniformly and fixes with the model probability, so
+    ``P[i, j] = p_ij / k_i`` and the remainder stays on the diagonal.
+    With ``jump_chain=True`` only substitutions are counted and each row is
+    normalized by its total outgoing probability instead.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph to score.
+    model : callable, optional
+        fixation model. Defaults to the model added with ``G.add_model``.
+    jump_chain : bool (default=False)
+        normalize by outgoing probability instead of number of neighbors.
+    **params :
+        extra parameters passed to the model.
+
+    Returns
+    -------
+    P : scipy.sparse.csr_matrix
+        n x n matrix whose rows sum to one.
+    """
+    sources, targets = edge_index(G)
+    probs = edge_probabilities(G, model=model, **params)
+    n = len(G.gpm.data)
+
+    if jump_chain:
+        norm = np.bincount(sources, weights=probs, minlength=n)
+    else:
+        norm = np.bincount(sources, minlength=n).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        probs = np.nan_to_num(probs / norm[sources])
+
+    stay = 1 - np.bincount(sources, weights=probs, minlength=n)
+    P = edges_to_csr(sources, targets, probs, n) + sparse.diags(np.clip(stay, 0, 1))
+    return P.tocsr()
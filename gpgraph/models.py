@@ -1,32 +1,114 @@
 import numpy as np
-import math
 
 
 def strong_selection_weak_mutation(fitness1, fitness2):
-    """Strong selection, weak mutation model."""
+    """Strong selection, weak mutation model.
+
+    Accepts scalars or arrays of source and target fitnesses.
+    """
+    fitness1 = np.asarray(fitness1, dtype=float)
+    fitness2 = np.asarray(fitness2, dtype=float)
     sij = (fitness2 - fitness1) / fitness1
-    if sij < 0:
-        sij = 0
-    return 1 - np.exp(-sij)
+    sij = np.maximum(sij, 0)
+    return (1 - np.exp(-sij))[()]
 
 
 def ratio(fitness1, fitness2):
-    sij = fitness1/fitness2
+    sij = np.divide(fitness1, fitness2)
     return sij
 
 
 def moran(fitness1, fitness2, population_size):
-    """From Sella and Hirsh, 2005"""
-    if fitness1 == fitness2:
-        fitness2 = fitness2 - fitness1/1000
+    """From Sella and Hirsh, 2005
 
-    sij = np.nan_to_num((1 - (fitness1 / fitness2)) / (1 - (fitness1 / fitness2) ** population_size))
-    return sij
+    Accepts scalars or arrays of source and target fitnesses. Neutral
+    transitions are nudged off ``fitness1 == fitness2`` to avoid 0/0.
+    """
+    fitness1 = np.asarray(fitness1, dtype=float)
+    fitness2 = np.asarray(fitness2, dtype=float)
+    fitness2 = np.where(fitness1 == fitness2, fitness2 - fitness1 / 1000, fitness2)
+
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        r = fitness1 / fitness2
+        sij = np.nan_to_num((1 - r) / (1 - r ** population_size))
+    return sij[()]
 
 
 def mccandish(fitness1, fitness2, population_size):
-    """From McCandish, 2011"""
-    numer = 1 - math.e**(-2 * (fitness2 - fitness1))
-    denom = 1 - math.e**(-2 * population_size * (fitness2 - fitness1))
-    sij = numer/denom
-    return sij
+    """From McCandish, 2011
+
+    Accepts scalars or arrays of source and target fitnesses. The fixation
+    probability is evaluated in a form that does not overflow for large
+    population sizes, and neutral transitions take the limit 1/N.
+    """
+    fitness1 = np.asarray(fitness1, dtype=float)
+    fitness2 = np.asarray(fitness2, dtype=float)
+    N = np.asarray(population_size, dtype=float)
+    a = -2 * (fitness2 - fitness1)
+
+    # (e^a - 1) / (e^Na - 1). For deleterious steps (a > 0) factor out
+    # e^((N-1)a) so every exponential has a non-positive argument.
+    deleterious = a > 0
+    b = np.where(deleterious, -a, a)
+    with np.errstate(divide="ignore", over="ignore", under="ignore", invalid="ignore"):
+        sij = np.expm1(b) / np.expm1(N * b)
+        sij = np.where(deleterious, np.exp(a * (1 - N)) * sij, sij)
+        sij = np.where(a == 0, 1 / N, sij)
+    return sij[()]
+
+
+def evaluate_model(model, fitness1, fitness2, **params):
+    """Evaluate a transition model over arrays of fitnesses.
+
+    Models in this module take arrays directly. Scalar-only models (e.g. ones
+    with an ``if`` on the fitness values) are evaluated element-wise instead.
+    """
+    model = getattr(model, "__func__", model)
+    fitness1 = np.asarray(fitness1, dtype=float)
+    fitness2 = np.asarray(fitness2, dtype=float)
+    try:
+        probs = np.asarray(model(fitness1, fitness2, **params), dtype=float)
+        if probs.shape == np.broadcast(fitness1, fitness2).shape:
+            return probs
+    except (ValueError, TypeError):
+        pass
+    evaluate = np.vectorize(model, otypes=[float])
+    return evaluate(fitness1, fitness2, **params)
+
+
+def sweep_model(model, fitness1, fitness2, **grid):
+    """Evaluate a transition model over a grid of parameter values at once.
+
+    Parameters
+    ----------
+    model : callable
+        fixation model, e.g. ``moran`` or ``mccandish``.
+    fitness1, fitness2 : 1d arrays
+        source and target fitnesses.
+    **grid :
+        1d arrays of parameter values, all of the same length. Point ``k``
+        of the grid uses the ``k``-th value of every array.
+
+    Returns
+    -------
+    probs : 2d array
+        array of shape (len(fitness1), n_points).
+    """
+    model = getattr(model, "__func__", model)
+    fitness1 = np.asarray(fitness1, dtype=float)[:, None]
+    fitness2 = np.asarray(fitness2, dtype=float)[:, None]
+    grid = {key: np.atleast_1d(values)[None, :] for key, values in grid.items()}
+    sizes = {values.shape[1] for values in grid.values()}
+    if len(sizes) > 1:
+        raise ValueError("Parameter grids must all have the same length.")
+    shape = (fitness1.shape[0], sizes.pop() if sizes else 1)
+
+    # Models in this module broadcast a row of parameters against a column
+    # of fitnesses. Scalar-only models are evaluated element-wise instead.
+    try:
+        probs = np.asarray(model(fitness1, fitness2, **grid), dtype=float)
+        return np.array(np.broadcast_to(probs, shape))
+    except (ValueError, TypeError):
+        pass
+    evaluate = np.vectorize(model, otypes=[float])
+    return np.array(np.broadcast_to(evaluate(fitness1, fitness2, **grid), shape))
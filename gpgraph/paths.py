@@ -1,11 +1,55 @@
-from collections import Counter
+from collections import Counter, namedtuple
+import heapq
+import itertools
+import math
+import numpy as np
 import networkx as nx
+import pandas as pd
+from scipy import sparse
 
+from .stats import instrument
 
-def forward_paths(G, source, target):
+
+# One block of a path stream: a 2d array of paths (one row per path,
+# labeled by node index) and a 1d array of their probabilities.
+PathChunk = namedtuple("PathChunk", ["paths", "probs"])
+
+# Results of batch_forward_paths, one entry (or column) per pair.
+PairPaths = namedtuple("PairPaths", ["prob", "length", "flux"])
+
+
+def _resolve_nodes(G, source, target):
+    """Convert source and target to node indices.
+
+    Source and target can be genotypes, binary genotypes or node indices.
+    """
+    # Get source and target from G. Is it genotype, binary, or node number
+    labels = G.gpm.data.index.tolist()
+    if source in G.gpm.genotypes:
+        series = list(G.gpm.genotypes)
+        source = labels[series.index(source)]
+        target = labels[series.index(target)]
+
+    elif source in G.gpm.binary:
+        series = list(G.gpm.binary)
+        source = labels[series.index(source)]
+        target = labels[series.index(target)]
+
+    return source, target
+
+
+@instrument("forward_paths", paths=lambda G, paths: len(paths))
+def forward_paths(G, source, target, workers=None):
     """Return all forward paths from source genotype to
     target genotype.
 
+    Parameters
+    ----------
+    workers : int, optional
+        number of processes used to enumerate paths. Paths are split on
+        their first step out of source. -1 uses every CPU; None or 1 runs
+        in this process.
+
     Returns
     -------
     paths : List of path
@@ -16,24 +60,26 @@ def forward_paths(G, source, target):
     if not isinstance(G, GenotypePhenotypeGraph):
         raise Exception("G must be a GenotypePhenotypeGraph.")
 
-    # Get source and target from G. Is it genotype, binary, or node number
-    if source in G.gpm.genotypes:
-        series = list(G.gpm.genotypes)
-        source = series.index(source)
-        target = series.index(target)
-
-    elif source in G.gpm.binary:
-        series = list(G.gpm.binary)
-        source = series.index(source)
-        target = series.index(target)
+    if workers not in (None, 1):
+        paths, _ = _parallel_paths(G, source, target, workers)
+        return paths.tolist()
 
+    source, target = _resolve_nodes(G, source, target)
     paths = nx.all_shortest_paths(G, source=source, target=target)
     return list(paths)
 
 
-def forward_paths_prob(G, source, target):
+@instrument("forward_paths_prob", paths=lambda G, paths: len(paths))
+def forward_paths_prob(G, source, target, workers=None):
     """Find forward paths and calculate their probability.
+
+    With ``workers``, paths are enumerated and scored in a process pool;
+    see ``forward_paths``.
     """
+    if workers not in (None, 1):
+        paths, probs = _parallel_paths(G, source, target, workers)
+        return dict(zip(map(tuple, paths.tolist()), probs.tolist()))
+
     paths = forward_paths(G, source, target)
 
     path_prob = {}
@@ -47,6 +93,185 @@ def forward_paths_prob(G, source, target):
     return path_prob
 
 
+def _forward_dag(G, source, target, probs=None):
+    """Shortest-path DAG between two node positions, in CSR form.
+
+    ``probs`` overrides the edge probabilities (rows aligned with
+    ``edge_index(G)``; extra columns are carried into ``weights``).
+
+    Returns
+    -------
+    length : int
+        number of steps from source to target (-1 if unreachable).
+    indptr, heads, weights : 1d arrays
+        the DAG edges leaving node i are ``heads[indptr[i]:indptr[i + 1]]``
+        with probabilities ``weights[indptr[i]:indptr[i + 1]]``.
+    """
+    from .matrices import edge_index, edge_probabilities
+
+    sources, targets = edge_index(G)
+    if probs is None:
+        probs = edge_probabilities(G)
+    probs = np.asarray(probs, dtype=float)
+    n = len(G.gpm.data)
+    dist_source, _, on_dag = shortest_path_dag(sources, targets, n, source, target)
+
+    order = np.argsort(sources[on_dag], kind="stable")
+    tails = sources[on_dag][order]
+    heads = targets[on_dag][order]
+    weights = probs[on_dag][order]
+    indptr = np.searchsorted(tails, np.arange(n + 1))
+    return dist_source[target], indptr, heads, weights
+
+
+def _expand_paths(paths, probs, length, indptr, heads, weights, chunksize):
+    """Expand blocks of partial paths depth-first until they reach length.
+
+    Blocks never hold more than ``chunksize`` paths. Yields (paths, probs)
+    blocks of complete paths, as node positions.
+    """
+    degree = np.diff(indptr)
+    stack = [(paths, probs)]
+    while stack:
+        paths, probs = stack.pop()
+        if paths.shape[1] == length + 1:
+            yield paths, probs
+            continue
+
+        # Extend every path in the block by each outgoing edge of its end.
+        last = paths[:, -1]
+        counts = degree[last]
+        rows = np.repeat(np.arange(len(paths)), counts)
+        offsets = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        edges = indptr[last][rows] + offsets
+        new_paths = np.column_stack([paths[rows], heads[edges]])
+        new_probs = probs[rows] * weights[edges]
+        for start in reversed(range(0, len(new_paths), chunksize)):
+            stack.append((new_paths[start:start + chunksize], new_probs[start:start + chunksize]))
+
+
+# DAG shared with each pool process by _init_path_worker.
+_worker_dag = None
+
+
+def _init_path_worker(dag):
+    global _worker_dag
+    _worker_dag = dag
+
+
+def _branch_paths(edge):
+    """Enumerate the paths that start with one DAG edge out of source."""
+    source, length, indptr, heads, weights = _worker_dag
+    paths = np.array([[source, heads[edge]]])
+    probs = weights[edge:edge + 1]
+    blocks = list(_expand_paths(paths, probs, length, indptr, heads, weights, 2 ** 16))
+    return (np.concatenate([b[0] for b in blocks]),
+            np.concatenate([b[1] for b in blocks]))
+
+
+def _parallel_paths(G, source, target, workers):
+    """Enumerate and score forward paths in a process pool.
+
+    Each task is one first step out of source; only the DAG arrays and
+    the resulting path arrays are sent between processes. Results are
+    merged in the order of the first steps.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import os
+
+    index = G.gpm.data.index.to_numpy()
+    source, target = _resolve_positions(G, [source, target])
+    length, indptr, heads, weights = _forward_dag(G, source, target)
+    if length < 0:
+        raise nx.NetworkXNoPath("Target cannot be reached from source.")
+    if length == 0:
+        return index[np.array([[source]])], np.ones(1)
+
+    if workers == -1:
+        workers = os.cpu_count()
+    dag = (source, length, indptr, heads, weights)
+    first_steps = range(indptr[source], indptr[source + 1])
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_path_worker,
+                             initargs=(dag,)) as pool:
+        results = list(pool.map(_branch_paths, first_steps))
+
+    paths = np.concatenate([r[0] for r in results])
+    probs = np.concatenate([r[1] for r in results])
+    return index[paths], probs
+
+
+def iter_forward_paths_prob(G, source, target, max_memory=2 ** 27, probs=None):
+    """Stream forward paths and their probability in chunks of arrays.
+
+    Paths are expanded depth-first over the shortest-path DAG in blocks, so
+    memory stays under ``max_memory`` no matter how many paths exist.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph with a model added.
+    source, target :
+        genotypes, binary genotypes or node indices.
+    max_memory : int (default=2**27)
+        approximate ceiling, in bytes, for the paths held at once.
+    probs : array, optional
+        edge probabilities aligned with ``matrices.edge_index(G)``, such as
+        an (edges x grid points) array from
+        ``matrices.edge_probabilities_sweep``. Defaults to the added model.
+
+    Yields
+    ------
+    chunk : PathChunk
+        ``chunk.paths`` is an array of shape (n_paths, path_length) and
+        ``chunk.probs`` holds the probability of each path (one row per
+        path if ``probs`` has grid columns).
+    """
+    index = G.gpm.data.index.to_numpy()
+    source, target = _resolve_positions(G, [source, target])
+    length, indptr, heads, weights = _forward_dag(G, source, target, probs=probs)
+    if length < 0:
+        return
+
+    # The stack holds at most (length x max degree) blocks of chunksize rows.
+    row_bytes = 8 * (length + 1 + int(np.prod(weights.shape[1:])))
+    blocks = max(1, length * max(int(np.diff(indptr).max(initial=1)), 1))
+    chunksize = max(1, max_memory // (row_bytes * blocks))
+
+    done, n_done = [], 0
+    start = (np.array([[source]]), np.ones((1,) + weights.shape[1:]))
+    for paths, probs in _expand_paths(*start, length, indptr, heads, weights, chunksize):
+        done.append((paths, probs))
+        n_done += len(paths)
+        if n_done >= chunksize:
+            yield PathChunk(index[np.concatenate([d[0] for d in done])],
+                            np.concatenate([d[1] for d in done]))
+            done, n_done = [], 0
+
+    if n_done > 0:
+        yield PathChunk(index[np.concatenate([d[0] for d in done])],
+                        np.concatenate([d[1] for d in done]))
+
+
+def _peek_chunks(paths):
+    """Return whether an iterable of paths is a PathChunk stream, and an
+    iterator over all of its items."""
+    paths = iter(paths)
+    first = next(paths, None)
+    if first is None:
+        return False, iter([])
+    return isinstance(first, PathChunk), itertools.chain([first], paths)
+
+
+def _chunk_edges(chunk, weights):
+    """Unique edges of a PathChunk, with weights summed per edge."""
+    paths = np.asarray(chunk.paths)
+    steps = paths.shape[1] - 1
+    pairs = np.column_stack([paths[:, :-1].ravel(), paths[:, 1:].ravel()])
+    edges, inverse = np.unique(pairs, axis=0, return_inverse=True)
+    totals = np.bincount(inverse.ravel(), weights=np.repeat(weights, steps), minlength=len(edges))
+    return [tuple(edge) for edge in edges.tolist()], totals.tolist()
+
+
 def paths_to_edges(paths, repeat=False):
     """Chops a list of paths into its edges.
 
@@ -63,13 +288,11 @@ def paths_to_edges(paths, repeat=False):
     edges: list
         List of edges
     """
-    edges = []
-    for path in paths:
-        edges += [(path[i], path[i + 1]) for i in range(len(path) - 1)]
+    edges = itertools.chain.from_iterable(zip(path[:-1], path[1:]) for path in paths)
 
     # Return a list of edges with repeats
     if repeat:
-        return edges
+        return list(edges)
 
     # Else remove repeats
     else:
@@ -81,16 +304,23 @@ def paths_to_edges_count(paths):
 
     Parameters
     ----------
-    paths: list of tuples
-        list of the paths.
+    paths: list of tuples, or iterable of PathChunk
+        list of the paths, or a stream from ``iter_forward_paths_prob``.
 
     Returns
     -------
     edges: Counter dictionary
         Edge tuples as keys, and counts as values.
     """
-    edges = paths_to_edges(paths, repeat=True)
-    return Counter(edges)
+    chunked, paths = _peek_chunks(paths)
+    if not chunked:
+        return Counter(itertools.chain.from_iterable(zip(path[:-1], path[1:]) for path in paths))
+
+    counts = Counter()
+    for chunk in paths:
+        edges, totals = _chunk_edges(chunk, np.ones(len(chunk.probs)))
+        counts.update(dict(zip(edges, [int(t) for t in totals])))
+    return counts
 
 
 def paths_prob_to_edges_flux(paths_prob):
@@ -99,8 +329,9 @@ def paths_prob_to_edges_flux(paths_prob):
 
     Parameters
     ----------
-    paths_prob: list of tuples
-        list of the paths.
+    paths_prob: dict, or iterable of PathChunk
+        paths as keys and probabilities as values, or a stream from
+        ``iter_forward_paths_prob``.
 
     Returns
     -------
@@ -108,27 +339,629 @@ def paths_prob_to_edges_flux(paths_prob):
         Edge tuples as keys, and probabilities as values.
     """
     edge_flux = {}
+    if not isinstance(paths_prob, dict):
+        for chunk in paths_prob:
+            edges, totals = _chunk_edges(chunk, chunk.probs)
+            for edge, total in zip(edges, totals):
+                edge_flux[edge] = edge_flux.get(edge, 0) + total
+        return edge_flux
+
+    # Paths of one length labeled by integers (e.g. from forward_paths_prob)
+    # are summed per edge as arrays.
+    paths = _path_array(paths_prob)
+    if paths is not None:
+        try:
+            probs = np.fromiter(paths_prob.values(), dtype=float, count=len(paths_prob))
+        except (TypeError, ValueError):
+            probs = None
+        if probs is not None:
+            edges, totals = _chunk_edges(PathChunk(paths, probs), probs)
+            return dict(zip(edges, totals))
+
     for path, prob in paths_prob.items():
+        for edge in zip(path[:-1], path[1:]):
+            # Get path probability to edge; start at zero.
+            edge_flux[edge] = edge_flux.get(edge, 0) + prob
 
-        for i in range(len(path) - 1):
-            # Get edge
-            edge = (path[i], path[i + 1])
+    return edge_flux
 
-            # Get path probability to edge.
-            if edge in edge_flux:
-                edge_flux[edge] += prob
 
-            # Else start at zero
-            else:
-                edge_flux[edge] = prob
+def _path_array(paths):
+    """Paths as a 2d int array, or None if they are not equal-length
+    sequences of integers."""
+    if len(paths) == 0:
+        return None
+    try:
+        array = np.array(list(paths))
+    except ValueError:
+        return None
+    if array.ndim != 2 or array.shape[1] < 2 or array.dtype.kind not in "iu":
+        return None
+    return array
 
-    return edge_flux
 
+def edges_flux_to_node_flux(G, edge_flux=None):
+    """Sum all flux from incoming edges for each node
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph whose edges carry a 'capacity' attribute.
+    edge_flux : dict, optional
+        edge tuples as keys and flux as values (e.g. from
+        ``forward_edges_flux``). Used instead of the edges' 'capacity'.
+
+    See Also
+    --------
+    gpgraph.flux : the same on edge flux arrays (``flux.node_inflow``).
+    """
+    from .flux import edge_flux_array, node_inflow
+
+    inflow = node_inflow(G, edge_flux_array(G, edge_flux))
+    return dict(zip(G.gpm.data.index.tolist(), _values(inflow)))
+
+
+def bfs_distances(adjacency, start):
+    """Number of mutations from start to every node (-1 if unreachable).
+
+    Parameters
+    ----------
+    adjacency : scipy.sparse.csr_matrix
+        adjacency matrix of the graph. Pass its transpose to get distances
+        *to* start instead.
+    start : int or array of int
+        node position(s) to start from.
+
+    Returns
+    -------
+    distances : 1d int array
+        breadth-first distance of every node.
+    """
+    adjacency = adjacency.tocsr()
+    distances = np.full(adjacency.shape[0], -1, dtype=np.int64)
+    frontier = np.unique(np.atleast_1d(start))
+    distances[frontier] = 0
+    level = 0
+    while len(frontier) > 0:
+        level += 1
+        neighbors = np.unique(adjacency[frontier].indices)
+        frontier = neighbors[distances[neighbors] < 0]
+        distances[frontier] = level
+    return distances
+
+
+def _scatter_add(out, index, values):
+    """out[index] += values, accumulating repeated indices."""
+    if values.ndim == 1:
+        out += np.bincount(index, weights=values, minlength=len(out))
+    else:
+        np.add.at(out, index, values)
+
+
+def dag_sums(sources, targets, probs, distances, start):
+    """Sum path probabilities over a shortest-path DAG, layer by layer.
+
+    Parameters
+    ----------
+    sources, targets : 1d int arrays
+        edges of the DAG, oriented away from start.
+    probs : array
+        probability of each edge; extra trailing dimensions are carried
+        through (e.g. one column per model parameter).
+    distances : 1d int array
+        breadth-first distance of every node from start.
+    start : int
+        node position the sums start from.
+
+    Returns
+    -------
+    sums : array
+        total probability of all shortest paths from start to each node.
+    """
+    probs = np.asarray(probs, dtype=float)
+    sums = np.zeros((len(distances),) + probs.shape[1:])
+    sums[start] = 1
+
+    # Walk the layers in order so every node is complete before use.
+    layer = distances[sources]
+    order = np.argsort(layer, kind="stable")
+    bounds = np.searchsorted(layer[order], np.arange(layer.max(initial=-1) + 2))
+    for k in range(len(bounds) - 1):
+        edges = order[bounds[k]:bounds[k + 1]]
+        u, v = sources[edges], targets[edges]
+        _scatter_add(sums, v, sums[u] * probs[edges])
+    return sums
+
+
+def dag_counts(sources, targets, distances, start, log=False):
+    """Count paths over a shortest-path DAG, layer by layer.
+
+    Counts are exact: int64 while the longest path cannot overflow it (up
+    to 20 mutations), Python integers beyond that. With ``log=True`` the
+    natural log of the counts is accumulated in floats instead.
 
-def edges_flux_to_node_flux(G):
-    """Sum all flux from incoming edges for each node"""
-    node_fluxes = {}
-    for node in G.nodes:
-        node_flux = sum([edge[2] for edge in list(G.in_edges(node, data="capacity")) if edge[2]])
-        node_fluxes[node] = node_flux
-    return node_fluxes
+    Parameters
+    ----------
+    sources, targets : 1d int arrays
+        edges of the DAG, oriented away from start.
+    distances : 1d int array
+        breadth-first distance of every node from start.
+    start : int
+        node position the paths start from.
+    log : bool (default=False)
+        return log counts (-inf where there are no paths).
+
+    Returns
+    -------
+    counts : 1d array
+        number of paths from start to each node.
+    """
+    if log:
+        counts = np.full(len(distances), -np.inf)
+        counts[start] = 0.0
+        add = np.logaddexp.at
+    else:
+        longest = int(distances.max(initial=0))
+        dtype = np.int64 if math.factorial(longest) < 2 ** 63 else object
+        counts = np.zeros(len(distances), dtype=dtype)
+        counts[start] = 1
+        add = np.add.at
+
+    layer = distances[sources]
+    order = np.argsort(layer, kind="stable")
+    bounds = np.searchsorted(layer[order], np.arange(layer.max(initial=-1) + 2))
+    for k in range(len(bounds) - 1):
+        edges = order[bounds[k]:bounds[k + 1]]
+        add(counts, targets[edges], counts[sources[edges]])
+    return counts
+
+
+def shortest_path_dag(sources, targets, n, source, target):
+    """Edges that lie on a shortest path from source to target.
+
+    Parameters
+    ----------
+    sources, targets : 1d int arrays
+        edges of the graph, as node positions.
+    n : int
+        number of nodes.
+    source, target : int
+        node positions.
+
+    Returns
+    -------
+    dist_source, dist_target : 1d int arrays
+        breadth-first distance of every node from source and to target.
+    on_dag : 1d bool array
+        True for edges on a shortest path from source to target.
+    """
+    from .matrices import edges_to_csr
+
+    adjacency = edges_to_csr(sources, targets, np.ones(len(sources), dtype=np.int8), n)
+    dist_source = bfs_distances(adjacency, source)
+    dist_target = bfs_distances(adjacency.T, target)
+    length = dist_source[target]
+    on_dag = (dist_source[sources] >= 0) & (dist_target[targets] >= 0) & (
+        dist_source[sources] + 1 + dist_target[targets] == length)
+    return dist_source, dist_target, on_dag
+
+
+def shortest_path_flux(sources, targets, probs, n, source, target):
+    """Flux of every edge over all shortest paths from source to target.
+
+    Forward sums from the source and backward sums from the target are
+    combined on the shortest-path DAG, so the cost is linear in the number
+    of edges instead of in the number of paths.
+
+    Parameters
+    ----------
+    sources, targets : 1d int arrays
+        edges of the graph, as node positions.
+    probs : array
+        transition probability of each edge.
+    n : int
+        number of nodes.
+    source, target : int
+        node positions.
+
+    Returns
+    -------
+    flux : array
+        summed probability of the paths through each edge (0 for edges
+        off the DAG).
+    node_flux : array
+        summed probability of the paths through each node.
+    on_dag : 1d bool array
+        True for edges that lie on a shortest path from source to target.
+    """
+    probs = np.asarray(probs, dtype=float)
+    dist_source, dist_target, on_dag = shortest_path_dag(sources, targets, n, source, target)
+    length = dist_source[target]
+
+    # Forward sums run along edges that step one layer away from source,
+    # backward sums along edges (reversed) that step one layer away from target.
+    forward_edges = (dist_source[sources] >= 0) & (dist_source[targets] == dist_source[sources] + 1)
+    backward_edges = (dist_target[targets] >= 0) & (dist_target[sources] == dist_target[targets] + 1)
+    forward = dag_sums(sources[forward_edges], targets[forward_edges],
+                       probs[forward_edges], dist_source, source)
+    backward = dag_sums(targets[backward_edges], sources[backward_edges],
+                        probs[backward_edges], dist_target, target)
+
+    flux = np.zeros(probs.shape)
+    flux[on_dag] = forward[sources[on_dag]] * probs[on_dag] * backward[targets[on_dag]]
+
+    on_path = (dist_source >= 0) & (dist_target >= 0) & (dist_source + dist_target == length)
+    node_flux = np.zeros(forward.shape)
+    node_flux[on_path] = forward[on_path] * backward[on_path]
+    return flux, node_flux, on_dag
+
+
+def forward_edges_flux(G, source, target, probs=None):
+    """Flux through every edge from all forward paths between source and
+    target, without enumerating the paths.
+
+    Gives the same result as
+    ``paths_prob_to_edges_flux(forward_paths_prob(G, source, target))``.
+    Transition probabilities come from the model added with ``add_model``
+    unless ``probs`` is given.
+
+    Parameters
+    ----------
+    probs : array, optional
+        edge probabilities aligned with ``matrices.edge_index(G)``. With an
+        (edges x grid points) array from
+        ``matrices.edge_probabilities_sweep``, every grid point is solved
+        in the same pass and each flux is an array over the grid.
+
+    Returns
+    -------
+    edge_flux: dictionary
+        Edge tuples as keys, and probabilities as values.
+    """
+    from .matrices import edge_index, edge_probabilities
+
+    start, stop = _resolve_positions(G, [source, target])
+    sources, targets = edge_index(G)
+    if probs is None:
+        probs = edge_probabilities(G)
+    flux, _, on_dag = shortest_path_flux(sources, targets, probs, len(G.gpm.data), start, stop)
+
+    index = G.gpm.data.index.to_numpy()
+    edges = zip(index[sources[on_dag]].tolist(), index[targets[on_dag]].tolist())
+    return dict(zip(edges, _values(flux[on_dag])))
+
+
+def forward_nodes_flux(G, source, target, probs=None):
+    """Flux through every node from all forward paths between source and
+    target, without enumerating the paths.
+
+    ``probs`` is as in ``forward_edges_flux``.
+
+    Returns
+    -------
+    node_flux: dictionary
+        Nodes as keys, and the summed probability of the paths visiting
+        them as values.
+    """
+    from .matrices import edge_index, edge_probabilities
+
+    start, stop = _resolve_positions(G, [source, target])
+    sources, targets = edge_index(G)
+    if probs is None:
+        probs = edge_probabilities(G)
+    _, node_flux, _ = shortest_path_flux(sources, targets, probs, len(G.gpm.data), start, stop)
+    return dict(zip(G.gpm.data.index, _values(node_flux)))
+
+
+def count_paths(G, source, target=None, log=False, phenotype="phenotypes"):
+    """Count shortest paths and selectively accessible shortest paths.
+
+    A path is accessible if the phenotype increases at every step. Both
+    counts come from one pass over the shortest-path DAG from source, so
+    no path is enumerated and every target is counted at once.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph to count paths on.
+    source :
+        genotype, binary genotype or node index.
+    target : optional
+        genotype, binary genotype or node index. If None, counts to every
+        node are returned.
+    log : bool (default=False)
+        return natural logs of the counts (floats) instead of exact integers.
+    phenotype : str (default='phenotypes')
+        node attribute the accessible paths must increase in.
+
+    Returns
+    -------
+    total, accessible : int or float, or 1d arrays
+        number (or log number) of shortest paths from source to target, and
+        of those that are accessible. Arrays are in the order of
+        ``gpm.data``; unreachable nodes get 0 (-inf with ``log``).
+    """
+    from .matrices import edge_index, edges_to_csr
+
+    start, stop = _resolve_positions(G, [source, source if target is None else target])
+    n = len(G.gpm.data)
+    sources, targets = edge_index(G)
+
+    adjacency = edges_to_csr(sources, targets, np.ones(len(sources), dtype=np.int8), n)
+    distances = bfs_distances(adjacency, start)
+    on_dag = (distances[sources] >= 0) & (distances[targets] == distances[sources] + 1)
+    sources, targets = sources[on_dag], targets[on_dag]
+    values = np.asarray(G.node_array(phenotype), dtype=float)
+    uphill = values[targets] > values[sources]
+
+    total = dag_counts(sources, targets, distances, start, log=log)
+    accessible = dag_counts(sources[uphill], targets[uphill], distances, start, log=log)
+    if target is None:
+        return total, accessible
+    return np.asarray(total[stop]).item(), np.asarray(accessible[stop]).item()
+
+
+def _resolve_positions(G, nodes):
+    """Row positions in ``gpm.data`` of genotypes, binary genotypes or node
+    indices, resolved all at once."""
+    data = G.gpm.data
+    nodes = list(nodes)
+    positions = pd.Index(data.genotypes).get_indexer(nodes)
+    for labels in (data.binary, data.index):
+        missing = positions < 0
+        if not missing.any():
+            break
+        positions[missing] = pd.Index(labels).get_indexer([nodes[i] for i in np.flatnonzero(missing)])
+    if np.any(positions < 0):
+        raise ValueError("{} is not a node of G.".format(nodes[int(np.flatnonzero(positions < 0)[0])]))
+    return positions
+
+
+@instrument("batch_forward_paths", pairs=lambda G, result: len(result.length))
+def batch_forward_paths(G, sources, targets, flux=True, probs=None):
+    """Probability and edge flux of the forward paths between many
+    (source, target) pairs.
+
+    Pairs are grouped by source: each distinct source gets one breadth-first
+    search and one pass of forward probability sums, which give the
+    probability of reaching every target at once. Sources are processed one
+    after another, so memory does not grow with the number of sources. Flux for a pair is one
+    backward pass from the target over the part of that source's DAG that
+    leads to it, without a second search. No path is enumerated.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph with a model added.
+    sources, targets : sequences
+        genotypes, binary genotypes or node indices; pair ``k`` is
+        ``(sources[k], targets[k])``.
+    flux : bool (default=True)
+        also return the flux through every edge for every pair.
+    probs : array, optional
+        edge probabilities aligned with ``matrices.edge_index(G)``, as in
+        ``forward_edges_flux``.
+
+    Returns
+    -------
+    PairPaths : namedtuple
+        ``prob``: summed probability of the forward paths of each pair, as
+        in ``sum(forward_paths_prob(G, source, target).values())``.
+        ``length``: number of mutations of each pair (-1 if unreachable).
+        ``flux``: sparse (edges x pairs) ``scipy.sparse.csc_matrix`` of
+        edge flux, rows aligned with ``matrices.edge_index(G)`` (None unless
+        ``flux``). Column k only holds the edges of pair k's forward paths;
+        ``flux[:, [k]].toarray().ravel()`` can be passed to the functions in
+        ``gpgraph.flux``. With a grid of ``probs``, a list with one such
+        matrix per grid point.
+    """
+    from .matrices import edge_index, edge_probabilities, edges_to_csr
+
+    starts = _resolve_positions(G, sources)
+    stops = _resolve_positions(G, targets)
+    if len(starts) != len(stops):
+        raise ValueError("sources and targets must have the same length.")
+    edge_sources, edge_targets = edge_index(G)
+    if probs is None:
+        probs = edge_probabilities(G)
+    probs = np.asarray(probs, dtype=float)
+    n = len(G.gpm.data)
+    adjacency = edges_to_csr(edge_sources, edge_targets, np.ones(len(edge_sources), dtype=np.int8), n)
+
+    # Pairs are handled one source at a time: a single forward pass over
+    # the source's shortest-path DAG gives every target's probability, and
+    # its arrays are dropped before the next source, so memory stays at one
+    # source's worth plus the output.
+    length = np.full(len(starts), -1, dtype=np.int64)
+    prob = np.zeros((len(starts),) + probs.shape[1:])
+    rows, values, columns = [], [], []
+    backward = np.zeros((n,) + probs.shape[1:]) if flux else None
+    order = np.argsort(starts, kind="stable")
+    bounds = np.flatnonzero(np.diff(starts[order])) + 1
+    for group in np.split(order, bounds) if len(order) else []:
+        start = int(starts[group[0]])
+        distances = bfs_distances(adjacency, start)
+        step = np.flatnonzero((distances[edge_sources] >= 0)
+                              & (distances[edge_targets] == distances[edge_sources] + 1))
+        sums = dag_sums(edge_sources[step], edge_targets[step], probs[step], distances, start)
+        length[group] = distances[stops[group]]
+        prob[group] = sums[stops[group]]
+        if not flux:
+            continue
+
+        # Incoming DAG edges of every node, for the backward walks.
+        step = step[np.argsort(edge_targets[step], kind="stable")]
+        incoming = (step, np.searchsorted(edge_targets[step], np.arange(n + 1)))
+        done = {}
+        for k in group.tolist():
+            stop = int(stops[k])
+            if length[k] < 0:
+                continue
+            if stop not in done:
+                done[stop] = _pair_flux(incoming, sums, stop, length[k],
+                                        edge_sources, edge_targets, probs, backward)
+            edges, flux_k = done[stop]
+            rows.append(edges)
+            values.append(flux_k)
+            columns.append(np.full(len(edges), k))
+        del distances, step, sums, incoming, done
+
+    if not flux:
+        return PairPaths(prob, length, None)
+
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    columns = np.concatenate(columns) if columns else np.empty(0, dtype=np.int64)
+    values = np.concatenate(values) if values else np.empty((0,) + probs.shape[1:])
+    shape = (len(edge_sources), len(starts))
+    if probs.ndim == 1:
+        fluxes = sparse.csc_matrix((values, (rows, columns)), shape=shape)
+    else:
+        values = values.reshape(len(values), -1)
+        fluxes = [sparse.csc_matrix((values[:, j], (rows, columns)), shape=shape)
+                  for j in range(values.shape[1])]
+    return PairPaths(prob, length, fluxes)
+
+
+def _pair_flux(incoming, sums, stop, length, edge_sources, edge_targets, probs, backward):
+    """Edge flux of the forward paths ending at stop, in one source's DAG.
+
+    Walks backward from stop over the incoming DAG edges, one layer at a
+    time, so only the edges of paths to stop are visited. ``backward`` is
+    zeroed scratch space of one entry per node; it is zeroed again on return.
+
+    Returns
+    -------
+    edges : 1d int array
+        positions of the edges on a forward path to stop.
+    flux : array
+        flux through each of those edges.
+    """
+    from .base import _ranges
+
+    order, bounds = incoming
+    frontier = np.array([stop])
+    backward[stop] = 1
+    edges, flux = [np.empty(0, dtype=np.int64)], [np.empty((0,) + probs.shape[1:])]
+    touched = [frontier]
+    for _ in range(length):
+        e = order[_ranges(bounds[frontier], bounds[frontier + 1] - bounds[frontier])]
+        u = edge_sources[e]
+        weights = probs[e] * backward[edge_targets[e]]
+        frontier, inverse = np.unique(u, return_inverse=True)
+        partial = np.zeros((len(frontier),) + probs.shape[1:])
+        _scatter_add(partial, inverse.ravel(), weights)
+        backward[frontier] = partial
+        edges.append(e)
+        flux.append(sums[u] * weights)
+        touched.append(frontier)
+    backward[np.concatenate(touched)] = 0
+    return np.concatenate(edges), np.concatenate(flux)
+
+
+def _values(array):
+    """Rows of an array as floats (1d) or as arrays (one per row)."""
+    return array.tolist() if array.ndim == 1 else list(array)
+
+
+def _top_shortest_paths(G, source, target):
+    """Best-first search over the shortest-path DAG between the row
+    positions source and target.
+
+    Partial paths are ranked by their cost so far plus the exact cost of the
+    best completion, so complete paths come out in order of probability and
+    only prefixes of the returned paths are ever expanded.
+    """
+    from .matrices import edge_index, edge_probabilities
+
+    sources, targets = edge_index(G)
+    probs = np.asarray(edge_probabilities(G), dtype=float)
+    n = len(G.gpm.data)
+    index = G.gpm.data.index.to_numpy()
+    dist_source, _, on_dag = shortest_path_dag(sources, targets, n, source, target)
+
+    # Edge weights are -log(prob); impossible steps are dropped.
+    keep = on_dag & (probs > 0)
+    u, v = sources[keep], targets[keep]
+    weights = -np.log(probs[keep])
+
+    # Cheapest cost from every node to target, one layer at a time.
+    remaining = np.full(n, np.inf)
+    remaining[target] = 0
+    for layer in range(dist_source[target] - 1, -1, -1):
+        edges = dist_source[u] == layer
+        np.minimum.at(remaining, u[edges], weights[edges] + remaining[v[edges]])
+
+    # Outgoing DAG edges of each node.
+    order = np.argsort(u, kind="stable")
+    v, weights = v[order].tolist(), weights[order].tolist()
+    bounds = np.searchsorted(u[order], np.arange(n + 1)).tolist()
+    remaining = remaining.tolist()
+
+    counter = itertools.count()
+    heap = [(remaining[source], 0.0, next(counter), source, None)]
+    while heap:
+        _, cost, _, node, parent = heapq.heappop(heap)
+        if node == target:
+            path = [node]
+            while parent is not None:
+                node, parent = parent
+                path.append(node)
+            yield tuple(index[path[::-1]].tolist()), float(np.exp(-cost))
+            continue
+        for e in range(bounds[node], bounds[node + 1]):
+            neighbor = v[e]
+            if remaining[neighbor] == np.inf:
+                continue
+            new_cost = cost + weights[e]
+            heapq.heappush(heap, (new_cost + remaining[neighbor], new_cost, next(counter),
+                                  neighbor, (node, parent)))
+
+
+def _top_simple_paths(G, source, target):
+    """Yen's k-shortest simple paths on -log(prob) edge weights."""
+    def weight(u, v, attrs):
+        prob = attrs.get("prob")
+        if not prob or prob <= 0:
+            return None
+        return -np.log(prob)
+
+    for path in nx.shortest_simple_paths(G, source, target, weight=weight):
+        prob = 1
+        for i in range(len(path) - 1):
+            prob *= G.edges[path[i], path[i + 1]]["prob"]
+        yield tuple(path), float(prob)
+
+
+def top_k_paths(G, source, target, k=None, shortest=True):
+    """Yield the most probable paths from source to target, most probable
+    first.
+
+    Paths are scored by summed -log(prob) edge weights from ``add_model``
+    and generated lazily, so memory grows with the number of paths taken
+    rather than the number of paths that exist. Paths with zero probability
+    are never yielded.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph with a model added.
+    source, target :
+        genotypes, binary genotypes or node indices.
+    k : int, optional
+        maximum number of paths to yield (default: all).
+    shortest : bool (default=True)
+        only consider shortest (forward) paths. If False, any simple path
+        is allowed.
+
+    Yields
+    ------
+    path, prob : tuple, float
+        path labeled by node index, and its probability.
+    """
+    start, stop = _resolve_positions(G, [source, target])
+    if shortest:
+        paths = _top_shortest_paths(G, start, stop)
+    else:
+        source, target = G.gpm.data.index[[start, stop]].tolist()
+        paths = _top_simple_paths(G, source, target)
+    return itertools.islice(paths, k)
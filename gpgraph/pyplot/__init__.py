@@ -2,5 +2,6 @@ from .network import draw_gpgraph
 from .nodes import draw_nodes
 from .edges import draw_edges
 from .paths import draw_paths
-from .pos import flattened
+from .pos import flattened, flattened_array
+from .render import draw_edge_lines, draw_edge_density, draw_node_points, edge_density
 from .utils import despine, truncate_colormap, bins
@@ -1,6 +1,8 @@
 import networkx as nx
 import numpy as np
 import matplotlib.pyplot as plt
+from ..stats import instrument
+from .render import _position_array, _edge_positions, draw_edge_lines, draw_edge_density
 from .utils import despine
 
 docs = """
@@ -11,15 +13,16 @@ Draw paths in GenotypePhenotypeGraph
     G : graph
        A networkx graph
     
-    pos : dictionary
-       A dictionary with nodes as keys and positions as values.
-       Positions should be sequences of length 2.
+    pos : dictionary or 2d array
+       A dictionary with nodes as keys and positions as values, or an
+       (n, 2) array of positions in the order of ``G.gpm.data``.
 
     ax : Matplotlib Axes object, optional
        Draw the graph in the specified Matplotlib axes.
 
     edgelist : collection of edge tuples
-       Draw only specified edges(default=G.edges())
+       Draw only specified edges(default=G.edges()). A (sources, targets)
+       tuple of arrays of positions in ``G.gpm.data`` also works.
 
     edge_widths : float, or array of floats
        Relative Line width of edges (default=1.0). Use scalar to chat width.
@@ -53,11 +56,30 @@ Draw paths in GenotypePhenotypeGraph
        width. See :py:class: `matplotlib.patches.FancyArrowPatch` for attribute
        `mutation_scale` for more info.
 
-    label : [None| string]
-       Label for legend
+    cmap : Matplotlib colormap, optional
+       Colormap for numeric edge colors (or for the density image).
+
+    vmin,vmax : floats, optional
+       Minimum and maximum for edge colormap scaling.
+
+    density : bool, optional (default=False)
+       Rasterize the edges into a density image instead of drawing lines.
+       Overlapping edges add up; widths are used as edge weights (e.g. flux).
+
+    bins : int or (int, int), optional (default=512)
+       Resolution of the density image.
+
+    rasterized : bool, optional (default=False)
+       Rasterize the edge lines in vector output.
+
+    Returns
+    -------
+    artist : LineCollection or AxesImage
+       The drawn edges.
 """
 
 
+@instrument("draw_edges")
 def draw_edges(
         G,
         pos,
@@ -70,7 +92,13 @@ def draw_edges(
         alpha=1.0,
         arrows=False,
         arrowstyles="-|>",
-        arrowsize=10
+        arrowsize=10,
+        cmap=None,
+        vmin=None,
+        vmax=None,
+        density=False,
+        bins=512,
+        rasterized=False,
 ):
     # Get Figure.
     if ax is None:
@@ -82,19 +110,36 @@ def draw_edges(
     if widths is None:
         width = scalar
     else:
-        width = scalar * np.array(widths)
-
-    edge_options = dict(
-        edgelist=edge_list,
-        width=widths,
-        scalar=scalar,
-        edge_color=colors,
-        style=style,
-        alpha=alpha,
-        arrows=arrows,
-        arrowstyles=arrowstyles,
-        arrowsize=arrowsize
-    )
-
-    # Draw edges
-    nx.draw_networkx_edges(G=G, pos=pos, ax=ax, **edge_options)
+        width = scalar * np.asarray(widths, dtype=float)
+
+    # Arrow heads need one patch per edge; leave those to networkx.
+    if arrows:
+        index = G.gpm.data.index
+        if not isinstance(pos, dict):
+            pos = dict(zip(index.tolist(), _position_array(G, pos)))
+        sources, targets = _edge_positions(G, edge_list)
+        return nx.draw_networkx_edges(
+            G=G, pos=pos, ax=ax,
+            edgelist=list(zip(index[sources].tolist(), index[targets].tolist())),
+            width=width,
+            edge_color=colors,
+            style=style,
+            alpha=alpha,
+            arrows=True,
+            arrowstyle=arrowstyles,
+            arrowsize=arrowsize,
+            edge_cmap=cmap,
+            edge_vmin=vmin,
+            edge_vmax=vmax,
+        )
+
+    positions = _position_array(G, pos)
+    sources, targets = _edge_positions(G, edge_list)
+    if density:
+        return draw_edge_density(ax, positions, sources, targets, weights=width, bins=bins,
+                                 cmap=cmap or "Greys", vmin=vmin, vmax=vmax, alpha=alpha)
+    return draw_edge_lines(ax, positions, sources, targets, widths=width, colors=colors, style=style,
+                           alpha=alpha, cmap=cmap, vmin=vmin, vmax=vmax, rasterized=rasterized)
+
+
+draw_edges.__doc__ = docs
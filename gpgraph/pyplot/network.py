@@ -2,17 +2,20 @@ import matplotlib.pyplot as plt
 import numpy as np
 from .edges import draw_edges
 from .nodes import draw_nodes
-from .pos import flattened
 from .utils import despine
+from .. import geometry
 from ..paths import paths_prob_to_edges_flux
+from ..stats import instrument
 
 
+@instrument("draw_gpgraph", nodes=lambda G, result: len(G), edges=lambda G, result: G.number_of_edges())
 def draw_gpgraph(
         G,
         pos=None,
         ax=None,
         figsize=None,
         paths=None,
+        edge_flux=None,
         edge_list=None,
         edge_widths=1.0,
         edge_scalar=1.0,
@@ -22,6 +25,11 @@ def draw_gpgraph(
         edge_arrows=False,
         edge_arrowstyles="-|>",
         edge_arrowsize=10,
+        edge_cmap=None,
+        edge_vmin=None,
+        edge_vmax=None,
+        edge_density=False,
+        edge_bins=512,
         node_list=None,
         node_size=300,
         node_color="r",
@@ -35,7 +43,8 @@ def draw_gpgraph(
         cmap_min=0.05,
         colorbar=False,
         vmin=None,
-        vmax=None
+        vmax=None,
+        rasterized=False,
 ):
     """Draw the GenotypePhenotypeGraph using Matplotlib.
 
@@ -48,11 +57,10 @@ def draw_gpgraph(
     G : graph
        A networkx graph
 
-    pos : dictionary, optional
-       A dictionary with nodes as keys and positions as values.
-       If not specified a spring layout positioning will be computed.
-       See :py:mod:`networkx.drawing.layout` for functions that
-       compute node positions.
+    pos : dictionary or 2d array, optional
+       A dictionary with nodes as keys and positions as values, or an
+       (n, 2) array of positions in the order of ``G.gpm.data``.
+       If not specified the vertical flattened layout is used.
 
     ax : Matplotlib Axes object, optional
        Draw the graph in the specified Matplotlib axes.
@@ -60,6 +68,10 @@ def draw_gpgraph(
     paths : list of tuples
         If Paths
 
+    edge_flux : dict, optional
+        Edge tuples as keys and flux as values, e.g. from
+        ``forward_edges_flux``. Drawn like ``paths`` without enumerating them.
+
     edge_list : list, optional (default=G.edges())
        Draw only specified edges. If `paths` is given, then edge_list is ignored. 
 
@@ -74,6 +86,7 @@ def draw_gpgraph(
        or a sequence of colors with the same length as edgelist.
        If numeric values are specified they will be mapped to
        colors using the edge_cmap and edge_vmin,edge_vmax parameters.
+       With ``paths`` or ``edge_flux``, 'flux' colors edges by their flux.
 
     edge_style : string
        Edge line style (default='solid') (solid|dashed|dotted,dashdot)
@@ -95,6 +108,20 @@ def draw_gpgraph(
        width. See :py:class: `matplotlib.patches.FancyArrowPatch` for attribute
        `mutation_scale` for more info.
 
+    edge_cmap : Matplotlib colormap, optional
+       Colormap for numeric edge colors (or for the edge density image).
+
+    edge_vmin,edge_vmax : floats, optional
+       Minimum and maximum for edge colormap scaling.
+
+    edge_density : bool, optional (default=False)
+       Rasterize the edges into a density image in which overlapping edges
+       add up (weighted by flux if given). Use for graphs with too many
+       edges to draw one by one.
+
+    edge_bins : int or (int, int), optional (default=512)
+       Resolution of the edge density image.
+
     node_list : list, optional (default G.nodes())
        Draw only specified nodes 
 
@@ -139,6 +166,9 @@ def draw_gpgraph(
     vmin,vmax : float, optional (default=None)
        Minimum and maximum for node colormap scaling
 
+    rasterized : bool, optional (default=False)
+       Rasterize edges and nodes in vector output (e.g. pdf, svg).
+
     Notes
     -----
     For directed graphs, "arrows" (actually just thicker stubs) are drawn
@@ -152,17 +182,19 @@ def draw_gpgraph(
     else:
         fig = ax.get_figure()
 
-    # Flattened positions by default
+    # Flattened positions by default. Positions are computed once per graph
+    # version, as an array, and shared by edges and nodes.
     if pos is None:
-        pos = flattened(G, vertical=True)
+        pos = geometry.layout(G, vertical=True)
 
     # Style and draw edges
     if paths is not None:
-        edges = paths_prob_to_edges_flux(paths)
-        edge_list = list(edges.keys())
-        edge_widths = edge_scalar * np.array(list(edges.values()))
-    if edge_list is None:
-        edge_list = list(G.edges().keys())
+        edge_flux = paths_prob_to_edges_flux(paths)
+    if edge_flux is not None:
+        edge_list = list(edge_flux.keys())
+        edge_widths = np.fromiter(edge_flux.values(), dtype=float, count=len(edge_flux))
+        if isinstance(edge_colors, str) and edge_colors == "flux":
+            edge_colors = edge_widths
     edge_options = dict(
         edge_list=edge_list,
         widths=edge_widths,
@@ -172,12 +204,16 @@ def draw_gpgraph(
         alpha=edge_alpha,
         arrows=edge_arrows,
         arrowstyles=edge_arrowstyles,
-        arrowsize=edge_arrowsize
+        arrowsize=edge_arrowsize,
+        cmap=edge_cmap,
+        vmin=edge_vmin,
+        vmax=edge_vmax,
+        density=edge_density,
+        bins=edge_bins,
+        rasterized=rasterized,
     )
     draw_edges(G, pos, ax=ax, **edge_options)
     # Style and draw nodes
-    if node_list is None:
-        node_list = list(G.nodes().keys())
     node_options = dict(
         node_list=node_list,
         size=node_size,
@@ -193,6 +229,7 @@ def draw_gpgraph(
         colorbar=colorbar,
         vmin=vmin,
         vmax=vmax,
+        rasterized=rasterized,
     )
     draw_nodes(G, pos, ax=ax, **node_options)
     return fig, ax
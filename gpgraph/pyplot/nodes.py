@@ -1,9 +1,12 @@
-import networkx as nx
+import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+from ..stats import instrument
+from .render import _position_array, _node_positions, draw_node_points
 from .utils import despine, truncate_colormap
 
 
+@instrument("draw_nodes")
 def draw_nodes(
         G,
         pos,
@@ -22,6 +25,7 @@ def draw_nodes(
         colorbar=False,
         vmin=None,
         vmax=None,
+        rasterized=False,
 ):
     """Draw paths in GenotypePhenotypeGraph
 
@@ -30,9 +34,9 @@ def draw_nodes(
     G : graph
        A networkx graph
 
-    pos : dictionary
-       A dictionary with nodes as keys and positions as values.
-       Positions should be sequences of length 2.
+    pos : dictionary or 2d array
+       A dictionary with nodes as keys and positions as values, or an
+       (n, 2) array of positions in the order of ``G.gpm.data``.
 
     width : float, or array of floats
        Line width of edges (default=1.0)
@@ -50,9 +54,13 @@ def draw_nodes(
        Draw the graph in the specified Matplotlib axes.
 
 
-    label : [None| string]
-       Label for legend
+    rasterized : bool, optional (default=False)
+       Rasterize the nodes in vector output.
 
+    Returns
+    -------
+    points : PathCollection
+       The drawn nodes.
     """
     # Get Figure.
     if ax is None:
@@ -61,37 +69,32 @@ def draw_nodes(
     else:
         fig = ax.get_figure()
 
-    if node_list is None:
-        node_list = list(G.nodes().keys())
+    # Node colors come straight from the phenotype column.
+    rows = _node_positions(G, node_list)
+    node_color = G.node_array('phenotypes')[rows]
 
     if vmax is None:
-        phenotypes = G.gpm.phenotypes
-        vmin = min(phenotypes)
-        vmax = max(phenotypes)
+        phenotypes = G.node_array('phenotypes')
+        vmin = phenotypes.min(initial=np.inf)
+        vmax = phenotypes.max(initial=-np.inf)
 
     if cmap_truncate:
         cmap = truncate_colormap(cmap, minval=cmap_min, maxval=cmap_max)
 
-    # Default options
-    node_options = dict(
-        nodelist=node_list,
-        vmin=vmin,
-        vmax=vmax,
-        node_shape=shape,
-        node_size=size,
-        node_color=[G.nodes[n]['phenotypes'] for n in node_list],
+    # Draw nodes.
+    points = draw_node_points(
+        ax,
+        _position_array(G, pos)[rows],
+        size=size,
+        color=node_color,
+        shape=shape,
+        alpha=alpha,
         linewidths=linewidths,
         edgecolors=edgecolors,
         cmap=cmap,
-        cmap_truncate=cmap_truncate,
-    )
-
-    # Draw nodes.
-    nx.draw_networkx_nodes(
-        G=G,
-        pos=pos,
-        ax=ax,
-        **node_options
+        vmin=vmin,
+        vmax=vmax,
+        rasterized=rasterized,
     )
 
     # Add a colorbar?
@@ -103,4 +106,5 @@ def draw_nodes(
         # create a ScalarMappable and initialize a data structure
         cm = mpl.cm.ScalarMappable(cmap=cmap, norm=norm)
         cm.set_array([])
-        fig.colorbar(cm)
+        fig.colorbar(cm, ax=ax)
+    return points
@@ -1,12 +1,14 @@
-import networkx as nx
 import matplotlib.pyplot as plt
-import matplotlib as mpl
-from gpgraph.paths import paths_prob_to_edges_flux, forward_paths_prob
-from gpgraph.pyplot.pos import flattened
+from gpgraph.paths import paths_prob_to_edges_flux
 
+from .. import geometry
+from ..stats import instrument
+from .edges import draw_edges
+from .nodes import draw_nodes
 from .utils import despine
 
 
+@instrument("draw_paths")
 def draw_paths(
         G,
         paths=None,
@@ -48,7 +50,9 @@ def draw_paths(
        A networkx graph
 
     paths : All forward paths from source genotype to
-        target genotype.
+        target genotype. If not given, the edges on forward paths are
+        found from their flux (see ``geometry.path_flux``) without
+        enumerating the paths; the result is cached on G.
 
     source: source genotype. Default value is the first value
         in the list of genotypes.
@@ -56,10 +60,10 @@ def draw_paths(
     target: target genotype. Default value is the last value
         in the list of genotypes.
 
-    pos : dictionary
-       A dictionary with nodes as keys and positions as values.
-       Positions should be sequences of length 2.
-       Default value uses flattened function included in gpgraph.utils.
+    pos : dictionary or 2d array
+       A dictionary with nodes as keys and positions as values, or an
+       (n, 2) array of positions in the order of ``G.gpm.data``.
+       Default value uses flattened function included in gpgraph.pyplot.
 
     edge_list : collection of edge tuples
        Draw only specified edges(default=G.edges())
@@ -116,14 +120,8 @@ def draw_paths(
 
     """
     # Check what values were passed to function, or assign default values
-    if not pos:
-        pos = flattened(G)
-
-    if not edge_list:
-        edge_list = G.edges()
-
-    if not nodelist:
-        nodelist = G.nodes()
+    if pos is None:
+        pos = geometry.layout(G)
 
     if not source:
         source = G.gpm.genotypes[0]
@@ -131,9 +129,6 @@ def draw_paths(
     if not target:
         target = G.gpm.genotypes[-1]
 
-    if not paths:
-        paths = forward_paths_prob(G, source, target)
-
     # Get Figure.
     if ax is None:
         fig, ax = plt.subplots()
@@ -141,55 +136,44 @@ def draw_paths(
     else:
         fig = ax.get_figure()
 
-    # Get flux through edges
-    edges = paths_prob_to_edges_flux(paths)
-    edge_list = list(edges.keys())
-
-    # Default options
-    node_options = dict(
-        nodelist=G.nodes(),
-        vmin=vmin,
-        vmax=vmax,
-        node_shape=node_shape,
-        node_size=node_size,
-        node_color=[G.nodes[n]['phenotypes'] for n in nodelist],
-        linewidths=linewidths,
-        edgecolors=edgecolors,
-        cmap=cmap,
-        cmap_truncate=False,
-        labels={n: G.nodes[n]['genotypes'] for n in nodelist}
-    )
+    # Get edges with flux
+    if paths:
+        edge_list = list(paths_prob_to_edges_flux(paths).keys())
+    else:
+        sources, targets, _ = geometry.path_flux(G, source, target)
+        edge_list = (sources, targets)
 
     # Draw edges
-    nx.draw_networkx_edges(
-        G=G,
-        pos=pos,
-        edgelist=edge_list,
-        width=width,
-        edge_color=edge_color,
+    draw_edges(
+        G,
+        pos,
         ax=ax,
+        edge_list=edge_list,
+        widths=width,
+        colors=edge_color,
         style=style,
         alpha=edge_alpha,
         arrows=arrows,
-        arrowstyle=arrowstyle,
+        arrowstyles=arrowstyle,
         arrowsize=arrowsize,
     )
 
-    # Draw nodes.
-    nx.draw_networkx_nodes(
-        G=G,
-        pos=pos,
+    # Draw nodes (and color bar).
+    draw_nodes(
+        G,
+        pos,
         ax=ax,
-        **node_options
+        node_list=nodelist,
+        size=node_size,
+        shape=node_shape,
+        alpha=alpha,
+        linewidths=linewidths,
+        edgecolors=edgecolors,
+        cmap=cmap,
+        cmap_truncate=cmap_truncate,
+        cmap_max=cmap_max,
+        cmap_min=cmap_min,
+        colorbar=colorbar,
+        vmin=vmin,
+        vmax=vmax,
     )
-
-    # Add a color bar
-    if colorbar:
-        norm = mpl.colors.Normalize(
-            vmin=vmin,
-            vmax=vmax)
-
-        # create a ScalarMappable and initialize a data structure
-        cm = mpl.cm.ScalarMappable(cmap=cmap, norm=norm)
-        cm.set_array([])
-        fig.colorbar(cm)
@@ -0,0 +1,260 @@
+__doc__ = """
+Array-based rendering of genotype-phenotype graphs.
+
+Edges are drawn from an (n, 2) array of node positions and positional
+(sources, targets) edge arrays, either as one ``LineCollection`` or,
+for very large graphs, rasterized into a density image. Nodes are drawn as
+one scatter. Nothing here loops over nodes or edges in Python.
+"""
+
+import numpy as np
+from matplotlib.collections import LineCollection
+
+from .. import geometry
+
+
+def _position_array(G, pos=None, vertical=False):
+    """Node positions as an (n, 2) array in the order of ``gpm.data``.
+
+    ``pos`` may be None (cached flattened layout), an (n, 2) array, or a
+    dict of node -> [x, y]. Nodes missing from the dict get NaN positions.
+    """
+    if pos is None:
+        return geometry.layout(G, vertical=vertical)
+    if isinstance(pos, dict):
+        missing = (np.nan, np.nan)
+        return np.array([pos.get(node, missing) for node in G.gpm.data.index.tolist()], dtype=float)
+    return np.asarray(pos, dtype=float)
+
+
+def _node_positions(G, node_list=None):
+    """Row positions in ``gpm.data`` of the nodes in node_list (all if None)."""
+    if node_list is None:
+        return np.arange(len(G.gpm.data))
+    return G.gpm.data.index.get_indexer(list(node_list))
+
+
+def _edge_positions(G, edge_list=None):
+    """Positional (sources, targets) of the edges in edge_list (all if None).
+
+    edge_list may also already be a (sources, targets) tuple of position arrays.
+    """
+    if edge_list is None:
+        return geometry.edges(G)
+    if isinstance(edge_list, tuple) and len(edge_list) == 2 and isinstance(edge_list[0], np.ndarray):
+        return edge_list
+    pairs = list(edge_list)
+    if len(pairs) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    index = G.gpm.data.index
+    sources, targets = zip(*[pair[:2] for pair in pairs])
+    return index.get_indexer(list(sources)), index.get_indexer(list(targets))
+
+
+def edge_segments(positions, sources, targets):
+    """Line segments of edges as an array of shape (E, 2, 2)."""
+    positions = np.asarray(positions, dtype=float)
+    return np.stack((positions[sources], positions[targets]), axis=1)
+
+
+def draw_edge_lines(
+        ax,
+        positions,
+        sources,
+        targets,
+        widths=1.0,
+        colors="black",
+        style="solid",
+        alpha=1.0,
+        cmap=None,
+        vmin=None,
+        vmax=None,
+        rasterized=False,
+        zorder=1,
+):
+    """Draw edges as a single LineCollection.
+
+    Parameters
+    ----------
+    ax : Matplotlib Axes object
+        axes to draw on.
+    positions : 2d array
+        (n, 2) node positions.
+    sources, targets : 1d int arrays
+        row positions of the edge endpoints.
+    widths : float or 1d array
+        line width of every edge.
+    colors : color string, sequence of colors, or 1d array of floats
+        edge colors. Floats are mapped to colors with cmap, vmin and vmax.
+    rasterized : bool (default=False)
+        rasterize the edges in vector output (keeps files small).
+
+    Returns
+    -------
+    lines : LineCollection
+    """
+    segments = edge_segments(positions, sources, targets)
+    lines = LineCollection(segments, linewidths=widths, linestyles=style,
+                           alpha=alpha, rasterized=rasterized, zorder=zorder)
+    colors_array = np.asarray(colors) if not isinstance(colors, str) else None
+    if colors_array is not None and colors_array.ndim == 1 and np.issubdtype(colors_array.dtype, np.number):
+        lines.set_array(colors_array)
+        lines.set_cmap(cmap)
+        lines.set_clim(vmin, vmax)
+    else:
+        lines.set_color(colors)
+    ax.add_collection(lines)
+    ax.autoscale_view()
+    return lines
+
+
+def edge_density(positions, sources, targets, weights=None, bins=512, extent=None, chunksize=2 ** 12):
+    """Rasterize edges into a 2d image of summed edge weights.
+
+    Every edge adds its weight once to each pixel it crosses, so a pixel
+    holds the number (or total weight, e.g. flux) of overlapping edges.
+
+    Parameters
+    ----------
+    positions : 2d array
+        (n, 2) node positions.
+    sources, targets : 1d int arrays
+        row positions of the edge endpoints.
+    weights : float or 1d array, optional
+        weight of every edge (default=1).
+    bins : int or (int, int) (default=512)
+        number of pixels along x and y.
+    extent : (xmin, xmax, ymin, ymax), optional
+        area covered by the image; defaults to the bounds of ``positions``.
+    chunksize : int
+        number of edges rasterized at a time.
+
+    Returns
+    -------
+    image : 2d array
+        array of shape (ny, nx); row 0 is the bottom of the image.
+    extent : tuple
+        (xmin, xmax, ymin, ymax) covered by the image.
+    """
+    positions = np.asarray(positions, dtype=float)
+    sources = np.asarray(sources)
+    targets = np.asarray(targets)
+    nx_bins, ny_bins = (bins, bins) if np.isscalar(bins) else bins
+    if extent is None:
+        finite = positions[np.isfinite(positions).all(axis=1)]
+        lower = finite.min(axis=0) if len(finite) else np.zeros(2)
+        upper = finite.max(axis=0) if len(finite) else np.zeros(2)
+        pad = np.where(upper > lower, 0.0, 0.5)
+        extent = (lower[0] - pad[0], upper[0] + pad[0], lower[1] - pad[1], upper[1] + pad[1])
+    xmin, xmax, ymin, ymax = extent
+
+    # Node positions in (continuous) pixel coordinates.
+    pixels = np.empty(positions.shape)
+    pixels[:, 0] = (positions[:, 0] - xmin) / (xmax - xmin) * (nx_bins - 1)
+    pixels[:, 1] = (positions[:, 1] - ymin) / (ymax - ymin) * (ny_bins - 1)
+    weights = np.broadcast_to(np.asarray(1.0 if weights is None else weights, dtype=float), sources.shape)
+
+    image = np.zeros(nx_bins * ny_bins)
+    for start in range(0, len(sources), chunksize):
+        stop = start + chunksize
+        start_pixels = pixels[sources[start:stop]]
+        delta = pixels[targets[start:stop]] - start_pixels
+        keep = np.isfinite(delta).all(axis=1) & np.isfinite(start_pixels).all(axis=1)
+        start_pixels, delta, w = start_pixels[keep], delta[keep], weights[start:stop][keep]
+
+        # Step one pixel at a time along the major axis of each segment.
+        steps = np.ceil(np.abs(delta).max(axis=1)).astype(np.int64) + 1
+        segment = np.repeat(np.arange(len(steps)), steps)
+        t = np.arange(steps.sum(), dtype=np.float32) - np.repeat(np.cumsum(steps) - steps, steps)
+        t /= np.maximum(steps - 1, 1)[segment]
+        x = np.rint(start_pixels[segment, 0] + t * delta[segment, 0]).astype(np.int64)
+        y = np.rint(start_pixels[segment, 1] + t * delta[segment, 1]).astype(np.int64)
+        inside = (x >= 0) & (x < nx_bins) & (y >= 0) & (y < ny_bins)
+        if not inside.all():
+            x, y, segment = x[inside], y[inside], segment[inside]
+        y *= nx_bins
+        y += x
+        image += np.bincount(y, weights=w[segment], minlength=len(image))
+    return image.reshape(ny_bins, nx_bins), (xmin, xmax, ymin, ymax)
+
+
+def draw_edge_density(
+        ax,
+        positions,
+        sources,
+        targets,
+        weights=None,
+        bins=512,
+        cmap="Greys",
+        norm=None,
+        vmin=None,
+        vmax=None,
+        alpha=1.0,
+        zorder=1,
+):
+    """Draw edges as a rasterized density image (see ``edge_density``).
+
+    Pixels no edge crosses are left transparent.
+
+    Returns
+    -------
+    image : AxesImage
+    """
+    image, extent = edge_density(positions, sources, targets, weights=weights, bins=bins)
+    nx_bins, ny_bins = image.shape[1], image.shape[0]
+    # Pixel centers sit on the extent bounds; widen by half a pixel.
+    dx = (extent[1] - extent[0]) / max(nx_bins - 1, 1) / 2
+    dy = (extent[3] - extent[2]) / max(ny_bins - 1, 1) / 2
+    artist = ax.imshow(
+        np.ma.masked_equal(image, 0),
+        extent=(extent[0] - dx, extent[1] + dx, extent[2] - dy, extent[3] + dy),
+        origin="lower",
+        aspect="auto",
+        interpolation="nearest",
+        cmap=cmap,
+        norm=norm,
+        vmin=vmin,
+        vmax=vmax,
+        alpha=alpha,
+        zorder=zorder,
+    )
+    return artist
+
+
+def draw_node_points(
+        ax,
+        positions,
+        size=300,
+        color="r",
+        shape="o",
+        alpha=1.0,
+        linewidths=0,
+        edgecolors="black",
+        cmap=None,
+        vmin=None,
+        vmax=None,
+        rasterized=False,
+        zorder=2,
+):
+    """Draw nodes at positions as a single scatter.
+
+    Returns
+    -------
+    points : PathCollection
+    """
+    positions = np.asarray(positions, dtype=float)
+    return ax.scatter(
+        positions[:, 0],
+        positions[:, 1],
+        s=size,
+        c=color,
+        marker=shape,
+        alpha=alpha,
+        linewidths=linewidths,
+        edgecolors=edgecolors,
+        cmap=cmap,
+        vmin=vmin,
+        vmax=vmax,
+        rasterized=rasterized,
+        zorder=zorder,
+    )
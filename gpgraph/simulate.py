@@ -0,0 +1,127 @@
+__doc__ = """
+Monte Carlo simulation of adaptive walks on a genotype-phenotype graph.
+
+Many walkers are advanced together: at every step each walker draws its next
+genotype from its row of the Markov chain matrix built by
+``stochastic_matrix``, with all draws done as one vectorized search over the
+cumulative CSR data.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .matrices import stochastic_matrix
+from .markov import _resolve_targets
+
+
+WalkResult = namedtuple("WalkResult", ["visits", "edge_flux", "hitting_times"])
+
+
+def simulate_walks(G, source, targets=None, n_walkers=10000, max_steps=1000,
+                   model=None, jump_chain=True, seed=None, **params):
+    """Simulate independent adaptive walks starting from one genotype.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph with a model added.
+    source : genotype, binary genotype or node index
+        starting genotype of every walker.
+    targets : genotype, binary genotype, node index, or list of them, optional
+        absorbing genotypes. A walker stops when it reaches one of them.
+    n_walkers : int (default=10000)
+        number of walkers.
+    max_steps : int (default=1000)
+        number of steps after which the remaining walkers are stopped.
+    model : callable, optional
+        fixation model. Defaults to the model added with ``G.add_model``.
+    jump_chain : bool (default=True)
+        count substitutions only; see ``stochastic_matrix``. With False,
+        rejected mutations are steps spent at the same genotype.
+    seed : int or numpy.random.Generator, optional
+        seed for reproducible walks.
+    **params :
+        extra parameters passed to the model.
+
+    Returns
+    -------
+    result : WalkResult
+        ``visits`` : 1d array with the number of times walkers entered each
+        genotype (the start counts as an entry).
+        ``edge_flux`` : dict of edge -> mean number of times a walker
+        crossed it, in the form of ``paths_prob_to_edges_flux``.
+        ``hitting_times`` : 2d int array of shape (n_targets, max_steps + 1);
+        entry [k, t] counts walkers absorbed at target k after t steps.
+    """
+    rng = np.random.default_rng(seed)
+    P = stochastic_matrix(G, model=model, jump_chain=jump_chain, **params)
+    n = P.shape[0]
+    indptr, indices, data = P.indptr, P.indices, P.data
+    labels = G.gpm.data.index.to_numpy()
+
+    source = _resolve_targets(G, source)[0]
+    if targets is None:
+        targets = np.empty(0, dtype=np.int64)
+    else:
+        targets = _resolve_targets(G, targets)
+    target_id = np.full(n, -1, dtype=np.int64)
+    target_id[targets] = np.arange(len(targets))
+
+    # Cumulative probabilities; a draw u in row r lands on the first entry
+    # whose cumulative value exceeds start[r] + u * total[r].
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    cumulative = np.cumsum(data)
+    start = np.concatenate([[0.0], cumulative])[indptr[:-1]]
+    total = np.bincount(rows, weights=data, minlength=n)
+    # Genotypes a walker can never leave.
+    outflow = np.bincount(rows, weights=data * (indices != rows), minlength=n)
+    stuck = outflow <= 0
+
+    visits = np.zeros(n, dtype=np.int64)
+    crossings = np.zeros(len(data), dtype=np.int64)
+    hitting_times = np.zeros((len(targets), max_steps + 1), dtype=np.int64)
+
+    visits[source] = n_walkers
+    if target_id[source] >= 0:
+        hitting_times[target_id[source], 0] = n_walkers
+        position = np.empty(0, dtype=np.int64)
+    elif stuck[source]:
+        position = np.empty(0, dtype=np.int64)
+    else:
+        position = np.full(n_walkers, source, dtype=np.int64)
+
+    # Moves are buffered and counted in batches, so that each step costs
+    # time proportional to the number of walkers rather than the graph.
+    moves, buffered = [], 0
+    for step in range(1, max_steps + 1):
+        if len(position) == 0:
+            break
+        draw = start[position] + rng.random(len(position)) * total[position]
+        entry = np.searchsorted(cumulative, draw, side="right")
+        entry = np.clip(entry, indptr[position], indptr[position + 1] - 1)
+        new = indices[entry]
+
+        moved = new != position
+        moves.append(entry[moved])
+        buffered += len(moves[-1])
+        if buffered >= len(data):
+            crossings += np.bincount(np.concatenate(moves), minlength=len(data))
+            moves, buffered = [], 0
+
+        hit = target_id[new]
+        absorbed = hit >= 0
+        if absorbed.any():
+            hitting_times[:, step] = np.bincount(hit[absorbed], minlength=len(targets))
+        position = new[~absorbed & ~stuck[new]]
+
+    if moves:
+        crossings += np.bincount(np.concatenate(moves), minlength=len(data))
+    visits += np.bincount(indices, weights=crossings, minlength=n).astype(np.int64)
+
+    crossed = np.nonzero(crossings)[0]
+    edge_flux = dict(zip(
+        zip(labels[rows[crossed]].tolist(), labels[indices[crossed]].tolist()),
+        (crossings[crossed] / n_walkers).tolist()
+    ))
+    return WalkResult(visits, edge_flux, hitting_times)
@@ -0,0 +1,187 @@
+__doc__ = """
+Opt-in timing and counters for the stages of building and analyzing a graph.
+
+Instrumented code wraps each stage in ``stage(G, name)``. While ``G.stats``
+is None (the default) that returns a shared no-op context, so the cost of
+instrumentation is one attribute lookup per stage.
+
+Example::
+
+    G = GenotypePhenotypeGraph(gpm, stats=True)
+    G.add_model(moran, population_size=100)
+    G.stats["add_model"].time
+    G.stats.add_hook(lambda name, event: print(name, event))
+"""
+
+import functools
+import time
+import tracemalloc
+
+
+class StageRecord(object):
+    """Totals for one stage.
+
+    Attributes
+    ----------
+    calls : int
+        number of times the stage ran.
+    time : float
+        total wall time, in seconds.
+    counts : dict
+        summed element counts (e.g. 'nodes', 'edges', 'paths').
+    peak_memory : int or None
+        largest allocation peak of a single call, in bytes (None unless
+        memory tracing is on).
+    """
+    __slots__ = ("calls", "time", "counts", "peak_memory")
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+        self.counts = {}
+        self.peak_memory = None
+
+    def __repr__(self):
+        return "StageRecord(calls={}, time={:.6f}, counts={}, peak_memory={})".format(
+            self.calls, self.time, self.counts, self.peak_memory)
+
+    def as_dict(self):
+        return dict(calls=self.calls, time=self.time, counts=dict(self.counts),
+                    peak_memory=self.peak_memory)
+
+
+class _Stage(object):
+    """One running stage; a context manager returned by GraphStats.stage."""
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+        self.counts = {}
+
+    def add(self, **counts):
+        """Add element counts to this call of the stage."""
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + int(value)
+
+    def __enter__(self):
+        stats = self.stats
+        if stats.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # Peaks are measured per stage; remember the enclosing stage's
+            # peak so far before resetting.
+            current, outer_peak = tracemalloc.get_traced_memory()
+            self.start_memory = current
+            self.outer_peak = outer_peak
+            self.child_peak = 0
+            tracemalloc.reset_peak()
+        stats._running.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stats = self.stats
+        stats._running.pop()
+        peak = None
+        if stats.memory and tracemalloc.is_tracing():
+            _, traced_peak = tracemalloc.get_traced_memory()
+            traced_peak = max(traced_peak, self.child_peak)
+            peak = traced_peak - self.start_memory
+            if stats._running:
+                parent = stats._running[-1]
+                parent.child_peak = max(parent.child_peak, self.outer_peak, traced_peak)
+        stats._record(self.name, elapsed, self.counts, peak)
+        return False
+
+
+class _NullStage(object):
+    """Stage used when stats are disabled."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, **counts):
+        pass
+
+
+NULL_STAGE = _NullStage()
+
+
+class GraphStats(dict):
+    """Stage name -> StageRecord for one graph.
+
+    Parameters
+    ----------
+    memory : bool (default=False)
+        trace allocations with ``tracemalloc`` to record the peak of each
+        stage. Tracing slows Python allocations down noticeably.
+    hooks : list of callables, optional
+        called as ``hook(name, event)`` after every stage, where ``event``
+        is a dict with the 'time', 'counts' and 'peak_memory' of that call.
+    """
+    def __init__(self, memory=False, hooks=None):
+        super(GraphStats, self).__init__()
+        self.memory = memory
+        self.hooks = list(hooks or [])
+        self._running = []
+
+    def stage(self, name):
+        """Context manager that times one call of a stage."""
+        return _Stage(self, name)
+
+    def add_hook(self, hook):
+        """Call ``hook(name, event)`` after every stage."""
+        self.hooks.append(hook)
+
+    def reset(self):
+        """Drop all records (hooks are kept)."""
+        self.clear()
+
+    def as_dict(self):
+        """Records as plain dicts, e.g. to serialize."""
+        return {name: record.as_dict() for name, record in self.items()}
+
+    def _record(self, name, elapsed, counts, peak):
+        record = self.get(name)
+        if record is None:
+            record = self[name] = StageRecord()
+        record.calls += 1
+        record.time += elapsed
+        for key, value in counts.items():
+            record.counts[key] = record.counts.get(key, 0) + value
+        if peak is not None:
+            record.peak_memory = max(record.peak_memory or 0, peak)
+        if self.hooks:
+            event = dict(time=elapsed, counts=dict(counts), peak_memory=peak)
+            for hook in self.hooks:
+                hook(name, event)
+
+
+def stage(G, name):
+    """Stage context for G; a no-op unless ``G.stats`` is set."""
+    stats = getattr(G, "stats", None)
+    if stats is None:
+        return NULL_STAGE
+    return stats.stage(name)
+
+
+def instrument(name, **counters):
+    """Decorator that runs a function ``f(G, ...)`` as a stage of G.
+
+    ``counters`` map count names to ``counter(G, result)`` functions that
+    give the element counts of a call.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(G, *args, **kwargs):
+            stats = getattr(G, "stats", None)
+            if stats is None:
+                return func(G, *args, **kwargs)
+            with stats.stage(name) as current:
+                result = func(G, *args, **kwargs)
+                current.add(**{key: counter(G, result) for key, counter in counters.items()})
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,357 @@
+__doc__ = """
+Single-file binary format for built genotype-phenotype graphs.
+
+A file holds a JSON header followed by raw, 64-byte aligned arrays: the
+``gpm.data`` columns, the genotype encoder's codes and sorted keys, the
+positional edge index and the edge probabilities of the current model and
+of every cached model. Loading memory-maps the arrays, so startup skips
+genotype encoding, the neighbor search and model evaluation, and processes
+on one host reading the same file share its pages. Neighbor dicts are only
+built when networkx visits a node (see ``gpgraph.adjacency``), so loading
+does no per-edge work.
+
+Layout::
+
+    MAGIC | header length (uint64, little endian) | JSON header | arrays
+"""
+
+import importlib
+import json
+
+import numpy as np
+import pandas as pd
+from gpmap import GenotypePhenotypeMap
+from gpmap.utils import get_encoding_table
+
+from .base import _freeze
+from .encoding import GenotypeEncoder, genotypes_to_chars
+
+MAGIC = b"GPGRAPH\x01"
+ALIGN = 64
+
+# gpm.data columns that are edited in place (e.g. by update_phenotypes);
+# they are copied into memory when a file is mapped read-only.
+WRITABLE_COLUMNS = ("phenotypes", "stdeviations")
+
+
+def _model_name(model):
+    """Import path of a model function, or None if it cannot be imported."""
+    model = getattr(model, "__func__", model)
+    module = getattr(model, "__module__", None)
+    name = getattr(model, "__qualname__", "")
+    if module is None or "<" in name:
+        return None
+    return "{}:{}".format(module, name)
+
+
+def _import_model(name):
+    module, _, attr = name.partition(":")
+    obj = importlib.import_module(module)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _json_params(params):
+    """Parameters as JSON-compatible values, or None if they are not."""
+    try:
+        return json.loads(json.dumps(params, default=lambda v: v.item()))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _storable(values):
+    """Array with a fixed-width dtype that can be written raw and mmapped."""
+    values = np.asarray(values)
+    if values.dtype != object:
+        return values
+    if all(isinstance(v, str) for v in values.flat):
+        return values.astype(str)
+    try:
+        return values.astype(float)
+    except (TypeError, ValueError):
+        return values.astype(str)
+
+
+def _gpm_from_data(wildtype, mutations, data, site_labels=None, metadata=None):
+    """Build a GenotypePhenotypeMap around an existing DataFrame.
+
+    Sets up the same state as ``GenotypePhenotypeMap.__init__``, but reuses
+    the binary and n_mutations columns of ``data`` when present instead of
+    recomputing them genotype by genotype.
+    """
+    gpm = GenotypePhenotypeMap.__new__(GenotypePhenotypeMap)
+    gpm._mutations = mutations
+    gpm.metadata = metadata or {}
+    gpm._wildtype = wildtype
+    gpm.data = data
+    gpm.encoding_table = get_encoding_table(wildtype, mutations, site_labels)
+    if "binary" not in data.columns:
+        gpm.add_binary()
+    if "n_mutations" not in data.columns:
+        gpm.add_n_mutations()
+    gpm._add_error()
+    return gpm
+
+
+def write_graph(G, fname):
+    """Write a GenotypePhenotypeGraph to a single binary file.
+
+    Parameters
+    ----------
+    G : GenotypePhenotypeGraph
+        graph to write. Edges are only written for graphs that store them
+        (not for implicit graphs).
+    fname : str
+        path of the file to write.
+    """
+    arrays = []
+
+    def add(values):
+        values = np.ascontiguousarray(_storable(values))
+        arrays.append(values)
+        return len(arrays) - 1
+
+    gpm = G.gpm
+    data = gpm.data
+    site_labels = gpm.encoding_table.drop_duplicates("genotype_index").site_label.tolist()
+    header = {
+        "wildtype": gpm.wildtype,
+        "mutations": {str(site): None if alphabet is None else [str(a) for a in alphabet]
+                      for site, alphabet in gpm.mutations.items()},
+        "site_labels": _json_params(site_labels),
+        "metadata": _json_params(getattr(gpm, "metadata", {})) or {},
+        "index": add(data.index.to_numpy()),
+        "nodes": {key: add(data[key].to_numpy()) for key in data.columns},
+        "encoder": None,
+        "edges": None,
+        "model": None,
+        "models": [],
+    }
+
+    state = G.encoder.state()
+    header["encoder"] = {"alphabets": state.pop("alphabets"), "mutable": state.pop("mutable")}
+    header["encoder"].update({key: add(values) for key, values in state.items()})
+
+    edges = getattr(G, "_edge_index", None)
+    if edges is not None:
+        columns = {key: add(values) for key, values in G._edge_columns.items()
+                   if values.dtype != object and key != "prob"}
+        header["edges"] = {"sources": add(edges[0]), "targets": add(edges[1]), "columns": columns}
+
+    model = getattr(G, "model", None)
+    if model is not None:
+        header["model"] = {"model": _model_name(model),
+                           "params": _json_params(G.model_params),
+                           "prob": None}
+        probs = G._edge_columns.get("prob") if edges is not None else None
+        if probs is not None and probs.dtype != object:
+            header["model"]["prob"] = add(probs)
+
+    # Cached models for the current phenotypes.
+    fingerprint = G._phenotype_fingerprint()
+    if edges is not None:
+        for (func, frozen, key_fingerprint), probs in G._model_cache.items():
+            name = _model_name(func)
+            params = _json_params(dict(frozen))
+            if key_fingerprint == fingerprint and name is not None and params is not None:
+                header["models"].append({"model": name, "params": params, "prob": add(probs)})
+
+    # Lay out the arrays after the header.
+    specs, offset = [], 0
+    for values in arrays:
+        specs.append({"dtype": values.dtype.str, "shape": list(values.shape), "offset": offset})
+        offset += -(-values.nbytes // ALIGN) * ALIGN
+    header["arrays"] = specs
+    text = json.dumps(header).encode("utf-8")
+    start = -(-(len(MAGIC) + 8 + len(text)) // ALIGN) * ALIGN
+    text += b" " * (start - len(MAGIC) - 8 - len(text))
+
+    with open(fname, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(text)).tobytes())
+        f.write(text)
+        for spec, values in zip(specs, arrays):
+            f.seek(start + spec["offset"])
+            f.write(values.tobytes())
+        f.truncate(start + offset)
+
+
+def _read_header(fname):
+    with open(fname, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a gpgraph file.".format(fname))
+        length = int(np.frombuffer(f.read(8), dtype="<u8")[0])
+        header = json.loads(f.read(length).decode("utf-8"))
+    return header, len(MAGIC) + 8 + length
+
+
+def read_graph(fname, cls, mmap_mode="r"):
+    """Read a graph written by ``write_graph``.
+
+    Parameters
+    ----------
+    fname : str
+        path of the file to read.
+    cls : type
+        GenotypePhenotypeGraph class to build.
+    mmap_mode : {'r', 'c', None} (default='r')
+        memory-map mode of the arrays ('c' is copy-on-write). None reads
+        them into memory. With 'r', the ``WRITABLE_COLUMNS`` of
+        ``gpm.data`` are still read into memory so phenotypes can be
+        updated; edge probabilities are copied on the first write.
+
+    Returns
+    -------
+    G : cls
+        graph with the saved topology, columns and model probabilities.
+    """
+    header, start = _read_header(fname)
+
+    def get(i):
+        spec = header["arrays"][i]
+        dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+        if mmap_mode is None or int(np.prod(shape)) == 0:
+            count = int(np.prod(shape))
+            return np.fromfile(fname, dtype=dtype, count=count,
+                               offset=start + spec["offset"]).reshape(shape)
+        return np.memmap(fname, dtype=dtype, mode=mmap_mode, offset=start + spec["offset"], shape=shape)
+
+    mutations = {int(site): alphabet for site, alphabet in header["mutations"].items()}
+    columns = {key: get(i) for key, i in header["nodes"].items()}
+    if mmap_mode == "r":
+        for key in WRITABLE_COLUMNS:
+            if key in columns:
+                columns[key] = np.array(columns[key])
+    data = pd.DataFrame(columns, index=get(header["index"]), copy=False)
+    gpm = _gpm_from_data(header["wildtype"], mutations, data,
+                         site_labels=header["site_labels"], metadata=header["metadata"])
+
+    encoder = header.get("encoder")
+    if encoder is not None:
+        encoder = GenotypeEncoder.from_state(
+            encoder["alphabets"], encoder["mutable"],
+            **{key: get(i) for key, i in encoder.items() if key not in ("alphabets", "mutable")})
+
+    edges = header["edges"]
+    if edges is not None:
+        G = cls(gpm, edges=(get(edges["sources"]), get(edges["targets"])), encoder=encoder)
+    else:
+        G = cls(gpm, encoder=encoder)
+    # Implicit graphs do not store edges; they only take the model.
+    stored = edges is not None and getattr(G, "_edge_index", None) is not None
+
+    current = header["model"] or {"model": None, "params": None, "prob": None}
+    func = _import_model(current["model"]) if current["model"] is not None else None
+    params = current["params"] or {}
+    if stored:
+        for key, i in edges["columns"].items():
+            G._edge_columns[key] = get(i)
+        fingerprint = G._phenotype_fingerprint()
+        for entry in header["models"]:
+            key = (_import_model(entry["model"]), _freeze(entry["params"]), fingerprint)
+            G._model_cache[key] = get(entry["prob"])
+        if current["prob"] is not None:
+            G._edge_columns["prob"] = get(current["prob"])
+            if func is not None:
+                G.model = staticmethod(func)
+                G.model_params = params
+            return G
+    if func is not None:
+        G.add_model(func, **params)
+    return G
+
+
+# Column types used by GenotypePhenotypeMap.read_csv.
+CSV_DTYPES = dict(genotypes=str, phenotypes=float, stdeviations=float, n_replicates=int)
+
+
+def _csv_alphabets(fname, chunksize):
+    """Mutations dictionary of the observed characters at each site."""
+    alphabets = None
+    for chunk in pd.read_csv(fname, usecols=["genotypes"], dtype=str, chunksize=chunksize):
+        chars = genotypes_to_chars(chunk.genotypes.to_numpy(dtype=str))
+        seen = [set(np.unique(column).tolist()) for column in chars.T]
+        alphabets = seen if alphabets is None else [a | b for a, b in zip(alphabets, seen)]
+    return {site: sorted(alphabet) for site, alphabet in enumerate(alphabets or [])}
+
+
+def _binary_columns(encoder, codes, wildtype, encoding_table):
+    """binary and n_mutations columns of a map, from its allele codes."""
+    table = encoding_table.dropna(subset=["mutation_letter"])
+    blocks = []
+    mutated = np.zeros(len(codes), dtype=np.int64)
+    for site, alphabet in enumerate(encoder.alphabets):
+        if not encoder.mutable[site]:
+            continue
+        site_table = table[table.genotype_index == site]
+        chunks = dict(zip(site_table.mutation_letter, site_table.binary_repr))
+        # One row of '0'/'1' characters per allele, gathered by code.
+        bits = genotypes_to_chars([chunks[a] for a in alphabet])
+        blocks.append(bits[codes[:, site]])
+        mutated += codes[:, site] != alphabet.index(wildtype[site])
+    if not blocks or sum(b.shape[1] for b in blocks) == 0:
+        return np.full(len(codes), "", dtype="U1"), mutated
+    chars = np.concatenate(blocks, axis=1)
+    return chars.view("U{}".format(chars.shape[1])).ravel(), mutated
+
+
+def read_csv_chunks(fname, cls, wildtype, mutations=None, chunksize=2 ** 16):
+    """Build a graph from a genotype-phenotype CSV file, one chunk at a time.
+
+    Only the genotypes, phenotypes, stdeviations and n_replicates columns
+    are parsed, ``chunksize`` rows at a time, and genotypes are encoded to
+    integer codes as they are read, so no DataFrame of the raw file is ever
+    held in memory. Edges are then found ``chunksize`` rows at a time and
+    the encoder is handed to the graph, so genotypes are not encoded again.
+
+    Parameters
+    ----------
+    fname : str
+        CSV file with the columns written by ``GenotypePhenotypeMap.to_csv``.
+    cls : type
+        GenotypePhenotypeGraph class to build.
+    wildtype : str
+        wildtype genotype.
+    mutations : dict, optional
+        mutations dictionary. If not given, it is found in a first pass over
+        the genotypes column.
+    chunksize : int (default=2**16)
+        number of rows parsed at once.
+    """
+    if mutations is None:
+        mutations = _csv_alphabets(fname, chunksize)
+
+    encoder = None
+    columns = {key: [] for key in ("genotypes", "phenotypes", "stdeviations", "n_replicates")}
+    reader = pd.read_csv(fname, dtype=CSV_DTYPES, chunksize=chunksize,
+                         usecols=lambda key: key in columns)
+    for chunk in reader:
+        genotypes = chunk.genotypes.to_numpy(dtype=str)
+        if encoder is None:
+            encoder = GenotypeEncoder(genotypes, mutations)
+        else:
+            encoder.append(genotypes)
+        columns["genotypes"].append(genotypes)
+        for key in ("phenotypes", "stdeviations", "n_replicates"):
+            if key in chunk:
+                columns[key].append(chunk[key].to_numpy())
+        del chunk
+
+    if encoder is None:
+        raise ValueError("{} has no genotypes.".format(fname))
+    n = len(encoder)
+    binary, n_mutations = _binary_columns(encoder, encoder.codes, wildtype,
+                                          get_encoding_table(wildtype, mutations))
+    data = pd.DataFrame(dict(
+        genotypes=np.concatenate(columns.pop("genotypes")),
+        phenotypes=np.concatenate(columns["phenotypes"]) if columns["phenotypes"] else np.full(n, np.nan),
+        n_replicates=np.concatenate(columns["n_replicates"]) if columns["n_replicates"] else 1,
+        stdeviations=np.concatenate(columns["stdeviations"]) if columns["stdeviations"] else None,
+        binary=binary,
+        n_mutations=n_mutations,
+    ))
+    del columns, binary, n_mutations
+    gpm = _gpm_from_data(wildtype, mutations, data)
+    edges = encoder.neighbors(chunksize=chunksize)
+    return cls(gpm, edges=edges, encoder=encoder)
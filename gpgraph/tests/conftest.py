@@ -0,0 +1,68 @@
+import itertools
+import pytest
+import numpy as np
+from gpmap.gpm import GenotypePhenotypeMap
+from gpgraph.base import GenotypePhenotypeGraph
+from gpgraph.models import moran
+
+
+def multi_map(sites, drop=0, seed=0):
+    """Map over the 'ABC' alphabet with random phenotypes, leaving out its
+    last ``drop`` genotypes."""
+    rng = np.random.default_rng(seed)
+    genotypes = ["".join(g) for g in itertools.product("ABC", repeat=sites)]
+    genotypes = genotypes[:len(genotypes) - drop]
+    phenotypes = rng.random(len(genotypes)) + 0.1
+    return GenotypePhenotypeMap(genotypes[0], genotypes, phenotypes)
+
+
+@pytest.fixture
+def gpmap_base():
+    # Data
+    wildtype = "AAA"
+    genotypes = ["AAA", "AAT", "ATA", "TAA", "ATT", "TAT", "TTA", "TTT"]
+    phenotypes = [0.1, 0.2, 0.2, 0.6, 0.4, 0.6, 1.0, 1.1]
+    stdeviations = [0.05, 0.05, 0.05, 0.05, 0.05, 0.05, 0.05, 0.05]
+
+    # Initialize the object
+    gpm = GenotypePhenotypeMap(wildtype,
+                               genotypes,
+                               phenotypes,
+                               stdeviations=stdeviations)
+    return gpm
+
+
+@pytest.fixture
+def gpgraph_test(gpmap_base):
+    return GenotypePhenotypeGraph(gpmap_base)
+
+
+@pytest.fixture
+def gpgraph_sswm(gpgraph_test):
+    gpgraph_test.add_model()
+    return gpgraph_test
+
+
+@pytest.fixture
+def gpgraph_moran(gpgraph_test):
+    gpgraph_test.add_model(moran, population_size=10)
+    return gpgraph_test
+
+
+@pytest.fixture
+def gpmap_multi():
+    # Three sites, with the last four genotypes missing.
+    return multi_map(3, drop=4, seed=2)
+
+
+@pytest.fixture
+def gpgraph_multi():
+    G = GenotypePhenotypeGraph(multi_map(4, seed=1))
+    G.add_model(moran, population_size=10)
+    return G
+
+
+@pytest.fixture
+def gpmap_large():
+    # Seven sites, 2187 genotypes: large enough for memory comparisons.
+    return multi_map(7, seed=3)
@@ -1,33 +1,12 @@
 import pytest
 from gpmap.gpm import GenotypePhenotypeMap
-from gpgraph.base import get_neighbors, GenotypePhenotypeGraph
+from gpgraph.base import get_neighbors, GenotypePhenotypeGraph, TopologyError
+from gpgraph.models import moran, strong_selection_weak_mutation
+from gpgraph.matrices import edge_probabilities
 import numpy as np
 import time
 
 
-@pytest.fixture
-def gpmap_base():
-    # Data
-    wildtype = "AAA"
-    genotypes = ["AAA", "AAT", "ATA", "TAA", "ATT", "TAT", "TTA", "TTT"]
-    phenotypes = [0.1, 0.2, 0.2, 0.6, 0.4, 0.6, 1.0, 1.1]
-    stdeviations = [0.05, 0.05, 0.05, 0.05, 0.05, 0.05, 0.05, 0.05]
-
-    # Initialize the object
-    gpm = GenotypePhenotypeMap(wildtype,
-                               genotypes,
-                               phenotypes,
-                               stdeviations=stdeviations)
-    return gpm
-
-
-@pytest.fixture
-def gpgraph_test(gpmap_base):
-    gpgraph_test = GenotypePhenotypeGraph(gpmap_base)
-
-    return gpgraph_test
-
-
 @pytest.fixture
 def binary_gpgraph():
     gpbinary = get_neighbors('000', {0: ['0', '1'], 1: ['0', '1'], 2: ['0', '1']})
@@ -91,3 +70,220 @@ def test_data_integrity_csv(gpmap_base):
     np.testing.assert_array_equal(gpmap_base.phenotypes, read_gpgraph.phenotypes)
     np.testing.assert_array_equal(gpmap_base.mutations, read_gpgraph.mutations)
     np.testing.assert_array_equal(gpmap_base.binary, read_gpgraph.binary)
+
+
+def test_add_gpm_nodes(gpgraph_test, gpmap_base):
+    """Test every genotype is a node with its data attached"""
+    assert list(gpgraph_test.nodes) == list(gpmap_base.data.index)
+    for i, row in gpmap_base.data.iterrows():
+        assert gpgraph_test.nodes[i]["genotypes"] == row["genotypes"]
+        assert gpgraph_test.nodes[i]["phenotypes"] == row["phenotypes"]
+
+
+def test_add_gpm_edges(gpgraph_test, gpmap_base):
+    """Test edges match a genotype-by-genotype neighbor search"""
+    m = dict(zip(gpmap_base.genotypes, gpmap_base.data.index))
+    edges = []
+    for i, genotype in zip(gpmap_base.data.index, gpmap_base.genotypes):
+        for neighbor in get_neighbors(genotype, gpmap_base.mutations):
+            if neighbor in m:
+                edges.append((i, m[neighbor]))
+    assert list(gpgraph_test.edges) == edges
+
+
+def test_add_gpm_missing_genotypes():
+    """Test genotypes absent from the map do not create edges"""
+    gpm = GenotypePhenotypeMap("AAA", ["AAA", "AAT", "TTT"], [0.1, 0.2, 0.3])
+    G = GenotypePhenotypeGraph(gpm)
+    assert sorted(G.edges) == [(0, 1), (1, 0)]
+
+
+def test_add_model(gpgraph_test, gpmap_base):
+    """Test every edge gets the model probability of its phenotypes"""
+    gpgraph_test.add_model(moran, population_size=10)
+    phenotypes = gpmap_base.phenotypes
+    for i, j in gpgraph_test.edges:
+        expected = moran(phenotypes[i], phenotypes[j], population_size=10)
+        assert gpgraph_test.edges[i, j]["prob"] == pytest.approx(expected)
+
+
+def test_node_array(gpgraph_test, gpmap_base):
+    np.testing.assert_array_equal(gpgraph_test.node_array("phenotypes"), gpmap_base.phenotypes)
+    assert np.shares_memory(gpgraph_test.node_array("phenotypes"),
+                            gpmap_base.data["phenotypes"].to_numpy())
+
+
+def test_edge_array(gpgraph_test):
+    gpgraph_test.add_model()
+    probs = gpgraph_test.edge_array("prob")
+    assert len(probs) == gpgraph_test.number_of_edges()
+    for k, edge in enumerate(gpgraph_test.edges):
+        assert gpgraph_test.edges[edge]["prob"] == probs[k]
+
+
+def test_set_attributes(gpgraph_test):
+    """Test attributes can still be written one element at a time"""
+    gpgraph_test.nodes[1]["label"] = "x"
+    gpgraph_test.edges[0, 1]["capacity"] = 0.5
+    assert gpgraph_test.nodes[1]["label"] == "x"
+    assert "label" not in gpgraph_test.nodes[2]
+    assert dict(gpgraph_test.edges[0, 1]) == {"capacity": 0.5}
+    assert gpgraph_test.edges[1, 0].get("capacity") is None
+
+
+def test_add_model_cache(gpgraph_test, gpmap_base):
+    """Test switching between models reuses cached edge probabilities"""
+    gpgraph_test.add_model(moran, population_size=10)
+    moran_probs = gpgraph_test.edge_array("prob")
+    gpgraph_test.add_model()
+    gpgraph_test.add_model(moran, population_size=10)
+    assert gpgraph_test.edge_array("prob") is moran_probs
+    assert (gpgraph_test.model_cache_hits, gpgraph_test.model_cache_misses) == (1, 2)
+
+    # Per-edge writes do not leak into the cache.
+    gpgraph_test.edges[0, 1]["prob"] = 0.5
+    gpgraph_test.add_model(moran, population_size=10)
+    expected = moran(gpmap_base.phenotypes[0], gpmap_base.phenotypes[1], population_size=10)
+    assert gpgraph_test.edges[0, 1]["prob"] == pytest.approx(expected)
+
+    # Changing phenotypes invalidates the cache.
+    gpgraph_test.update_phenotypes(list(gpgraph_test.nodes), gpmap_base.phenotypes * 2)
+    gpgraph_test.add_model(moran, population_size=10)
+    assert gpgraph_test.model_cache_misses == 3
+    assert len(gpgraph_test._model_cache) == 1
+
+
+def test_add_model_cache_size(gpgraph_test):
+    gpgraph_test.model_cache_size = 2
+    for N in (10, 20, 30, 10):
+        gpgraph_test.add_model(moran, population_size=N)
+    assert gpgraph_test.model_cache_hits == 0
+    assert len(gpgraph_test._model_cache) == 2
+
+
+def _genotype_edges(G):
+    """Edges and their probabilities, labeled by genotype."""
+    genotypes = G.gpm.data.genotypes
+    return {(genotypes[i], genotypes[j]): p for i, j, p in G.edges(data="prob")}
+
+
+def test_update_phenotypes(gpgraph_test, gpmap_base):
+    gpgraph_test.add_model(moran, population_size=10)
+    gpgraph_test.update_phenotypes([1, 6], [0.9, 0.3])
+    assert gpgraph_test.nodes[6]["phenotypes"] == 0.3
+    expected = GenotypePhenotypeGraph(gpmap_base)
+    expected.add_model(moran, population_size=10)
+    assert _genotype_edges(gpgraph_test) == pytest.approx(_genotype_edges(expected))
+
+
+def test_update_phenotypes_in_place(gpgraph_moran):
+    G = gpgraph_moran
+    G.update_phenotypes([1], [0.9])
+    probs = G.edge_array("prob")
+    G.update_phenotypes([2], [0.8])
+    assert G.edge_array("prob") is probs
+
+
+def test_add_no_genotypes(gpgraph_sswm):
+    G = gpgraph_sswm
+    edges, version = list(G.edges), G.version
+    assert G.add_genotypes([], []) == []
+    G.remove_genotypes([])
+    assert list(G.edges) == edges
+    assert G.version == version
+
+
+def test_phenotypes_single_source(gpgraph_test):
+    G = gpgraph_test
+    G.add_model(moran, population_size=10)
+    G.update_phenotypes([2], [0.9])
+    phenotypes = G.node_array("phenotypes")
+    np.testing.assert_array_equal(phenotypes, G.gpm.phenotypes)
+
+    # Models read the node column, so a switch of model scores the same
+    # phenotypes that paths and drawing see.
+    G.add_model()
+    sources, targets = G._edge_index
+    expected = strong_selection_weak_mutation(phenotypes[sources], phenotypes[targets])
+    np.testing.assert_allclose(G.edge_array("prob"), expected)
+    np.testing.assert_allclose(edge_probabilities(G, moran, population_size=10),
+                               moran(phenotypes[sources], phenotypes[targets], population_size=10))
+
+    G.nodes[3]["phenotypes"] = 2.0
+    G.add_model()
+    assert G.edges[0, 3]["prob"] == pytest.approx(strong_selection_weak_mutation(0.1, 2.0))
+
+
+MUTATOR_CALLS = [
+    ("add_node", (8,)),
+    ("add_nodes_from", ([8, 9],)),
+    ("add_edge", (0, 7)),
+    ("add_edges_from", ([(0, 7)],)),
+    ("add_weighted_edges_from", ([(0, 7, 0.5)],)),
+    ("remove_node", (0,)),
+    ("remove_nodes_from", ([0, 1],)),
+    ("remove_edge", (0, 1)),
+    ("remove_edges_from", ([(0, 1)],)),
+    ("clear", ()),
+    ("clear_edges", ()),
+    ("update", ([(0, 7)],)),
+]
+
+
+@pytest.mark.parametrize("name,args", MUTATOR_CALLS)
+def test_networkx_mutators_raise(gpgraph_sswm, name, args):
+    G = gpgraph_sswm
+    edges, probs = list(G.edges), G.edge_array("prob").copy()
+    with pytest.raises(TopologyError, match="add_genotypes and remove_genotypes"):
+        getattr(G, name)(*args)
+    assert list(G.edges) == edges == [tuple(e) for e in zip(*G._edge_index)]
+    np.testing.assert_array_equal(G.edge_array("prob"), probs)
+
+
+def test_add_remove_genotypes():
+    gpm = GenotypePhenotypeMap("AAA", ["AAA", "AAT", "TAA", "TTT"], [0.1, 0.2, 0.6, 1.1])
+    G = GenotypePhenotypeGraph(gpm)
+    G.add_model(moran, population_size=10)
+    G.nodes[0]["label"] = "wt"
+
+    nodes = G.add_genotypes(["ATT", "TAT"], [0.4, 0.6])
+    assert nodes == [4, 5]
+    full = GenotypePhenotypeMap("AAA", ["AAA", "AAT", "TAA", "TTT", "ATT", "TAT"],
+                                [0.1, 0.2, 0.6, 1.1, 0.4, 0.6])
+    expected = GenotypePhenotypeGraph(full)
+    expected.add_model(moran, population_size=10)
+    assert _genotype_edges(G) == pytest.approx(_genotype_edges(expected))
+    assert list(G.gpm.binary) == list(full.binary)
+
+    # Edge arrays follow G.edges, so the matrices stay in sync.
+    assert [tuple(e) for e in zip(*G._edge_index)] == list(G.edges)
+    np.testing.assert_array_equal(G.edge_array("prob"), [p for _, _, p in G.edges(data="prob")])
+
+    G.remove_genotypes([1, 4])
+    assert list(G.nodes) == [0, 2, 3, 5]
+    assert G.nodes[0]["label"] == "wt"
+    assert G.nodes[5]["genotypes"] == "TAT"
+    reduced = GenotypePhenotypeMap("AAA", ["AAA", "TAA", "TTT", "TAT"], [0.1, 0.6, 1.1, 0.6])
+    expected = GenotypePhenotypeGraph(reduced)
+    expected.add_model(moran, population_size=10)
+    assert _genotype_edges(G) == pytest.approx(_genotype_edges(expected))
+    assert [tuple(G.gpm.data.index[list(e)]) for e in zip(*G._edge_index)] == list(G.edges)
+
+    with pytest.raises(ValueError):
+        G.add_genotypes(["TTT"], [1.0])
+
+
+def test_import_without_matplotlib():
+    import os
+    import subprocess
+    import sys
+    import gpgraph
+
+    script = ("import sys, gpgraph\n"
+              "from gpgraph.layout import flattened_array\n"
+              "assert 'matplotlib' not in sys.modules\n"
+              "gpgraph.draw_gpgraph\n"
+              "assert 'matplotlib' in sys.modules\n")
+    root = os.path.dirname(os.path.dirname(gpgraph.__file__))
+    env = dict(os.environ, PYTHONPATH=root, MPLBACKEND="Agg")
+    subprocess.run([sys.executable, "-c", script], env=env, check=True)
@@ -0,0 +1,61 @@
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from gpmap.gpm import GenotypePhenotypeMap
+from gpgraph.base import GenotypePhenotypeGraph
+from gpgraph.paths import forward_paths_prob, paths_prob_to_edges_flux
+from gpgraph.pyplot import draw_gpgraph, flattened, flattened_array
+from gpgraph.pyplot.render import edge_density
+
+
+def test_flattened(gpmap_base):
+    G = GenotypePhenotypeGraph(gpmap_base)
+    positions = flattened_array(G)
+    np.testing.assert_array_equal(positions[:, 0], [0, 1, 1, 1, 2, 2, 2, 3])
+    np.testing.assert_array_equal(positions[:, 1], [0, -1, 0, 1, -1, 0, 1, 0])
+
+    pos = flattened(G, scale=2, vertical=True)
+    assert list(pos) == list(gpmap_base.data.index)
+    assert pos[3] == [2.0, -1.0]
+    assert pos[7] == [0.0, -3.0]
+
+
+def test_flattened_multiallelic():
+    genotypes = ["AA", "AB", "AC", "BA", "BB", "CC"]
+    mutations = {0: ["A", "B", "C"], 1: ["A", "B", "C"]}
+    gpm = GenotypePhenotypeMap("AA", genotypes, np.arange(6.0), mutations=mutations)
+    positions = flattened_array(GenotypePhenotypeGraph(gpm))
+    np.testing.assert_array_equal(positions[:, 0], [0, 1, 1, 1, 2, 2])
+    np.testing.assert_array_equal(positions[:, 1], [0, -1, 0, 1, -0.5, 0.5])
+
+
+def test_edge_density():
+    positions = np.array([[0.0, 0.0], [4.0, 0.0], [0.0, 4.0]])
+    image, extent = edge_density(positions, [0, 0], [1, 2], weights=[1.0, 2.0], bins=5)
+    assert extent == (0.0, 4.0, 0.0, 4.0)
+    # Both edges cross the corner pixel; each other pixel is crossed once.
+    assert image[0, 0] == 3.0
+    np.testing.assert_array_equal(image[0, 1:], 1.0)
+    np.testing.assert_array_equal(image[1:, 0], 2.0)
+    assert image.sum() == 3.0 + 4 + 8
+
+
+def test_draw_gpgraph(gpmap_base):
+    G = GenotypePhenotypeGraph(gpmap_base)
+    G.add_model()
+    fig, ax = draw_gpgraph(G)
+    (lines,) = ax.collections[:1]
+    assert len(lines.get_segments()) == G.number_of_edges()
+    assert len(ax.collections[1].get_offsets()) == len(G)
+    plt.close(fig)
+
+    paths = forward_paths_prob(G, "AAA", "TTT")
+    flux = paths_prob_to_edges_flux(paths)
+    fig, ax = draw_gpgraph(G, paths=paths, edge_colors="flux")
+    np.testing.assert_allclose(ax.collections[0].get_array(), list(flux.values()))
+    plt.close(fig)
+
+    fig, ax = draw_gpgraph(G, paths=paths, edge_density=True, edge_bins=16)
+    assert ax.images[0].get_array().shape == (16, 16)
+    plt.close(fig)
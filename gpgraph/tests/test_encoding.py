@@ -0,0 +1,48 @@
+import pytest
+import numpy as np
+from gpgraph.encoding import GenotypeEncoder, genotypes_to_chars
+
+
+@pytest.fixture
+def encoder():
+    genotypes = ["AAA", "AAT", "ACA", "TCT", "GAA"]
+    mutations = {0: ["A", "T", "G"], 1: ["A", "C"], 2: ["A", "T"]}
+    return GenotypeEncoder(genotypes, mutations)
+
+
+def test_genotypes_to_chars():
+    chars = genotypes_to_chars(["AB", "BA"])
+    np.testing.assert_array_equal(chars, np.array([["A", "B"], ["B", "A"]]))
+
+
+def test_encode_decode(encoder):
+    np.testing.assert_array_equal(encoder.codes[3], [1, 1, 1])
+    np.testing.assert_array_equal(encoder.decode(encoder.codes),
+                                  ["AAA", "AAT", "ACA", "TCT", "GAA"])
+
+
+def test_encode_invalid_character(encoder):
+    with pytest.raises(ValueError):
+        encoder.encode(["AAC"])
+
+
+def test_lookup(encoder):
+    keys = encoder.to_keys(encoder.encode(["GAA", "TCA", "AAA"]))
+    np.testing.assert_array_equal(encoder.lookup(keys), [4, -1, 0])
+
+
+def test_neighbors(encoder):
+    sources, targets = encoder.neighbors()
+    pairs = list(zip(sources.tolist(), targets.tolist()))
+    assert pairs == [(0, 4), (0, 2), (0, 1), (1, 0), (2, 0), (4, 0)]
+
+
+def test_byte_keys():
+    """Test lookups still work when codes overflow a 64-bit integer"""
+    length = 40
+    mutations = {i: list("ACDEFGHIKLMNPQRSTVWY") for i in range(length)}
+    genotypes = ["A" * length, "C" + "A" * (length - 1), "Y" * length]
+    encoder = GenotypeEncoder(genotypes, mutations)
+    assert not encoder.integer_keys
+    sources, targets = encoder.neighbors()
+    assert list(zip(sources.tolist(), targets.tolist())) == [(0, 1), (1, 0)]
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from gpgraph import flux
+from gpgraph.matrices import edge_index
+from gpgraph.paths import (forward_paths_prob, forward_edges_flux, paths_prob_to_edges_flux,
+                           edges_flux_to_node_flux, iter_forward_paths_prob)
+
+
+def test_edge_flux_roundtrip(gpgraph_moran):
+    G = gpgraph_moran
+    edge_flux = forward_edges_flux(G, "AAA", "TTT")
+    array = flux.edge_flux_array(G, edge_flux)
+    assert array.shape == (G.number_of_edges(),)
+    assert flux.edge_flux_dict(G, array) == pytest.approx(
+        {edge: value for edge, value in edge_flux.items() if value != 0})
+
+    sources, targets = edge_index(G)
+    ids = flux.edge_ids(G, sources[::-1], targets[::-1])
+    np.testing.assert_array_equal(ids, np.arange(len(sources))[::-1])
+    assert flux.edge_ids(G, [0], [7])[0] == -1
+    with pytest.raises(ValueError):
+        flux.edge_flux_array(G, {(0, 7): 1.0})
+
+
+def test_paths_flux_array(gpgraph_moran):
+    G = gpgraph_moran
+    paths = forward_paths_prob(G, "AAA", "TTT")
+    expected = flux.edge_flux_array(G, paths_prob_to_edges_flux(paths))
+    np.testing.assert_allclose(flux.paths_flux_array(G, paths), expected)
+    chunks = iter_forward_paths_prob(G, "AAA", "TTT", max_memory=64)
+    np.testing.assert_allclose(flux.paths_flux_array(G, chunks), expected)
+
+
+def test_node_flux(gpgraph_moran):
+    G = gpgraph_moran
+    array = flux.edge_flux_array(G, forward_edges_flux(G, "AAA", "TTT"))
+    inflow = flux.node_inflow(G, array)
+    outflow = flux.node_outflow(G, array)
+    total = sum(forward_paths_prob(G, "AAA", "TTT").values())
+    assert outflow[0] == pytest.approx(total)
+    assert inflow[7] == pytest.approx(total)
+    np.testing.assert_allclose(flux.net_flux(G, array), inflow - outflow)
+    assert len(flux.conservation_violations(G, array, "AAA", "TTT")) == 0
+    assert list(edges_flux_to_node_flux(G, forward_edges_flux(G, "AAA", "TTT")).values()) \
+        == pytest.approx(inflow.tolist())
+
+    broken = array.copy()
+    broken[np.flatnonzero(broken)[0]] *= 2
+    assert len(flux.conservation_violations(G, broken, "AAA", "TTT")) > 0
+
+    # Flux over a grid of parameters is reduced per grid point.
+    grid = np.column_stack([array, 2 * array])
+    np.testing.assert_allclose(flux.node_inflow(G, grid)[:, 1], 2 * inflow)
+
+
+def test_rank_edges(gpgraph_moran):
+    G = gpgraph_moran
+    array = flux.edge_flux_array(G, forward_edges_flux(G, "AAA", "TTT"))
+    ranking = flux.rank_edges(G, array)
+    values = [value for _, value in ranking]
+    assert values == sorted(values, reverse=True)
+    assert len(ranking) == np.count_nonzero(array)
+    assert flux.rank_edges(G, array, k=2) == ranking[:2]
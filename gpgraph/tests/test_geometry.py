@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from gpgraph import geometry
+from gpgraph.base import GenotypePhenotypeGraph
+from gpgraph.implicit import ImplicitGenotypePhenotypeGraph
+from gpgraph.models import moran
+from gpgraph.paths import forward_paths_prob, paths_prob_to_edges_flux
+from gpgraph.pyplot import draw_paths
+
+
+def test_layout_cache(gpmap_base):
+    G = GenotypePhenotypeGraph(gpmap_base)
+    positions = geometry.layout(G)
+    assert geometry.layout(G) is positions
+    assert not positions.flags.writeable
+    assert geometry.layout(G, vertical=True) is not positions
+
+    version = G.version
+    G.update_phenotypes([0], [0.05])
+    assert G.version != version
+    assert geometry.layout(G) is not positions
+    np.testing.assert_array_equal(geometry.layout(G), positions)
+
+
+def test_path_flux(gpmap_base):
+    G = GenotypePhenotypeGraph(gpmap_base)
+    G.add_model(moran, population_size=10)
+    sources, targets, flux = geometry.path_flux(G, "AAA", "TTT")
+    expected = paths_prob_to_edges_flux(forward_paths_prob(G, "AAA", "TTT"))
+    assert dict(zip(zip(sources.tolist(), targets.tolist()), flux.tolist())) == pytest.approx(expected)
+    assert geometry.path_flux(G, "AAA", "TTT")[2] is flux
+
+    # A new model gives new flux.
+    G.add_model()
+    assert geometry.path_flux(G, "AAA", "TTT")[2] is not flux
+
+    draw_paths(G)
+    draw_paths(G, edge_color="r")
+    assert len(G._render_cache) <= G.render_cache_size
+    plt.close("all")
+
+
+def test_implicit_version(gpmap_base):
+    G = ImplicitGenotypePhenotypeGraph(gpmap_base)
+    version = G.version
+    G.add_model(moran, population_size=10)
+    assert G.version != version
+
+
+def test_repr_does_not_draw(gpmap_base):
+    plt.close("all")
+    repr(GenotypePhenotypeGraph(gpmap_base))
+    assert plt.get_fignums() == []
@@ -0,0 +1,84 @@
+import pytest
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from gpmap.gpm import GenotypePhenotypeMap
+from gpgraph.base import GenotypePhenotypeGraph, TopologyError
+from gpgraph.implicit import ImplicitGenotypePhenotypeGraph
+from gpgraph.models import moran
+from gpgraph.paths import forward_paths, forward_paths_prob
+from gpgraph.pyplot import draw_gpgraph
+
+
+def test_matches_explicit(gpmap_multi):
+    G = GenotypePhenotypeGraph(gpmap_multi)
+    H = ImplicitGenotypePhenotypeGraph(gpmap_multi)
+    assert list(H.nodes) == list(G.nodes)
+    assert list(H.edges) == list(G.edges)
+    assert dict(H.nodes[5]) == G.nodes[5]
+    for node in G:
+        assert list(H.successors(node)) == list(G.successors(node))
+        assert sorted(H.predecessors(node)) == sorted(G.predecessors(node))
+
+
+def test_number_of_edges(gpmap_multi):
+    G = GenotypePhenotypeGraph(gpmap_multi)
+    H = ImplicitGenotypePhenotypeGraph(gpmap_multi, stats=True)
+    assert H.number_of_edges() == G.number_of_edges()
+    assert H.number_of_edges(0, 1) == 1
+    H.add_genotypes(["CCA"], [0.5])
+    assert H.number_of_edges() == len(H.edges)
+
+    # Drawing records the edge count as a stats counter.
+    H.add_model()
+    fig, _ = draw_gpgraph(H)
+    plt.close(fig)
+    assert H.stats["draw_gpgraph"].counts["edges"] == H.number_of_edges()
+
+
+def test_edge_probabilities(gpmap_multi):
+    G = GenotypePhenotypeGraph(gpmap_multi)
+    H = ImplicitGenotypePhenotypeGraph(gpmap_multi)
+    G.add_model(moran, population_size=10)
+    H.add_model(moran, population_size=10)
+    for edge in G.edges:
+        assert H.edges[edge]["prob"] == pytest.approx(G.edges[edge]["prob"])
+    source, target = "AAA", "CBA"
+    assert forward_paths(H, source, target) == forward_paths(G, source, target)
+    assert forward_paths_prob(H, source, target) == pytest.approx(forward_paths_prob(G, source, target))
+
+
+def test_cache_is_bounded(gpmap_multi):
+    H = ImplicitGenotypePhenotypeGraph(gpmap_multi, cache_size=3)
+    H.add_model()
+    for edge in H.edges:
+        H.edges[edge]["prob"]
+    assert len(H._cache) == 3
+
+
+@pytest.mark.parametrize("name", ["add_node", "add_nodes_from", "add_edge", "add_edges_from",
+                                  "add_weighted_edges_from", "remove_node", "remove_nodes_from",
+                                  "remove_edge", "remove_edges_from", "clear", "clear_edges",
+                                  "update"])
+def test_read_only(gpmap_multi, name):
+    H = ImplicitGenotypePhenotypeGraph(gpmap_multi)
+    n_edges = H.number_of_edges()
+    with pytest.raises(TopologyError, match="add_genotypes and remove_genotypes"):
+        getattr(H, name)(0, 1)
+    assert H.number_of_edges() == n_edges
+
+
+def test_incremental_updates(gpmap_multi):
+    G = GenotypePhenotypeGraph(gpmap_multi)
+    gpm = GenotypePhenotypeMap("AAA", list(gpmap_multi.genotypes), gpmap_multi.phenotypes.copy())
+    H = ImplicitGenotypePhenotypeGraph(gpm)
+    for graph in (G, H):
+        graph.add_model(moran, population_size=10)
+        assert graph.add_genotypes([], []) == []
+        assert graph.add_genotypes(["CCA", "CBC"], [0.5, 0.7]) == [23, 24]
+        graph.update_phenotypes([0, 24], [0.2, 0.3])
+        graph.remove_genotypes([3, 23])
+    assert list(H.nodes) == list(G.nodes)
+    assert sorted(H.edges) == sorted(G.edges)
+    for edge in G.edges:
+        assert H.edges[edge]["prob"] == pytest.approx(G.edges[edge]["prob"])
@@ -0,0 +1,55 @@
+import pytest
+import numpy as np
+from gpmap.gpm import GenotypePhenotypeMap
+from gpgraph.base import GenotypePhenotypeGraph
+from gpgraph.matrices import stochastic_matrix
+from gpgraph.markov import absorption
+
+
+def test_stochastic_matrix(gpgraph_moran):
+    P = stochastic_matrix(gpgraph_moran)
+    np.testing.assert_allclose(np.asarray(P.sum(axis=1)).ravel(), 1)
+    assert P[0, 1] == pytest.approx(gpgraph_moran.edges[0, 1]["prob"] / 3)
+
+
+def dense_absorption(P, targets):
+    """Textbook dense solution of an absorbing chain."""
+    transient = [i for i in range(P.shape[0]) if i not in targets]
+    Q = P[np.ix_(transient, transient)]
+    R = P[np.ix_(transient, targets)]
+    N = np.linalg.inv(np.eye(len(transient)) - Q)
+    B = N @ R
+    h = B.sum(axis=1)
+    return transient, B, (N @ h) / h
+
+
+@pytest.mark.parametrize("method", ["direct", "iterative"])
+def test_absorption(gpgraph_moran, method):
+    targets = [6, 7]
+    probs, times = absorption(gpgraph_moran, ["TTA", "TTT"], method=method)
+    transient, B, t = dense_absorption(stochastic_matrix(gpgraph_moran).toarray(), targets)
+    np.testing.assert_allclose(probs[transient], B, rtol=1e-6)
+    np.testing.assert_allclose(times[transient], t, rtol=1e-6)
+    np.testing.assert_array_equal(probs[targets], np.eye(2))
+    np.testing.assert_array_equal(times[targets], 0)
+
+
+def test_absorption_unreachable():
+    """Test genotypes stuck on a peak are never absorbed"""
+    gpm = GenotypePhenotypeMap("AA", ["AA", "AT", "TA", "TT"], [1.0, 0.5, 2.0, 1.5])
+    G = GenotypePhenotypeGraph(gpm)
+    G.add_model()
+    probs, times = absorption(G, "TT", jump_chain=True)
+    assert probs[2, 0] == 0
+    assert np.isinf(times[2])
+
+
+def test_absorption_node_indices(gpgraph_moran):
+    G = gpgraph_moran
+    G.remove_genotypes([1])
+    probs, times = absorption(G, [6, 7])
+    expected_probs, expected_times = absorption(G, ["TTA", "TTT"])
+    np.testing.assert_array_equal(probs, expected_probs)
+    np.testing.assert_array_equal(times, expected_times)
+    with pytest.raises(ValueError):
+        absorption(G, 1)
@@ -0,0 +1,30 @@
+import pytest
+import numpy as np
+import networkx as nx
+from gpgraph.models import moran
+from gpgraph.matrices import edge_index, adjacency_matrix, transition_matrix
+
+
+def test_edge_index(gpgraph_test):
+    sources, targets = edge_index(gpgraph_test)
+    assert list(zip(sources, targets)) == list(gpgraph_test.edges)
+
+
+def test_adjacency_matrix(gpgraph_test):
+    A = adjacency_matrix(gpgraph_test)
+    expected = nx.to_numpy_array(gpgraph_test, nodelist=range(8))
+    np.testing.assert_array_equal(A.toarray(), expected)
+
+
+def test_transition_matrix(gpgraph_test):
+    gpgraph_test.add_model()
+    T = transition_matrix(gpgraph_test)
+    for i, j in gpgraph_test.edges:
+        assert T[i, j] == pytest.approx(gpgraph_test.edges[i, j]["prob"])
+    assert T.nnz == gpgraph_test.number_of_edges()
+
+
+def test_transition_matrix_model(gpgraph_test):
+    T = transition_matrix(gpgraph_test, model=moran, population_size=10)
+    phenotypes = gpgraph_test.gpm.phenotypes
+    assert T[0, 1] == pytest.approx(moran(phenotypes[0], phenotypes[1], 10))
@@ -0,0 +1,82 @@
+import math
+import pytest
+import numpy as np
+from gpgraph.models import (strong_selection_weak_mutation, moran, mccandish,
+                            evaluate_model, sweep_model)
+
+
+@pytest.fixture
+def fitnesses():
+    fitness1 = np.array([0.5, 0.5, 1.0, 1.2, 0.8])
+    fitness2 = np.array([0.6, 0.4, 1.0, 1.1, 0.8])
+    return fitness1, fitness2
+
+
+def test_sswm_scalar():
+    assert strong_selection_weak_mutation(0.5, 0.6) == pytest.approx(1 - math.exp(-0.2))
+    assert strong_selection_weak_mutation(0.6, 0.5) == 0
+
+
+def test_sswm_array(fitnesses):
+    fitness1, fitness2 = fitnesses
+    probs = strong_selection_weak_mutation(fitness1, fitness2)
+    expected = [strong_selection_weak_mutation(f1, f2) for f1, f2 in zip(fitness1, fitness2)]
+    np.testing.assert_allclose(probs, expected)
+    assert np.all(probs >= 0)
+
+
+def test_moran_array(fitnesses):
+    fitness1, fitness2 = fitnesses
+    probs = moran(fitness1, fitness2, 10)
+    for f1, f2, p in zip(fitness1, fitness2, probs):
+        if f1 == f2:
+            f2 = f2 - f1 / 1000
+        r = f1 / f2
+        assert p == pytest.approx((1 - r) / (1 - r ** 10))
+
+
+def test_mccandish_array(fitnesses):
+    fitness1, fitness2 = fitnesses
+    probs = mccandish(fitness1, fitness2, 10)
+    for f1, f2, p in zip(fitness1, fitness2, probs):
+        if f1 == f2:
+            assert p == pytest.approx(1 / 10)
+        else:
+            numer = 1 - math.e ** (-2 * (f2 - f1))
+            denom = 1 - math.e ** (-2 * 10 * (f2 - f1))
+            assert p == pytest.approx(numer / denom)
+
+
+def test_mccandish_large_population():
+    """Test large population sizes do not overflow"""
+    with np.errstate(all="raise"):
+        probs = mccandish(np.array([1.0, 1.0]), np.array([0.5, 1.5]), 1e6)
+    assert probs[0] == 0
+    assert probs[1] == pytest.approx(1 - math.exp(-1))
+
+
+def test_evaluate_scalar_model(fitnesses):
+    """Test models with scalar-only logic are evaluated element-wise"""
+    def adaptive(fitness1, fitness2):
+        if fitness2 > fitness1:
+            return 1
+        return 0
+
+    probs = evaluate_model(adaptive, *fitnesses)
+    np.testing.assert_array_equal(probs, [1, 0, 0, 0, 0])
+
+
+@pytest.mark.parametrize("model", [moran, mccandish])
+def test_sweep_model(fitnesses, model):
+    fitness1, fitness2 = fitnesses
+    sizes = np.array([2, 10, 100, 1000])
+    probs = sweep_model(model, fitness1, fitness2, population_size=sizes)
+    assert probs.shape == (len(fitness1), len(sizes))
+    for k, N in enumerate(sizes):
+        np.testing.assert_allclose(probs[:, k], model(fitness1, fitness2, N))
+
+
+def test_sweep_model_constant(fitnesses):
+    fitness1, fitness2 = fitnesses
+    probs = sweep_model(strong_selection_weak_mutation, fitness1, fitness2)
+    np.testing.assert_allclose(probs[:, 0], strong_selection_weak_mutation(fitness1, fitness2))
@@ -0,0 +1,295 @@
+import tracemalloc
+import pytest
+import numpy as np
+from gpmap.gpm import GenotypePhenotypeMap
+from gpgraph.base import GenotypePhenotypeGraph
+from gpgraph.models import moran
+from gpgraph.paths import (forward_paths, forward_paths_prob, paths_prob_to_edges_flux,
+                           edges_flux_to_node_flux, forward_edges_flux, forward_nodes_flux,
+                           top_k_paths, iter_forward_paths_prob, paths_to_edges_count,
+                           count_paths, dag_counts, batch_forward_paths)
+from gpgraph.matrices import edge_probabilities_sweep
+from gpgraph.flux import edge_flux_array, conservation_violations
+from gpgraph.markov import absorption
+from gpgraph.simulate import simulate_walks
+from gpgraph import geometry
+
+
+def test_forward_paths(gpgraph_sswm):
+    paths = forward_paths(gpgraph_sswm, "AAA", "TTT")
+    assert len(paths) == 6
+    assert forward_paths(gpgraph_sswm, "000", "111") == paths
+    assert forward_paths(gpgraph_sswm, 0, 7) == paths
+
+
+def test_forward_edges_flux(gpgraph_multi):
+    expected = paths_prob_to_edges_flux(forward_paths_prob(gpgraph_multi, "AAAA", "CBCA"))
+    flux = forward_edges_flux(gpgraph_multi, "AAAA", "CBCA")
+    assert set(flux) == set(expected)
+    assert sum(flux.values()) > 0
+    for edge, value in expected.items():
+        assert flux[edge] == pytest.approx(value)
+
+
+def test_forward_nodes_flux(gpgraph_sswm):
+    paths = forward_paths_prob(gpgraph_sswm, "AAA", "TTT")
+    node_flux = forward_nodes_flux(gpgraph_sswm, "AAA", "TTT")
+    inflow = edges_flux_to_node_flux(gpgraph_sswm, forward_edges_flux(gpgraph_sswm, "AAA", "TTT"))
+    assert node_flux[0] == pytest.approx(sum(paths.values()))
+    assert node_flux[7] == pytest.approx(sum(paths.values()))
+    for node in range(1, 8):
+        assert node_flux[node] == pytest.approx(inflow[node])
+
+
+def _rebuilt(G):
+    """Graph built from scratch on G's current genotypes, with G's model."""
+    gpm = GenotypePhenotypeMap(G.gpm.wildtype, list(G.gpm.genotypes), G.gpm.phenotypes.copy())
+    H = GenotypePhenotypeGraph(gpm)
+    H.add_model(G.model, **G.model_params)
+    return H
+
+
+def _by_genotype(G, values):
+    """Re-key a dict of node (or edge) values by genotype."""
+    genotypes = G.gpm.data.genotypes
+    return {tuple(genotypes[n] for n in key) if isinstance(key, tuple) else genotypes[key]: value
+            for key, value in values.items()}
+
+
+def test_forward_flux_after_remove_genotypes(gpgraph_sswm):
+    G = gpgraph_sswm
+    G.remove_genotypes([2, 1])
+    H = _rebuilt(G)
+    assert _by_genotype(G, forward_edges_flux(G, "AAA", "TTT")) == \
+        pytest.approx(_by_genotype(H, forward_edges_flux(H, "AAA", "TTT")))
+    assert _by_genotype(G, forward_edges_flux(G, 0, 7)) == \
+        pytest.approx(_by_genotype(H, forward_edges_flux(H, 0, 5)))
+    assert _by_genotype(G, forward_nodes_flux(G, 0, 7)) == \
+        pytest.approx(_by_genotype(H, forward_nodes_flux(H, 0, 5)))
+
+
+def test_top_k_paths(gpgraph_multi):
+    expected = forward_paths_prob(gpgraph_multi, "AAAA", "CBCA")
+    expected = sorted(expected.values(), reverse=True)[:5]
+    paths = list(top_k_paths(gpgraph_multi, "AAAA", "CBCA", k=5))
+    assert len(paths) == 5
+    for (path, prob), value in zip(paths, expected):
+        assert prob == pytest.approx(value)
+        assert path[0] == 0 and path[-1] == gpgraph_multi.gpm.genotypes.tolist().index("CBCA")
+
+
+def test_top_k_paths_after_remove_genotypes(gpgraph_multi):
+    G = gpgraph_multi
+    G.remove_genotypes([1])
+    H = _rebuilt(G)
+    genotypes = G.gpm.data.genotypes
+    for shortest in (True, False):
+        paths = list(top_k_paths(G, 0, 14, k=3, shortest=shortest))
+        expected = list(top_k_paths(H, 0, 13, k=3, shortest=shortest))
+        assert [tuple(genotypes[n] for n in path) for path, _ in paths] == \
+            [tuple(H.gpm.data.genotypes[n] for n in path) for path, _ in expected]
+        assert [prob for _, prob in paths] == pytest.approx([prob for _, prob in expected])
+        assert all(type(prob) is float for _, prob in paths)
+
+
+def test_top_k_paths_is_lazy(gpgraph_multi):
+    paths = top_k_paths(gpgraph_multi, "AAAA", "CCCC")
+    path, prob = next(paths)
+    assert len(path) == 5
+
+
+def test_top_k_simple_paths(gpgraph_sswm):
+    gpgraph_sswm.add_model(moran, population_size=10)
+    best = list(top_k_paths(gpgraph_sswm, "AAA", "TTT", k=10, shortest=False))
+    probs = [prob for _, prob in best]
+    assert probs == sorted(probs, reverse=True)
+    assert any(len(path) > 4 for path, _ in best)
+
+
+def test_iter_forward_paths_prob(gpgraph_multi):
+    expected = forward_paths_prob(gpgraph_multi, "AAAA", "CBCA")
+    chunks = list(iter_forward_paths_prob(gpgraph_multi, "AAAA", "CBCA", max_memory=2000))
+    assert len(chunks) > 1
+    streamed = {}
+    for chunk in chunks:
+        for path, prob in zip(chunk.paths.tolist(), chunk.probs):
+            streamed[tuple(path)] = prob
+    assert set(streamed) == set(expected)
+    for path, prob in expected.items():
+        assert streamed[path] == pytest.approx(prob)
+
+
+def test_stream_accumulators(gpgraph_multi):
+    paths = forward_paths_prob(gpgraph_multi, "AAAA", "CBCA")
+    stream = iter_forward_paths_prob(gpgraph_multi, "AAAA", "CBCA", max_memory=2000)
+    flux = paths_prob_to_edges_flux(stream)
+    expected = paths_prob_to_edges_flux(paths)
+    assert set(flux) == set(expected)
+    for edge, value in expected.items():
+        assert flux[edge] == pytest.approx(value)
+
+    stream = iter_forward_paths_prob(gpgraph_multi, "AAAA", "CBCA", max_memory=2000)
+    assert paths_to_edges_count(stream) == paths_to_edges_count(list(paths))
+
+
+def test_forward_paths_prob_workers(gpgraph_multi):
+    expected = forward_paths_prob(gpgraph_multi, "AAAA", "CBCA")
+    result = forward_paths_prob(gpgraph_multi, "AAAA", "CBCA", workers=2)
+    assert set(result) == set(expected)
+    assert list(result) == list(forward_paths_prob(gpgraph_multi, "AAAA", "CBCA", workers=3))
+    for path, prob in expected.items():
+        assert result[path] == pytest.approx(prob)
+    paths = forward_paths(gpgraph_multi, "AAAA", "CBCA", workers=2)
+    assert paths == [list(path) for path in result]
+
+
+def test_flux_sweep(gpgraph_multi):
+    from gpgraph.matrices import edge_probabilities_sweep
+    sizes = np.array([5, 10, 50])
+    probs = edge_probabilities_sweep(gpgraph_multi, population_size=sizes)
+    edge_flux = forward_edges_flux(gpgraph_multi, "AAAA", "CBCA", probs=probs)
+    node_flux = forward_nodes_flux(gpgraph_multi, "AAAA", "CBCA", probs=probs)
+    chunks = list(iter_forward_paths_prob(gpgraph_multi, "AAAA", "CBCA", probs=probs, max_memory=2000))
+    assert len(chunks) > 1
+    path_probs = np.concatenate([chunk.probs for chunk in chunks])
+    assert path_probs.shape[1] == len(sizes)
+
+    for k, N in enumerate(sizes):
+        gpgraph_multi.add_model(moran, population_size=N)
+        expected = forward_edges_flux(gpgraph_multi, "AAAA", "CBCA")
+        assert {edge: flux[k] for edge, flux in edge_flux.items()} == pytest.approx(expected)
+        expected = forward_nodes_flux(gpgraph_multi, "AAAA", "CBCA")
+        assert {node: flux[k] for node, flux in node_flux.items()} == pytest.approx(expected)
+        expected = np.concatenate([chunk.probs for chunk in iter_forward_paths_prob(
+            gpgraph_multi, "AAAA", "CBCA", max_memory=2000)])
+        np.testing.assert_allclose(path_probs[:, k], expected)
+
+
+def test_count_paths(gpgraph_sswm, gpgraph_multi):
+    # AAA -> TTT: 6 paths, all uphill except through TAA -> TAT (0.6 -> 0.6).
+    assert count_paths(gpgraph_sswm, "AAA", "TTT") == (6, 5)
+    total, accessible = count_paths(gpgraph_sswm, "AAA", "TTT", log=True)
+    assert total == pytest.approx(np.log(6)) and accessible == pytest.approx(np.log(5))
+
+    G = gpgraph_multi
+    phenotypes = G.node_array("phenotypes")
+    total, accessible = count_paths(G, "AAAA")
+    for target in [4, 40, 80]:
+        paths = forward_paths(G, "AAAA", G.gpm.genotypes[target])
+        uphill = [p for p in paths if np.all(np.diff(phenotypes[list(p)]) > 0)]
+        assert total[target] == len(paths)
+        assert accessible[target] == len(uphill)
+
+
+def test_batch_forward_paths(gpgraph_sswm, gpgraph_multi):
+    G = gpgraph_multi
+    genotypes = G.gpm.genotypes
+    sources = ["AAAA", "AAAA", "AAAA", 13, 13, "AAAA"]
+    targets = [genotypes[80], genotypes[40], "AAAA", 67, 5, genotypes[80]]
+    result = batch_forward_paths(G, sources, targets)
+    assert result.flux.format == "csc"
+    assert result.flux.shape == (G.number_of_edges(), len(sources))
+    for k, (source, target) in enumerate(zip(sources, targets)):
+        probs = forward_paths_prob(G, source, target)
+        assert result.length[k] == len(next(iter(probs))) - 1
+        assert result.prob[k] == pytest.approx(sum(probs.values()))
+        expected = edge_flux_array(G, forward_edges_flux(G, source, target))
+        np.testing.assert_allclose(result.flux[:, [k]].toarray().ravel(), expected, atol=1e-12)
+        # Only the pair's own DAG edges are stored.
+        assert result.flux[:, [k]].nnz == len(forward_edges_flux(G, source, target))
+
+    # A grid of probabilities gives one flux matrix per grid point.
+    grid = edge_probabilities_sweep(G, moran, population_size=np.array([10, 100]))
+    swept = batch_forward_paths(G, sources, targets, probs=grid)
+    assert len(swept.flux) == 2
+    single = batch_forward_paths(G, sources, targets, probs=grid[:, 1])
+    np.testing.assert_allclose(swept.flux[1].toarray(), single.flux.toarray())
+    np.testing.assert_allclose(swept.prob[:, 1], single.prob)
+
+    result = batch_forward_paths(gpgraph_sswm, ["000"], ["TTT"], flux=False)
+    assert result.flux is None
+    assert result.prob[0] == pytest.approx(sum(forward_paths_prob(gpgraph_sswm, "AAA", "TTT").values()))
+    with pytest.raises(ValueError):
+        batch_forward_paths(gpgraph_sswm, ["AAA"], ["GGG"])
+
+
+def test_batch_forward_paths_memory(gpmap_large):
+    """Forward state is kept for one source at a time."""
+    G = GenotypePhenotypeGraph(gpmap_large)
+    G.add_model()
+    target = G.gpm.genotypes[-1]
+
+    def peak(sources):
+        tracemalloc.start()
+        try:
+            batch_forward_paths(G, sources, [target] * len(sources))
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    one = peak([0])
+    many = peak(list(range(40)))
+    assert many < 2 * one
+
+
+def test_dag_counts_exact():
+    # A chain of 30 diamonds has 2**30 paths; past 20 layers the counts
+    # switch to Python integers.
+    layers = 30
+    sources, targets = [], []
+    for i in range(layers):
+        top, left, right, bottom = 3 * i, 3 * i + 1, 3 * i + 2, 3 * i + 3
+        sources += [top, top, left, right]
+        targets += [left, right, bottom, bottom]
+    sources, targets = np.array(sources), np.array(targets)
+    distances = np.zeros(3 * layers + 1, dtype=np.int64)
+    distances[1::3] = distances[2::3] = 2 * np.arange(layers) + 1
+    distances[3::3] = 2 * np.arange(1, layers + 1)
+    counts = dag_counts(sources, targets, distances, 0)
+    assert counts[-1] == 2 ** layers and isinstance(counts[-1], int)
+    logs = dag_counts(sources, targets, distances, 0, log=True)
+    assert logs[-1] == pytest.approx(layers * np.log(2))
+
+
+def test_node_indices_after_remove_genotypes(gpgraph_multi):
+    """Every API takes node indices, not row positions, once genotypes
+    have been removed."""
+    G = gpgraph_multi
+    G.remove_genotypes([1, 5, 30])
+    H = _rebuilt(G)
+    g_nodes = dict(zip(G.gpm.data.genotypes, G.gpm.data.index))
+    h_nodes = dict(zip(H.gpm.data.genotypes, H.gpm.data.index))
+    source, target = "AAAA", "CBCA"
+    for graph, nodes in ((G, g_nodes), (H, h_nodes)):
+        assert forward_paths(graph, nodes[source], nodes[target]) == \
+            forward_paths(graph, source, target)
+
+    def both(function, *args, **kwargs):
+        return (function(G, *[g_nodes[a] for a in args], **kwargs),
+                function(H, *[h_nodes[a] for a in args], **kwargs))
+
+    # Node- and edge-keyed results, compared by genotype.
+    for function in (forward_paths_prob, forward_edges_flux, forward_nodes_flux):
+        g, h = both(function, source, target)
+        assert _by_genotype(G, g) == pytest.approx(_by_genotype(H, h))
+
+    g, h = both(top_k_paths, source, target, k=3)
+    assert [prob for _, prob in g] == pytest.approx([prob for _, prob in h])
+    g, h = both(iter_forward_paths_prob, source, target)
+    assert sum(c.probs.sum() for c in g) == pytest.approx(sum(c.probs.sum() for c in h))
+    g, h = both(count_paths, source, target)
+    assert g == h
+
+    # Array results, in the (shared) order of gpm.data.
+    g, h = both(lambda graph, s, t: batch_forward_paths(graph, [s, s], [t, s], flux=False), source, target)
+    np.testing.assert_allclose(g.prob, h.prob)
+    np.testing.assert_array_equal(g.length, h.length)
+    g, h = both(absorption, target)
+    np.testing.assert_allclose(g[0], h[0])
+    g, h = both(simulate_walks, source, target, n_walkers=200, max_steps=20, seed=0)
+    np.testing.assert_array_equal(g.visits, h.visits)
+    g, h = both(geometry.path_flux, source, target)
+    for a, b in zip(g, h):
+        np.testing.assert_allclose(a, b)
+    flux = edge_flux_array(G, forward_edges_flux(G, source, target))
+    assert len(conservation_violations(G, flux, g_nodes[source], g_nodes[target])) == 0
@@ -0,0 +1,37 @@
+import pytest
+import numpy as np
+from gpgraph.matrices import stochastic_matrix
+from gpgraph.simulate import simulate_walks
+
+
+def test_simulate_walks(gpgraph_sswm):
+    result = simulate_walks(gpgraph_sswm, "AAA", targets="TTT", n_walkers=20000, seed=0)
+    # Every walk on this landscape is a shortest path to TTT.
+    assert result.hitting_times.shape == (1, 1001)
+    assert result.hitting_times[0, 3] == 20000
+    assert result.visits[0] == 20000
+    assert result.visits[7] == 20000
+
+    # Compare with the exact probability of crossing each edge.
+    P = stochastic_matrix(gpgraph_sswm, jump_chain=True).toarray()
+    for (i, j), flux in result.edge_flux.items():
+        expected = sum((np.linalg.matrix_power(P, k)[0, i]) * P[i, j] for k in range(3))
+        assert flux == pytest.approx(expected, abs=0.02)
+
+
+def test_simulate_walks_seed(gpgraph_sswm):
+    a = simulate_walks(gpgraph_sswm, 0, n_walkers=1000, max_steps=10, jump_chain=False, seed=1)
+    b = simulate_walks(gpgraph_sswm, 0, n_walkers=1000, max_steps=10, jump_chain=False, seed=1)
+    np.testing.assert_array_equal(a.visits, b.visits)
+    assert a.edge_flux == b.edge_flux
+
+
+def test_simulate_walks_node_indices(gpgraph_sswm):
+    G = gpgraph_sswm
+    G.remove_genotypes([1])
+    a = simulate_walks(G, 3, targets=7, n_walkers=100, seed=0)
+    b = simulate_walks(G, "TAA", targets="TTT", n_walkers=100, seed=0)
+    np.testing.assert_array_equal(a.visits, b.visits)
+    assert a.visits[G.gpm.data.index.get_loc(3)] == 100
+    with pytest.raises(ValueError):
+        simulate_walks(G, 1, n_walkers=10)
@@ -0,0 +1,37 @@
+from gpgraph.base import GenotypePhenotypeGraph
+from gpgraph.models import moran
+from gpgraph.paths import forward_paths_prob
+from gpgraph.pyplot import flattened
+from gpgraph.stats import GraphStats
+
+
+def test_stats_disabled(gpmap_base):
+    G = GenotypePhenotypeGraph(gpmap_base)
+    G.add_model()
+    forward_paths_prob(G, "AAA", "TTT")
+    assert G.stats is None
+
+
+def test_stats(gpmap_base):
+    events = []
+    G = GenotypePhenotypeGraph(gpmap_base, stats=GraphStats(memory=True, hooks=[
+        lambda name, event: events.append((name, event))]))
+    G.add_model(moran, population_size=10)
+    G.add_model(moran, population_size=10)
+    paths = forward_paths_prob(G, "AAA", "TTT")
+    flattened(G)
+
+    stats = G.stats
+    assert stats["encode"].counts == {"nodes": 8}
+    assert stats["neighbors"].counts == {"edges": 24}
+    # The second add_model is a cache hit and does not evaluate the model.
+    assert stats["add_model"].calls == 1
+    assert stats["forward_paths_prob"].counts == {"paths": len(paths)}
+    assert stats["forward_paths"].calls == 1
+    assert stats["flattened"].counts == {"nodes": 8}
+    assert all(record.time >= 0 and record.peak_memory >= 0 for record in stats.values())
+    assert [name for name, _ in events][:2] == ["encode", "neighbors"]
+    assert events[-1][1]["counts"] == {"nodes": 8}
+
+    stats.reset()
+    assert len(stats) == 0
@@ -0,0 +1,126 @@
+import tracemalloc
+import pytest
+import numpy as np
+from gpgraph.base import GenotypePhenotypeGraph
+from gpgraph.encoding import GenotypeEncoder
+from gpgraph.implicit import ImplicitGenotypePhenotypeGraph
+from gpgraph.matrices import transition_matrix
+from gpgraph.models import moran, strong_selection_weak_mutation
+from gpgraph.paths import forward_paths_prob
+
+
+@pytest.fixture
+def gpgraph_models(gpmap_multi):
+    G = GenotypePhenotypeGraph(gpmap_multi)
+    G.add_model()
+    G.add_model(moran, population_size=10)
+    return G
+
+
+@pytest.mark.parametrize("mmap_mode", ["r", None])
+def test_save_load(gpgraph_models, tmp_path, mmap_mode):
+    fname = str(tmp_path / "graph.gpg")
+    gpgraph_models.save_graph(fname)
+    G = GenotypePhenotypeGraph.load_graph(fname, mmap_mode=mmap_mode)
+
+    assert list(G.nodes) == list(gpgraph_models.nodes)
+    assert list(G.edges) == list(gpgraph_models.edges)
+    assert list(G.gpm.genotypes) == list(gpgraph_models.gpm.genotypes)
+    assert list(G.gpm.binary) == list(gpgraph_models.gpm.binary)
+    assert G.gpm.mutations == gpgraph_models.gpm.mutations
+    assert G.model_params == {"population_size": 10}
+    np.testing.assert_array_equal(G.edge_array("prob"), gpgraph_models.edge_array("prob"))
+    assert (transition_matrix(G) != transition_matrix(gpgraph_models)).nnz == 0
+    assert forward_paths_prob(G, "AAA", "CBB") == forward_paths_prob(gpgraph_models, "AAA", "CBB")
+    if mmap_mode is not None:
+        assert isinstance(G.edge_array("prob").base, np.memmap)
+        assert isinstance(G.encoder.codes, np.memmap)
+
+    # Cached models are loaded too.
+    G.add_model(strong_selection_weak_mutation)
+    assert G.model_cache_hits == 1
+    G.edges[0, 1]["prob"] = 0.5
+    assert G.edges[0, 1]["prob"] == 0.5
+
+
+def test_load_encoder(gpgraph_models, tmp_path, monkeypatch):
+    fname = str(tmp_path / "graph.gpg")
+    gpgraph_models.save_graph(fname)
+    # Loading reuses the saved codes and keys instead of encoding genotypes.
+    with monkeypatch.context() as patch:
+        patch.setattr(GenotypeEncoder, "encode_chars", None)
+        G = GenotypePhenotypeGraph.load_graph(fname)
+    np.testing.assert_array_equal(G.encoder.codes, gpgraph_models.encoder.codes)
+
+    for graph in (G, gpgraph_models):
+        graph.add_genotypes(["CCA", "CBC"], [0.5, 0.7])
+    assert list(G.edges) == list(gpgraph_models.edges)
+    np.testing.assert_array_equal(G.edge_array("prob"), gpgraph_models.edge_array("prob"))
+
+
+@pytest.mark.parametrize("mmap_mode", ["r", "c", None])
+def test_load_then_update(gpgraph_models, tmp_path, mmap_mode):
+    fname = str(tmp_path / "graph.gpg")
+    gpgraph_models.save_graph(fname)
+    G = GenotypePhenotypeGraph.load_graph(fname, mmap_mode=mmap_mode)
+    for graph in (G, gpgraph_models):
+        graph.update_phenotypes([1, 4], [0.9, 0.3])
+        graph.nodes[2]["phenotypes"] = 0.8
+        graph.edges[0, 1]["prob"] = 0.5
+    np.testing.assert_array_equal(G.node_array("phenotypes"), gpgraph_models.node_array("phenotypes"))
+    np.testing.assert_array_equal(G.edge_array("prob"), gpgraph_models.edge_array("prob"))
+    # The file itself is unchanged.
+    H = GenotypePhenotypeGraph.load_graph(fname)
+    assert H.nodes[1]["phenotypes"] != 0.9
+
+
+def test_load_implicit(gpgraph_models, tmp_path):
+    fname = str(tmp_path / "graph.gpg")
+    gpgraph_models.save_graph(fname)
+    H = ImplicitGenotypePhenotypeGraph.load_graph(fname)
+    assert list(H.edges) == list(gpgraph_models.edges)
+    for edge in gpgraph_models.edges:
+        assert H.edges[edge]["prob"] == pytest.approx(gpgraph_models.edges[edge]["prob"])
+
+
+def test_not_a_graph_file(tmp_path):
+    fname = tmp_path / "graph.gpg"
+    fname.write_bytes(b"{}")
+    with pytest.raises(ValueError):
+        GenotypePhenotypeGraph.load_graph(str(fname))
+
+
+@pytest.mark.parametrize("chunksize", [1, 4, 100])
+def test_read_csv_chunks(gpgraph_models, tmp_path, chunksize):
+    fname = str(tmp_path / "map.csv")
+    gpm = gpgraph_models.gpm
+    gpm.data["stdeviations"] = 0.05
+    gpm.to_csv(filename=fname)
+    expected = GenotypePhenotypeGraph.read_csv(fname, wildtype="AAA")
+    G = GenotypePhenotypeGraph.read_csv(fname, wildtype="AAA", chunksize=chunksize)
+
+    assert G.gpm.mutations == expected.gpm.mutations
+    assert list(G.edges) == list(expected.edges)
+    for key in ("genotypes", "binary", "n_mutations", "n_replicates"):
+        assert list(G.gpm.data[key]) == list(expected.gpm.data[key])
+    np.testing.assert_array_equal(G.gpm.phenotypes, expected.gpm.phenotypes)
+    np.testing.assert_array_equal(G.gpm.stdeviations, expected.gpm.stdeviations)
+
+
+def test_read_csv_chunks_memory(gpmap_large, tmp_path):
+    """Chunked reading peaks below reading the whole file at once."""
+    fname = str(tmp_path / "map.csv")
+    gpmap_large.to_csv(filename=fname)
+
+    def peak(**kwargs):
+        tracemalloc.start()
+        try:
+            G = GenotypePhenotypeGraph.read_csv(fname, wildtype="AAAAAAA", **kwargs)
+            return tracemalloc.get_traced_memory()[1], G
+        finally:
+            tracemalloc.stop()
+
+    full, expected = peak()
+    chunked, G = peak(chunksize=256)
+    assert list(G.edges) == list(expected.edges)
+    assert chunked < full
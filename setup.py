@@ -16,6 +16,7 @@ DESCRIPTION = 'NetworkX for genotype-phenotype maps.'
 URL = 'https://github.com/Zsailer/gpgraph'
 EMAIL = 'zachsailer@gmail.com'
 AUTHOR = 'Zach Sailer'
+REQUIRES_PYTHON = '>=3.9.0'
 
 # What packages are required for this module to be executed?
 REQUIRED = []
@@ -86,6 +87,7 @@ setup(
     author_email=EMAIL,
     url=URL,
     packages=find_packages(exclude=('tests',)),
+    python_requires=REQUIRES_PYTHON,
     install_requires=REQUIRED,
     include_package_data=True,
     license='MIT',
@@ -93,10 +95,10 @@ setup(
         # Trove classifiers
         # Full list: https://pypi.python.org/pypi?%3Aaction=list_classifiers
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
         'Programming Language :: Python :: Implementation :: CPython',
         'Programming Language :: Python :: Implementation :: PyPy'
     ],